@@ -1,41 +1,151 @@
+import numpy as np
 import pandas as pd
-from faker import Faker
 import random
 from datetime import datetime, timedelta
+import argparse
 import re
 import os
-from detalle_ventas_mejorado import generar_tabla_detalle_ventas_mejorada, validar_detalle_ventas
+import hashlib
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from detalle_ventas_mejorado import (
+    generar_tabla_detalle_ventas_mejorada,
+    generar_tabla_detalle_ventas_por_lotes,
+    generar_detalle_venta_mejorado,
+    determinar_tipo_compra as determinar_tipo_compra_detalle,
+    validar_detalle_ventas,
+    PROB_SELECCION as PROB_SELECCION_DETALLE,
+)
+from muestreador_popularidad import MuestreadorPopularidad
+from muestreador_fechas import MuestreadorFechasVenta
+from escritura_streaming import EscritorCSVPorChunks, escribir_run, fusionar_runs
+from cargador_datos import cargar_tabla
+from exportacion_columnar import anio_mes_por_venta, convertir_csv_a_parquet, exportar_parquet
+from almacen_sql import ARCHIVO_BD, cargar_base, cargar_csv, crear_base, finalizar_carga, insertar_tabla
+from instrumentacion import METRICAS
+from compacto import compactar_tablas, expandir_detalle, expandir_ventas
 
 
 # Configuración
-fake = Faker(['es_AR'])  
-random.seed(42)  # Para reproducibilidad
+SEMILLA = 42
 
 # Parámetros del negocio
 NUM_CLIENTES = 1296
 FECHA_INICIO_NEGOCIO = datetime(2023, 1, 1)
 FECHA_HOY = datetime(2024, 10, 31)
 
+# Carpeta de destino de las tablas exportadas: variable de entorno AURELION_SALIDA
+# o "BD_Aurelion" en la raíz del repo (aparte de los datos fuente de cargador_datos)
+CARPETA_SALIDA = os.environ.get(
+    'AURELION_SALIDA',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'BD_Aurelion')
+)
+
+# Generación de detalle: 'lotes' (NumPy, rápido) o 'fila' (venta por venta)
+MODO_DETALLE = 'lotes'
+
+# Generación de clientes: 'lotes' (NumPy, millones de clientes) o 'fila' (Faker por cliente)
+MODO_CLIENTES = 'lotes'
+TAMANO_POOL_NOMBRES = 5000
+
+# Fechas de venta: 'lotes' (todas las de un cliente juntas, ver muestreador_fechas) o 'fila'
+MODO_FECHAS = 'lotes'
+MODOS_GENERACION = ['lotes', 'fila']
+
+# Generación paralela de ventas + detalle (semilla propia por cliente)
+MODO_PARALELO = False
+NUM_PROCESOS = os.cpu_count() or 1
+CLIENTES_POR_SHARD = 500
+
+# Escritura en streaming de Ventas / Detalle_Ventas (memoria acotada)
+MODO_STREAMING = False
+VENTAS_POR_RUN = 500_000
+TAMANO_CHUNK = 50_000
+
+# Formato de exportación: 'csv' (utf-8-sig), 'parquet' (tipado, requiere pyarrow)
+# o 'sqlite' (base embebida con PK/FK e índices, ver almacen_sql)
+FORMATO_SALIDA = 'csv'
+FORMATOS_SALIDA = ['csv', 'parquet', 'sqlite']
+
+# Esquema de Ventas / Detalle_Ventas exportados: 'ancho' (con nombre_cliente, email y
+# nombre_producto, como el CSV original) o 'compacto' (solo ids, ver compacto).
+# En memoria las tablas son siempre compactas.
+ESQUEMA_SALIDA = 'ancho'
+ESQUEMAS_SALIDA = ['ancho', 'compacto']
+
 # Ciudades de Argentina
 BARRIOS_BA = [
     'Palermo', 'Recoleta', 'Belgrano', 'Caballito', 'Villa Crespo',
     'Almagro', 'Flores', 'Villa Urquiza', 'Núñez', 'Colegiales'
 ]
 
+# ============================================================
+# CONFIGURACIÓN DE UNA CORRIDA
+# ============================================================
+
+@dataclass
+class ConfiguracionGeneracion:
+    """Parámetros de una corrida del generador (valores por defecto = constantes del módulo)"""
+    num_clientes: int = NUM_CLIENTES
+    fecha_inicio: datetime = FECHA_INICIO_NEGOCIO
+    fecha_fin: datetime = FECHA_HOY
+    semilla: int = SEMILLA
+    carpeta_salida: str = CARPETA_SALIDA
+    formato_salida: str = FORMATO_SALIDA
+    esquema_salida: str = ESQUEMA_SALIDA
+    directorio_datos: str = None  # Productos (None = DIRECTORIO_DATOS de cargador_datos)
+    modo_clientes: str = MODO_CLIENTES
+    modo_fechas: str = MODO_FECHAS
+    modo_detalle: str = MODO_DETALLE
+    modo_paralelo: bool = MODO_PARALELO
+    num_procesos: int = NUM_PROCESOS
+    clientes_por_shard: int = CLIENTES_POR_SHARD
+    modo_streaming: bool = MODO_STREAMING
+    ventas_por_run: int = VENTAS_POR_RUN
+    tamano_chunk: int = TAMANO_CHUNK
+    archivo_metricas: str = None  # .json o .prom (Prometheus); None = sin instrumentación
+    perfilar: bool = False        # cProfile por etapa (requiere archivo_metricas)
+    medir_memoria: bool = False   # Pico de tracemalloc por etapa (requiere archivo_metricas)
+
+    def __post_init__(self):
+        if self.formato_salida not in FORMATOS_SALIDA:
+            raise ValueError(f"Formato desconocido: {self.formato_salida} (usar {', '.join(FORMATOS_SALIDA)})")
+        if self.esquema_salida not in ESQUEMAS_SALIDA:
+            raise ValueError(f"Esquema desconocido: {self.esquema_salida} (usar {', '.join(ESQUEMAS_SALIDA)})")
+        if self.esquema_salida == 'compacto' and (self.formato_salida != 'csv' or self.modo_streaming):
+            raise ValueError("El esquema compacto solo se exporta a CSV y sin streaming")
+        for modo in [self.modo_clientes, self.modo_fechas, self.modo_detalle]:
+            if modo not in MODOS_GENERACION:
+                raise ValueError(f"Modo desconocido: {modo} (usar 'lotes' o 'fila')")
+        if self.fecha_inicio >= self.fecha_fin:
+            raise ValueError("fecha_inicio debe ser anterior a fecha_fin")
+        if self.num_clientes < 1:
+            raise ValueError("num_clientes debe ser al menos 1")
+
 # ============================================================
 # FUNCIONES AUXILIARES
 # ============================================================
 
+# Instancia de Faker (se crea recién al primer uso: importar el módulo es instantáneo)
+_fake = None
+
+def obtener_faker():
+    """Devuelve la instancia compartida de Faker es_AR"""
+    global _fake
+    if _fake is None:
+        from faker import Faker
+        _fake = Faker(['es_AR'])
+    return _fake
+
+# Tildes y caracteres especiales que se reemplazan en los emails
+TABLA_EMAIL = str.maketrans('áéíóúñü', 'aeiounu')
+
 def limpiar_texto(texto):
     """Remueve tildes y caracteres especiales para emails"""
-    texto = texto.lower()
-    reemplazos = {
-        'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
-        'ñ': 'n', 'ü': 'u'
-    }
-    for orig, reempl in reemplazos.items():
-        texto = texto.replace(orig, reempl)
-    return texto
+    return texto.lower().translate(TABLA_EMAIL)
 
 def generar_email(nombre_completo):
     """Genera email correlacionado con el nombre"""
@@ -62,29 +172,35 @@ def generar_email(nombre_completo):
     
     return formato + random.choice(dominios)
 
-def generar_fecha_alta():
+def tramos_fecha_alta(fecha_inicio=FECHA_INICIO_NEGOCIO, fecha_fin=FECHA_HOY):
+    """
+    Rangos de alta de clientes antiguos y nuevos: hasta el 31/12 del año
+    anterior a fecha_fin y desde el 1/1 de ese año (mitad del rango si
+    empieza ese mismo año).
+    """
+    corte = datetime(fecha_fin.year, 1, 1)
+    if corte <= fecha_inicio:
+        corte = fecha_inicio + (fecha_fin - fecha_inicio) / 2
+    return [(fecha_inicio, max(fecha_inicio, corte - timedelta(days=1))), (corte, fecha_fin)]
+
+def generar_fecha_alta(fecha_inicio=FECHA_INICIO_NEGOCIO, fecha_fin=FECHA_HOY):
     """Genera fecha de registro con distribución realista"""
     # 60% clientes antiguos (2023), 40% clientes nuevos (2024)
-    if random.random() < 0.6:
-        return fake.date_time_between(
-            start_date=FECHA_INICIO_NEGOCIO,
-            end_date=datetime(2023, 12, 31)
-        )
-    else:
-        return fake.date_time_between(
-            start_date=datetime(2024, 1, 1),
-            end_date=FECHA_HOY
-        )
+    antiguos, nuevos = tramos_fecha_alta(fecha_inicio, fecha_fin)
+    desde, hasta = antiguos if random.random() < 0.6 else nuevos
+    return obtener_faker().date_time_between(start_date=desde, end_date=hasta)
 
 # ============================================================
 # GENERACIÓN DE CLIENTES
 # ============================================================
 
-def generar_tabla_clientes(num_clientes):
+def generar_tabla_clientes(num_clientes, fecha_inicio=FECHA_INICIO_NEGOCIO, fecha_fin=FECHA_HOY):
     """Genera la tabla completa de clientes"""
     clientes = []
+    fake = obtener_faker()
     
     print(f"Generando {num_clientes} clientes...")
+    progreso = METRICAS.progreso('clientes_fila', total=num_clientes, unidad='clientes')
     
     for i in range(1, num_clientes + 1):
         # Generar datos del cliente
@@ -94,7 +210,7 @@ def generar_tabla_clientes(num_clientes):
         # Ciudad con barrio
         ciudad = f"{random.choice(BARRIOS_BA)}"
         
-        fecha_alta = generar_fecha_alta()
+        fecha_alta = generar_fecha_alta(fecha_inicio, fecha_fin)
         
         cliente = {
             'id_cliente': i,
@@ -105,37 +221,104 @@ def generar_tabla_clientes(num_clientes):
         }
         
         clientes.append(cliente)
-        
-        if i % 100 == 0:
-            print(f"  → {i} clientes generados...")
+        progreso.avanzar()
     
+    progreso.cerrar()
     print("✓ Generación completada!")
     return pd.DataFrame(clientes)
 
+# ============================================================
+# GENERACIÓN DE CLIENTES POR LOTES (NUMPY)
+# ============================================================
 
-df_clientes = generar_tabla_clientes(NUM_CLIENTES)
+# Mismos formatos de nombre que Faker es_AR (elegidos con igual probabilidad)
+FORMATOS_NOMBRE = [
+    ('first_name', 'last_name', 'last_name'),
+    ('first_name', 'first_name', 'last_name'),
+    ('first_name', 'first_name', 'last_name', 'last_name'),
+    ('first_name', 'last_name'),
+    ('prefix', 'first_name', 'last_name'),
+]
+DOMINIOS_EMAIL = ['@gmail.com', '@hotmail.com', '@outlook.com', '@yahoo.com']
 
-df_clientes['fecha_alta'] = pd.to_datetime(df_clientes['fecha_alta'])
+def generar_pools_nombres(tamano=TAMANO_POOL_NOMBRES, semilla=SEMILLA):
+    """
+    Sortea una sola vez los pools de nombres, apellidos y prefijos con Faker
+    (respeta los pesos de frecuencia del proveedor es_AR).
+    """
+    from faker import Faker
+    fake_pool = Faker(['es_AR'])
+    fake_pool.seed_instance(semilla)
+    return {
+        tipo: np.array([getattr(fake_pool, tipo)() for _ in range(tamano)], dtype=object)
+        for tipo in ['first_name', 'last_name', 'prefix']
+    }
 
-# ============================================================
-# ESTADÍSTICAS DE CLIENTES
-# ============================================================
+def generar_emails_por_lotes(primera, ultima, rng):
+    """Emails con los mismos formatos y dominios que generar_email()"""
+    n = len(primera)
+    formato = rng.integers(0, 5, size=n)
+    numero = np.array([str(i) for i in range(1, 100)], dtype=object)[rng.integers(0, 99, size=n)]
+    inicial = np.array([texto[:1] for texto in primera], dtype=object)
+    usuario = np.select(
+        [formato == 0, formato == 1, formato == 2, formato == 3],
+        [primera + '.' + ultima, primera + ultima, primera + '_' + ultima, primera + '.' + ultima + numero],
+        inicial + ultima,
+    )
+    return usuario + np.array(DOMINIOS_EMAIL, dtype=object)[rng.integers(0, len(DOMINIOS_EMAIL), size=n)]
+
+def generar_fechas_alta_por_lotes(n, rng, fecha_inicio=FECHA_INICIO_NEGOCIO, fecha_fin=FECHA_HOY):
+    """fecha_alta con la misma distribución que generar_fecha_alta(), como un solo array"""
+    tramos = tramos_fecha_alta(fecha_inicio, fecha_fin)   # 60% antiguos, 40% nuevos
+    inicio = np.array([np.datetime64(desde, 's') for desde, _ in tramos])
+    segundos = np.array([int((hasta - desde).total_seconds()) for desde, hasta in tramos])
+    tramo = (rng.random(n) >= 0.6).astype(np.int64)
+    desplazamiento = rng.integers(0, segundos[tramo] + 1)
+    return np.datetime_as_string(inicio[tramo] + desplazamiento.astype('timedelta64[s]'), unit='D')
+
+def generar_tabla_clientes_por_lotes(num_clientes, semilla=SEMILLA, pools=None,
+                                     fecha_inicio=FECHA_INICIO_NEGOCIO, fecha_fin=FECHA_HOY):
+    """
+    Genera la tabla de clientes sin llamar a Faker por fila: mismas columnas y
+    distribuciones que generar_tabla_clientes(), apta para millones de clientes.
+    """
+    print(f"Generando {num_clientes} clientes (por lotes)...")
+    rng = np.random.default_rng(semilla)
+    pools = pools if pools is not None else generar_pools_nombres(semilla=semilla)
+
+    # Primera y última palabra limpia de cada elemento de los pools (para el email)
+    primera_palabra = {tipo: np.array([limpiar_texto(texto.split()[0]) for texto in pool], dtype=object)
+                       for tipo, pool in pools.items()}
+    ultima_palabra = {tipo: np.array([limpiar_texto(texto.split()[-1]) for texto in pool], dtype=object)
+                      for tipo, pool in pools.items()}
+
+    formato = rng.integers(0, len(FORMATOS_NOMBRE), size=num_clientes)
+    nombres = np.empty(num_clientes, dtype=object)
+    primera = np.empty(num_clientes, dtype=object)
+    ultima = np.empty(num_clientes, dtype=object)
+
+    for i, tokens in enumerate(FORMATOS_NOMBRE):
+        filas = np.flatnonzero(formato == i)
+        indices = [rng.integers(0, len(pools[tipo]), size=len(filas)) for tipo in tokens]
+        nombre = pools[tokens[0]][indices[0]]
+        for tipo, indice in zip(tokens[1:], indices[1:]):
+            nombre = nombre + ' ' + pools[tipo][indice]
+        nombres[filas] = nombre
+        primera[filas] = primera_palabra[tokens[0]][indices[0]]
+        ultima[filas] = ultima_palabra[tokens[-1]][indices[-1]]
+
+    METRICAS.contar('clientes_lotes.clientes', num_clientes)
+    df_clientes = pd.DataFrame({
+        'id_cliente': np.arange(1, num_clientes + 1),
+        'nombre_cliente': nombres,
+        'email': generar_emails_por_lotes(primera, ultima, rng),
+        'ciudad': np.array(BARRIOS_BA, dtype=object)[rng.integers(0, len(BARRIOS_BA), size=num_clientes)],
+        'fecha_alta': generar_fechas_alta_por_lotes(num_clientes, rng, fecha_inicio, fecha_fin),
+    })
+
+    print("✓ Generación completada!")
+    return df_clientes
 
-print("\n" + "="*60)
-print("ESTADÍSTICAS DE CLIENTES:")
-print("="*60)
-print(f"Total clientes: {len(df_clientes)}")
-print(f"Ciudades únicas: {df_clientes['ciudad'].nunique()}")
-print(f"\nDistribución por barrio:")
-print(df_clientes['ciudad'].value_counts())
-print(f"\nRango de fechas de registro:")
-print(f"  Primera alta: {df_clientes['fecha_alta'].min()}")
-print(f"  Última alta: {df_clientes['fecha_alta'].max()}")
-
-print("\n" + "="*60)
-print("MUESTRA DE CLIENTES:")
-print("="*60)
-print(df_clientes.head(10))
 
 # ============================================================
 # PERFILES DE COMPORTAMIENTO
@@ -209,23 +392,29 @@ PERFILES_TEMPORAL = {
 FECHA_HOY = datetime(2024, 10, 31)
 PROB_DOBLE_COMPRA_DIA = 0.05
 
+
 # ============================================================
 # FUNCIONES AUXILIARES
 # ============================================================
 
-def asignar_perfil(perfiles_dict):
+def asignar_perfil(perfiles_dict, rng=random):
     """Asigna un perfil basado en pesos probabilísticos"""
     perfiles = list(perfiles_dict.keys())
     pesos = [perfiles_dict[p]['peso'] for p in perfiles]
-    return random.choices(perfiles, weights=pesos, k=1)[0]
+    return rng.choices(perfiles, weights=pesos, k=1)[0]
 
-def elegir_medio_pago(perfil_pago):
+def elegir_medio_pago(perfil_pago, rng=random):
     """Elige medio de pago según perfil del cliente"""
     medios = list(PERFILES_PAGO[perfil_pago]['medios'].keys())
     pesos = list(PERFILES_PAGO[perfil_pago]['medios'].values())
-    return random.choices(medios, weights=pesos, k=1)[0]
+    return rng.choices(medios, weights=pesos, k=1)[0]
 
-def generar_fecha_venta(fecha_inicio, fecha_fin, perfil_temporal):
+@lru_cache(maxsize=8)
+def obtener_muestreador_fechas(fecha_inicio=FECHA_INICIO_NEGOCIO, fecha_fin=FECHA_HOY):
+    """Fechas de venta precalculadas por perfil temporal (una vez por rango)"""
+    return MuestreadorFechasVenta(PERFILES_TEMPORAL, fecha_inicio, fecha_fin)
+
+def generar_fecha_venta(fecha_inicio, fecha_fin, perfil_temporal, rng=random):
     """Genera fecha con día y hora según perfil temporal"""
     dias_activos = PERFILES_TEMPORAL[perfil_temporal]['dias']
     horarios = PERFILES_TEMPORAL[perfil_temporal]['horarios']
@@ -235,7 +424,7 @@ def generar_fecha_venta(fecha_inicio, fecha_fin, perfil_temporal):
     if dias_diferencia <= 0:
         fecha = fecha_inicio
     else:
-        fecha = fecha_inicio + timedelta(days=random.randint(0, dias_diferencia))
+        fecha = fecha_inicio + timedelta(days=rng.randint(0, dias_diferencia))
     
     # Ajustar al día de la semana permitido
     intentos = 0
@@ -244,11 +433,12 @@ def generar_fecha_venta(fecha_inicio, fecha_fin, perfil_temporal):
         if fecha > fecha_fin:
             fecha = fecha_inicio
         intentos += 1
+    METRICAS.contar('fecha_venta.reintentos_dia', intentos)
     
     # Asignar hora según horarios pico
-    rango_horario = random.choice(horarios)
-    hora = random.randint(rango_horario[0], rango_horario[1])
-    minuto = random.randint(0, 59)
+    rango_horario = rng.choice(horarios)
+    hora = rng.randint(rango_horario[0], rango_horario[1])
+    minuto = rng.randint(0, 59)
     
     return fecha.replace(hour=hora, minute=minuto, second=0)
 
@@ -256,20 +446,25 @@ def generar_fecha_venta(fecha_inicio, fecha_fin, perfil_temporal):
 # GENERACIÓN DE VENTAS
 # ============================================================
 
-def generar_ventas_cliente(cliente, perfil_frecuencia, perfil_pago, perfil_temporal):
-    """Genera todas las ventas de un cliente según sus perfiles"""
+def generar_ventas_cliente(cliente, perfil_frecuencia, perfil_pago, perfil_temporal, rng=random,
+                           fecha_inicio=FECHA_INICIO_NEGOCIO, fecha_fin=FECHA_HOY, modo_fechas=MODO_FECHAS):
+    """
+    Genera todas las ventas de un cliente según sus perfiles, hasta fecha_fin.
+    En modo 'lotes' las fechas adicionales se sortean juntas con el muestreador
+    del rango [fecha_inicio, fecha_fin]; en modo 'fila', una por una.
+    """
     ventas = []
     
     fecha_alta = cliente['fecha_alta']
-    meses_activo = (FECHA_HOY - fecha_alta).days / 30
+    meses_activo = (fecha_fin - fecha_alta).days / 30
     
     # Primera venta OBLIGATORIA en fecha_alta (o muy cerca)
     primera_venta = {
         'id_cliente': cliente['id_cliente'],
-        'fecha': fecha_alta + timedelta(hours=random.randint(0, 48)),
+        'fecha': fecha_alta + timedelta(hours=rng.randint(0, 48)),
         'nombre_cliente': cliente['nombre_cliente'],
         'email': cliente['email'],
-        'medio_pago': elegir_medio_pago(perfil_pago)
+        'medio_pago': elegir_medio_pago(perfil_pago, rng)
     }
     ventas.append(primera_venta)
     
@@ -277,35 +472,45 @@ def generar_ventas_cliente(cliente, perfil_frecuencia, perfil_pago, perfil_tempo
     compras_mes = PERFILES_FRECUENCIA[perfil_frecuencia]['compras_mes']
     num_ventas_adicionales = int(meses_activo * compras_mes)
     
-    for _ in range(num_ventas_adicionales):
-        fecha_venta = generar_fecha_venta(fecha_alta, FECHA_HOY, perfil_temporal)
-        
+    if modo_fechas == 'lotes' and num_ventas_adicionales > 0:
+        # Generador NumPy derivado del rng del cliente (mantiene la reproducibilidad)
+        rng_fechas = np.random.default_rng(rng.getrandbits(64))
+        fechas_venta = obtener_muestreador_fechas(fecha_inicio, fecha_fin).muestrear(
+            num_ventas_adicionales, fecha_alta, fecha_fin, perfil_temporal, rng_fechas
+        ).tolist()
+    else:
+        fechas_venta = [generar_fecha_venta(fecha_alta, fecha_fin, perfil_temporal, rng)
+                        for _ in range(num_ventas_adicionales)]
+    
+    for fecha_venta in fechas_venta:
         venta = {
             'id_cliente': cliente['id_cliente'],
             'fecha': fecha_venta,
             'nombre_cliente': cliente['nombre_cliente'],
             'email': cliente['email'],
-            'medio_pago': elegir_medio_pago(perfil_pago)
+            'medio_pago': elegir_medio_pago(perfil_pago, rng)
         }
         ventas.append(venta)
     
     # Casos especiales: 5% de clientes frecuentes compran 2 veces el mismo día
-    if perfil_frecuencia in ['frecuente', 'vip'] and random.random() < PROB_DOBLE_COMPRA_DIA:
+    if perfil_frecuencia in ['frecuente', 'vip'] and rng.random() < PROB_DOBLE_COMPRA_DIA:
         if len(ventas) > 1:
-            venta_duplicar = random.choice(ventas[1:])  # No duplicar la primera
+            venta_duplicar = rng.choice(ventas[1:])  # No duplicar la primera
             venta_doble = venta_duplicar.copy()
             # Cambiar hora (ej: mañana y tarde)
-            hora_nueva = (venta_duplicar['fecha'].hour + random.randint(4, 8)) % 24
+            hora_nueva = (venta_duplicar['fecha'].hour + rng.randint(4, 8)) % 24
             venta_doble['fecha'] = venta_duplicar['fecha'].replace(hour=hora_nueva)
             ventas.append(venta_doble)
     
     return ventas
 
-def generar_tabla_ventas():
+def generar_tabla_ventas(df_clientes, fecha_inicio=FECHA_INICIO_NEGOCIO, fecha_fin=FECHA_HOY,
+                         modo_fechas=MODO_FECHAS):
     """Genera tabla completa de ventas"""
     todas_ventas = []
     
     print(f"Generando ventas para {len(df_clientes)} clientes...")
+    progreso = METRICAS.progreso('ventas', total=len(df_clientes), unidad='clientes')
     
     for idx, cliente in df_clientes.iterrows():
         # Asignar perfiles al cliente
@@ -315,13 +520,14 @@ def generar_tabla_ventas():
         
         # Generar ventas del cliente
         ventas_cliente = generar_ventas_cliente(
-            cliente, perfil_frec, perfil_pago, perfil_temp
+            cliente, perfil_frec, perfil_pago, perfil_temp,
+            fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, modo_fechas=modo_fechas
         )
         todas_ventas.extend(ventas_cliente)
-        
-        if (idx + 1) % 100 == 0:
-            print(f"  → {idx + 1} clientes procesados...")
+        progreso.avanzar()
     
+    progreso.cerrar()
+    METRICAS.contar('ventas.ventas', len(todas_ventas))
     # Convertir a DataFrame
     df_ventas = pd.DataFrame(todas_ventas)
     
@@ -338,35 +544,10 @@ def generar_tabla_ventas():
     return df_ventas
 
 
-df_ventas = generar_tabla_ventas()
-
 # ============================================================
-# ESTADÍSTICAS DE VENTAS
+# POPULARIDAD DE PRODUCTOS
 # ============================================================
 
-print("\n" + "="*60)
-print("ESTADÍSTICAS DE VENTAS:")
-print("="*60)
-print(f"Total ventas generadas: {len(df_ventas)}")
-print(f"Promedio ventas por cliente: {len(df_ventas) / len(df_clientes):.1f}")
-print(f"\nDistribución por medio de pago:")
-print(df_ventas['medio_pago'].value_counts())
-print(f"\nRango de fechas:")
-print(f"  Primera venta: {df_ventas['fecha'].min()}")
-print(f"  Última venta: {df_ventas['fecha'].max()}")
-
-print("\n" + "="*60)
-print("MUESTRA DE VENTAS:")
-print("="*60)
-print(df_ventas.head(15))
-
-# ============================================================
-# CARGAR PRODUCTOS Y ASIGNAR POPULARIDAD
-# ============================================================
-
-# Cargar productos desde Excel
-df_productos = pd.read_excel(r"C:\Users\renzo\OneDrive\Escritorio\BD_Proyecto_Aurelion\Productos.xlsx")
-
 def asignar_popularidad(df_productos):
     """Asigna nivel de popularidad a cada producto según criterios"""
     df = df_productos.copy()
@@ -403,177 +584,525 @@ def asignar_popularidad(df_productos):
     
     return df
 
-df_productos = asignar_popularidad(df_productos)
+# ============================================================
+# GENERACIÓN PARALELA (SHARDS DE CLIENTES)
+# ============================================================
+
+def semilla_cliente(id_cliente, semilla_base=SEMILLA):
+    """Deriva una semilla determinística a partir del id_cliente"""
+    clave = f"{semilla_base}:{int(id_cliente)}".encode()
+    return int.from_bytes(hashlib.blake2b(clave, digest_size=8).digest(), 'little')
+
+# Estado de cada proceso (se inicializa una vez por worker)
+_contexto_shard = {}
+
+def _iniciar_worker(df_productos, semilla_base, fecha_inicio=FECHA_INICIO_NEGOCIO, fecha_fin=FECHA_HOY,
+                    modo_fechas=MODO_FECHAS):
+    """Prepara el muestreador de productos y el rango de fechas en cada proceso"""
+    _contexto_shard['df_productos'] = df_productos
+    _contexto_shard['muestreador'] = MuestreadorPopularidad(df_productos, PROB_SELECCION_DETALLE)
+    _contexto_shard['semilla_base'] = semilla_base
+    _contexto_shard['fechas'] = {'fecha_inicio': fecha_inicio, 'fecha_fin': fecha_fin, 'modo_fechas': modo_fechas}
+
+def generar_shard_clientes(clientes):
+    """
+    Genera ventas y detalle de un grupo de clientes.
+    Cada cliente usa su propio generador aleatorio, así el resultado
+    no depende de cómo se repartan los clientes entre procesos.
+    """
+    df_productos = _contexto_shard['df_productos']
+    muestreador = _contexto_shard['muestreador']
+    semilla_base = _contexto_shard['semilla_base']
+    fechas = _contexto_shard['fechas']
+
+    ventas = []
+    detalles = []
+    for cliente in clientes:
+        rng = random.Random(semilla_cliente(cliente['id_cliente'], semilla_base))
+
+        perfil_frec = asignar_perfil(PERFILES_FRECUENCIA, rng)
+        perfil_pago = asignar_perfil(PERFILES_PAGO, rng)
+        perfil_temp = asignar_perfil(PERFILES_TEMPORAL, rng)
+        ventas_cliente = generar_ventas_cliente(cliente, perfil_frec, perfil_pago, perfil_temp, rng, **fechas)
+
+        for orden, venta in enumerate(ventas_cliente):
+            venta['_orden'] = orden
+            tipo_compra = determinar_tipo_compra_detalle(venta['medio_pago'], rng)
+            detalles_venta = generar_detalle_venta_mejorado(
+                {'id_venta': None}, tipo_compra, df_productos, muestreador, rng
+            )
+            for linea, detalle in enumerate(detalles_venta):
+                del detalle['id_venta']  # Se asigna al unir los shards
+                detalle['id_cliente'] = venta['id_cliente']
+                detalle['_orden'] = orden
+                detalle['_linea'] = linea
+            detalles.extend(detalles_venta)
+        ventas.extend(ventas_cliente)
+
+    return pd.DataFrame(ventas), pd.DataFrame(detalles)
+
+def unir_shards(shards):
+    """Une los shards y asigna id_venta / id_detalle en orden global"""
+    df_ventas = pd.concat([v for v, _ in shards], ignore_index=True)
+    df_detalle = pd.concat([d for _, d in shards], ignore_index=True)
+
+    # Orden total (fecha, cliente, orden dentro del cliente): no depende del número de shards
+    df_ventas = df_ventas.sort_values(['fecha', 'id_cliente', '_orden'], kind='mergesort')
+    df_ventas = df_ventas.reset_index(drop=True)
+    df_ventas.insert(0, 'id_venta', range(1, len(df_ventas) + 1))
+
+    df_detalle = df_detalle.merge(
+        df_ventas[['id_venta', 'id_cliente', '_orden']], on=['id_cliente', '_orden'], how='left'
+    )
+    df_detalle = df_detalle.sort_values(['id_venta', '_linea'], kind='mergesort').reset_index(drop=True)
+    df_detalle.insert(0, 'id_detalle', range(1, len(df_detalle) + 1))
+    df_detalle['precio_unitario'] = df_detalle['precio_unitario'].astype(float)
+    df_detalle['importe'] = df_detalle['importe'].astype(float)
+    df_detalle = df_detalle[['id_detalle', 'id_venta', 'id_producto', 'nombre_producto',
+                             'cantidad', 'precio_unitario', 'importe']]
+
+    df_ventas = df_ventas.drop(columns=['_orden'])
+    df_ventas['fecha'] = df_ventas['fecha'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    return df_ventas, df_detalle
+
+def generar_shards(df_clientes, df_productos, num_procesos=NUM_PROCESOS,
+                   semilla_base=SEMILLA, clientes_por_shard=CLIENTES_POR_SHARD,
+                   fecha_inicio=FECHA_INICIO_NEGOCIO, fecha_fin=FECHA_HOY, modo_fechas=MODO_FECHAS):
+    """
+    Genera (ventas, detalle) por lote de clientes, en orden.
+    Mantiene como máximo 2 shards por proceso en vuelo para acotar la memoria.
+    """
+    num_lotes = (len(df_clientes) + clientes_por_shard - 1) // clientes_por_shard
+    lotes = (
+        df_clientes.iloc[i:i + clientes_por_shard].to_dict('records')
+        for i in range(0, len(df_clientes), clientes_por_shard)
+    )
 
-print("\n" + "="*60)
-print("DISTRIBUCIÓN DE POPULARIDAD DE PRODUCTOS:")
-print("="*60)
-print(df_productos['popularidad'].value_counts().sort_index())
-print("\n10 Productos más populares:")
-print(df_productos[['nombre_producto', 'categoria', 'precio_unitario', 'popularidad']].head(10))
+    progreso = METRICAS.progreso('shards', total=num_lotes, unidad='shards')
+
+    if num_procesos <= 1:
+        _iniciar_worker(df_productos, semilla_base, fecha_inicio, fecha_fin, modo_fechas)
+        for lote in lotes:
+            shard = generar_shard_clientes(lote)
+            progreso.avanzar()
+            yield shard
+        progreso.cerrar()
+        return
+
+    # Las métricas de los workers quedan en cada proceso: acá solo se mide el avance por shard
+    with ProcessPoolExecutor(max_workers=num_procesos, initializer=_iniciar_worker,
+                             initargs=(df_productos, semilla_base, fecha_inicio, fecha_fin, modo_fechas)) as pool:
+        en_vuelo = deque()
+        for lote in lotes:
+            en_vuelo.append(pool.submit(generar_shard_clientes, lote))
+            if len(en_vuelo) >= 2 * num_procesos:
+                shard = en_vuelo.popleft().result()
+                progreso.avanzar()
+                yield shard
+        while en_vuelo:
+            shard = en_vuelo.popleft().result()
+            progreso.avanzar()
+            yield shard
+    progreso.cerrar()
+
+def generar_ventas_y_detalle_paralelo(df_clientes, df_productos, num_procesos=NUM_PROCESOS,
+                                      semilla_base=SEMILLA, clientes_por_shard=CLIENTES_POR_SHARD,
+                                      fecha_inicio=FECHA_INICIO_NEGOCIO, fecha_fin=FECHA_HOY,
+                                      modo_fechas=MODO_FECHAS):
+    """
+    Genera Ventas y Detalle_Ventas repartiendo los clientes en un pool de procesos.
+    La salida es idéntica para cualquier num_procesos.
+    """
+    print(f"Generando ventas y detalle para {len(df_clientes)} clientes ({num_procesos} procesos)...")
+
+    shards = list(generar_shards(df_clientes, df_productos, num_procesos, semilla_base,
+                                 clientes_por_shard, fecha_inicio, fecha_fin, modo_fechas))
+
+    df_ventas, df_detalle = unir_shards(shards)
+    print("✓ Generación completada!")
+    return df_ventas, df_detalle
 
 # ============================================================
-# CONFIGURACIÓN DE TIPOS DE COMPRA
+# GENERACIÓN EN STREAMING (MEMORIA ACOTADA)
 # ============================================================
 
-TIPOS_COMPRA = {
-    'rapida_snack': {
-        'peso': 0.30,
-        'num_productos': (1, 3),
-        'monto_min': 500,
-        'monto_max': 2000,
-    },
-    'diaria_basica': {
-        'peso': 0.40,
-        'num_productos': (3, 8),
-        'monto_min': 2000,
-        'monto_max': 5000,
-    },
-    'semanal': {
-        'peso': 0.25,
-        'num_productos': (8, 15),
-        'monto_min': 5000,
-        'monto_max': 12000,
-    },
-    'grande_mensual': {
-        'peso': 0.05,
-        'num_productos': (15, 25),
-        'monto_min': 12000,
-        'monto_max': 25000,
-    }
-}
+COLUMNAS_VENTAS = ['id_venta', 'id_cliente', 'fecha', 'nombre_cliente', 'email', 'medio_pago']
+COLUMNAS_DETALLE = ['id_detalle', 'id_venta', 'id_producto', 'nombre_producto',
+                    'cantidad', 'precio_unitario', 'importe']
 
-# Probabilidades de selección por popularidad
-PROB_SELECCION = {
-    'estrella': 0.45,
-    'alta': 0.30,
-    'media': 0.15,
-    'baja': 0.08,
-    'muy_baja': 0.02
-}
+def _volcar_run(ventas, detalles, carpeta_tmp, numero):
+    """Ordena un grupo de shards y lo escribe como run temporal"""
+    df_ventas = pd.concat(ventas, ignore_index=True)
+    df_detalle = pd.concat(detalles, ignore_index=True)
+
+    # Fecha con microsegundos para que el orden de texto coincida con el cronológico
+    df_ventas['fecha'] = df_ventas['fecha'].dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+    df_ventas = df_ventas.sort_values(['fecha', 'id_cliente', '_orden'], kind='mergesort')
+
+    df_detalle = df_detalle.merge(df_ventas[['id_cliente', '_orden', 'fecha']],
+                                  on=['id_cliente', '_orden'], how='left')
+    df_detalle = df_detalle.sort_values(['fecha', 'id_cliente', '_orden', '_linea'], kind='mergesort')
+    df_detalle['precio_unitario'] = df_detalle['precio_unitario'].astype(float)
+    df_detalle['importe'] = df_detalle['importe'].astype(float)
+
+    run_ventas = escribir_run(
+        df_ventas[['fecha', 'id_cliente', '_orden', 'nombre_cliente', 'email', 'medio_pago']],
+        os.path.join(carpeta_tmp, f"ventas_{numero}.csv")
+    )
+    run_detalle = escribir_run(
+        df_detalle[['fecha', 'id_cliente', '_orden', '_linea', 'id_producto', 'nombre_producto',
+                    'cantidad', 'precio_unitario', 'importe']],
+        os.path.join(carpeta_tmp, f"detalle_{numero}.csv")
+    )
+    return run_ventas, run_detalle
+
+def escribir_ventas_y_detalle_streaming(df_clientes, df_productos, carpeta,
+                                        num_procesos=NUM_PROCESOS, semilla_base=SEMILLA,
+                                        clientes_por_shard=CLIENTES_POR_SHARD,
+                                        ventas_por_run=VENTAS_POR_RUN, tamano_chunk=TAMANO_CHUNK,
+                                        fecha_inicio=FECHA_INICIO_NEGOCIO, fecha_fin=FECHA_HOY,
+                                        modo_fechas=MODO_FECHAS):
+    """
+    Genera Ventas.csv y Detalle_Ventas.csv sin tener las tablas completas en memoria.
+    Los shards se ordenan en runs temporales de `ventas_por_run` ventas, que luego
+    se fusionan asignando id_venta / id_detalle y se escriben en chunks.
+    La salida es la misma que la del modo paralelo.
+    """
+    print(f"Generando ventas y detalle en streaming para {len(df_clientes)} clientes...")
+
+    with tempfile.TemporaryDirectory(dir=carpeta) as carpeta_tmp:
+        runs = []
+        ventas, detalles, pendientes = [], [], 0
+        for df_v, df_d in generar_shards(df_clientes, df_productos, num_procesos, semilla_base,
+                                         clientes_por_shard, fecha_inicio, fecha_fin, modo_fechas):
+            ventas.append(df_v)
+            detalles.append(df_d)
+            pendientes += len(df_v)
+            if pendientes >= ventas_por_run:
+                runs.append(_volcar_run(ventas, detalles, carpeta_tmp, len(runs)))
+                ventas, detalles, pendientes = [], [], 0
+        if ventas:
+            runs.append(_volcar_run(ventas, detalles, carpeta_tmp, len(runs)))
+
+        print(f"  → Fusionando {len(runs)} runs ordenados...")
+        filas_ventas = fusionar_runs([v for v, _ in runs],
+                                     clave=lambda f: (f[0], int(f[1]), int(f[2])))
+        filas_detalle = fusionar_runs([d for _, d in runs],
+                                      clave=lambda f: (f[0], int(f[1]), int(f[2]), int(f[3])))
+
+        archivo_ventas = os.path.join(carpeta, "Ventas.csv")
+        archivo_detalle = os.path.join(carpeta, "Detalle_Ventas.csv")
+        with EscritorCSVPorChunks(archivo_ventas, COLUMNAS_VENTAS, tamano_chunk) as escritor_v, \
+             EscritorCSVPorChunks(archivo_detalle, COLUMNAS_DETALLE, tamano_chunk) as escritor_d:
+            detalle = next(filas_detalle, None)
+            id_detalle = 0
+            for id_venta, venta in enumerate(filas_ventas, start=1):
+                escritor_v.agregar([id_venta, venta[1], venta[0][:19], venta[3], venta[4], venta[5]])
+                # Las líneas de la venta vienen a continuación, con la misma clave
+                while detalle is not None and detalle[:3] == venta[:3]:
+                    id_detalle += 1
+                    escritor_d.agregar([id_detalle, id_venta] + detalle[4:])
+                    detalle = next(filas_detalle, None)
+
+    print("✓ Generación completada!")
+    print(f"✓ Ventas exportadas: {archivo_ventas} ({escritor_v.filas_escritas} registros)")
+    print(f"✓ Detalle_Ventas exportado: {archivo_detalle} ({escritor_d.filas_escritas} registros)")
+    return escritor_v.filas_escritas, escritor_d.filas_escritas
 
 # ============================================================
-# FUNCIONES DE GENERACIÓN
+# ETAPAS DEL PIPELINE
 # ============================================================
 
-def determinar_tipo_compra(medio_pago):
-    """Determina tipo de compra, influenciado por medio de pago"""
-    # Efectivo tiende a compras pequeñas
-    if medio_pago == 'efectivo':
-        pesos_ajustados = [0.50, 0.40, 0.08, 0.02]
-    # Transferencia tiende a compras grandes
-    elif medio_pago == 'transferencia':
-        pesos_ajustados = [0.10, 0.30, 0.40, 0.20]
-    # Otros medios: distribución normal
+def generar_clientes(config):
+    """Tabla de clientes según la configuración (fecha_alta como datetime)"""
+    if config.modo_clientes == 'lotes':
+        df_clientes = generar_tabla_clientes_por_lotes(config.num_clientes, config.semilla,
+                                                       fecha_inicio=config.fecha_inicio,
+                                                       fecha_fin=config.fecha_fin)
     else:
-        pesos_ajustados = [v['peso'] for v in TIPOS_COMPRA.values()]
-    
-    tipos = list(TIPOS_COMPRA.keys())
-    return random.choices(tipos, weights=pesos_ajustados, k=1)[0]
+        df_clientes = generar_tabla_clientes(config.num_clientes, config.fecha_inicio, config.fecha_fin)
 
-def seleccionar_producto_por_popularidad():
-    """Selecciona un producto respetando probabilidades de popularidad"""
-    popularidades = list(PROB_SELECCION.keys())
-    probs = list(PROB_SELECCION.values())
-    
-    popularidad_elegida = random.choices(popularidades, weights=probs, k=1)[0]
-    productos_disponibles = df_productos[df_productos['popularidad'] == popularidad_elegida]
-    
-    if len(productos_disponibles) > 0:
-        return productos_disponibles.sample(1).iloc[0]
+    df_clientes['fecha_alta'] = pd.to_datetime(df_clientes['fecha_alta'])
+    return df_clientes
+
+def imprimir_estadisticas_clientes(df_clientes):
+    print("\n" + "="*60)
+    print("ESTADÍSTICAS DE CLIENTES:")
+    print("="*60)
+    print(f"Total clientes: {len(df_clientes)}")
+    print(f"Ciudades únicas: {df_clientes['ciudad'].nunique()}")
+    print(f"\nDistribución por barrio:")
+    print(df_clientes['ciudad'].value_counts())
+    print(f"\nRango de fechas de registro:")
+    print(f"  Primera alta: {df_clientes['fecha_alta'].min()}")
+    print(f"  Última alta: {df_clientes['fecha_alta'].max()}")
+
+    print("\n" + "="*60)
+    print("MUESTRA DE CLIENTES:")
+    print("="*60)
+    print(df_clientes.head(10))
+
+def cargar_productos(config):
+    """Productos (Excel/CSV del directorio de datos, con caché) con popularidad asignada"""
+    return asignar_popularidad(cargar_tabla('productos', config.directorio_datos))
+
+def imprimir_popularidad(df_productos):
+    print("\n" + "="*60)
+    print("DISTRIBUCIÓN DE POPULARIDAD DE PRODUCTOS:")
+    print("="*60)
+    print(df_productos['popularidad'].value_counts().sort_index())
+    print("\n10 Productos más populares:")
+    print(df_productos[['nombre_producto', 'categoria', 'precio_unitario', 'popularidad']].head(10))
+
+def generar_ventas_y_detalle(config, df_clientes, df_productos):
+    """Ventas y Detalle_Ventas en memoria (en paralelo o secuencial según la configuración)"""
+    if config.modo_paralelo:
+        return generar_ventas_y_detalle_paralelo(
+            df_clientes, df_productos, config.num_procesos, config.semilla,
+            config.clientes_por_shard, config.fecha_inicio, config.fecha_fin, config.modo_fechas
+        )
+
+    df_ventas = generar_tabla_ventas(df_clientes, config.fecha_inicio, config.fecha_fin, config.modo_fechas)
+    if config.modo_detalle == 'lotes':
+        df_detalle = generar_tabla_detalle_ventas_por_lotes(df_ventas, df_productos, seed=config.semilla)
     else:
-        return df_productos.sample(1).iloc[0]
-
-def calcular_cantidad(precio_unitario):
-    """Calcula cantidad realista según el precio del producto"""
-    if precio_unitario < 2000:
-        return random.randint(1, 4)  # Productos baratos: más cantidad
-    elif precio_unitario < 4000:
-        return random.randint(1, 3)  # Productos medios
+        df_detalle = generar_tabla_detalle_ventas_mejorada(df_ventas, df_productos)
+    return df_ventas, df_detalle
+
+def imprimir_estadisticas_ventas(df_ventas, num_clientes):
+    print("\n" + "="*60)
+    print("ESTADÍSTICAS DE VENTAS:")
+    print("="*60)
+    print(f"Total ventas generadas: {len(df_ventas)}")
+    print(f"Promedio ventas por cliente: {len(df_ventas) / num_clientes:.1f}")
+    print(f"\nDistribución por medio de pago:")
+    print(df_ventas['medio_pago'].value_counts())
+    print(f"\nRango de fechas:")
+    print(f"  Primera venta: {df_ventas['fecha'].min()}")
+    print(f"  Última venta: {df_ventas['fecha'].max()}")
+
+    print("\n" + "="*60)
+    print("MUESTRA DE VENTAS:")
+    print("="*60)
+    print(df_ventas.head(15))
+
+def imprimir_resumen_exportacion(carpeta, formato, registros):
+    print("\n" + "="*60)
+    print("RESUMEN DE EXPORTACIÓN:")
+    print("="*60)
+    print(f"Carpeta destino: {carpeta}")
+    print(f"\nArchivos generados ({formato}):")
+    for nombre, n in registros.items():
+        print(f"  - {nombre} ({n} registros)")
+    print("\n✓ Exportación completada exitosamente!")
+
+def exportar_tablas(config, df_clientes, df_productos, df_ventas, df_detalle):
+    """Exporta las cuatro tablas en memoria al formato y esquema de la configuración"""
+    carpeta = config.carpeta_salida
+    os.makedirs(carpeta, exist_ok=True)
+
+    if config.esquema_salida == 'ancho':
+        # Los atributos de las dimensiones se unen recién al exportar
+        df_ventas = expandir_ventas(df_ventas, df_clientes)
+        df_detalle = expandir_detalle(df_detalle, df_productos)
+
+    print("\n" + "="*60)
+    print("EXPORTANDO TABLAS...")
+    print("="*60)
+
+    tablas = [('Clientes', df_clientes), ('Productos', df_productos),
+              ('Ventas', df_ventas), ('Detalle_Ventas', df_detalle)]
+
+    if config.formato_salida == 'parquet':
+        # Parquet tipado (Ventas y Detalle_Ventas particionados por año-mes)
+        anio_mes = anio_mes_por_venta(df_ventas)
+        for nombre, df in tablas:
+            ruta = exportar_parquet(df, nombre, carpeta, anio_mes=anio_mes)
+            print(f"✓ {nombre} exportado: {ruta}")
+    elif config.formato_salida == 'sqlite':
+        # Base embebida cargada en una sola transacción (índices al final)
+        ruta_bd = cargar_base(os.path.join(carpeta, ARCHIVO_BD),
+                              df_clientes, df_productos, df_ventas, df_detalle)
+        print(f"✓ Base SQLite generada: {ruta_bd}")
     else:
-        return random.randint(1, 2)  # Productos caros: menos cantidad
+        for nombre, df in tablas:
+            archivo = os.path.join(carpeta, f"{nombre}.csv")
+            df.to_csv(archivo, index=False, encoding='utf-8-sig')
+            print(f"✓ {nombre} exportado: {archivo}")
 
-def generar_detalle_venta(venta, tipo_compra):
-    """Genera el detalle completo de una venta"""
-    config = TIPOS_COMPRA[tipo_compra]
-    num_productos = random.randint(config['num_productos'][0], config['num_productos'][1])
-    
-    detalles = []
-    productos_seleccionados = set()
-    
-    for _ in range(num_productos):
-        # Seleccionar producto (evitar duplicados en misma venta)
-        intentos = 0
-        while intentos < 10:
-            producto = seleccionar_producto_por_popularidad()
-            if producto['id_producto'] not in productos_seleccionados:
-                productos_seleccionados.add(producto['id_producto'])
-                break
-            intentos += 1
-        
-        # Si no encontró único, usar el último
-        cantidad = calcular_cantidad(producto['precio_unitario'])
-        importe = cantidad * producto['precio_unitario']
-        
-        detalle = {
-            'id_venta': venta['id_venta'],
-            'id_producto': producto['id_producto'],
-            'nombre_producto': producto['nombre_producto'],
-            'cantidad': cantidad,
-            'precio_unitario': producto['precio_unitario'],
-            'importe': importe
-        }
-        detalles.append(detalle)
-    
-    return detalles
+    imprimir_resumen_exportacion(carpeta, config.formato_salida,
+                                 {nombre: len(df) for nombre, df in tablas})
+
+def exportar_en_streaming(config, df_clientes, df_productos):
+    """Genera y exporta Ventas / Detalle_Ventas en streaming (memoria acotada)"""
+    carpeta = config.carpeta_salida
+    os.makedirs(carpeta, exist_ok=True)
 
-df_detalle_nuevo = generar_tabla_detalle_ventas_mejorada(df_ventas, df_productos)
+    if config.formato_salida == 'parquet':
+        for nombre, df in [('Clientes', df_clientes), ('Productos', df_productos)]:
+            print(f"✓ {nombre} exportado: {exportar_parquet(df, nombre, carpeta)}")
+    elif config.formato_salida == 'sqlite':
+        ruta_bd = os.path.join(carpeta, ARCHIVO_BD)
+        conexion = crear_base(ruta_bd)
+        insertar_tabla(conexion, 'clientes', df_clientes)
+        insertar_tabla(conexion, 'productos', df_productos)
+    else:
+        for nombre, df in [('Clientes', df_clientes), ('Productos', df_productos)]:
+            archivo = os.path.join(carpeta, f"{nombre}.csv")
+            df.to_csv(archivo, index=False, encoding='utf-8-sig')
+            print(f"✓ {nombre} exportado: {archivo}")
 
-# 3. Validar calidad
-validar_detalle_ventas(df_detalle_nuevo, df_ventas)
+    n_ventas, n_detalle = escribir_ventas_y_detalle_streaming(
+        df_clientes, df_productos, carpeta, config.num_procesos, config.semilla,
+        config.clientes_por_shard, config.ventas_por_run, config.tamano_chunk,
+        config.fecha_inicio, config.fecha_fin, config.modo_fechas
+    )
+
+    archivo_ventas = os.path.join(carpeta, "Ventas.csv")
+    archivo_detalle = os.path.join(carpeta, "Detalle_Ventas.csv")
+    if config.formato_salida == 'parquet':
+        # Convertir por chunks los CSV recién escritos
+        anio_mes = anio_mes_por_venta(
+            pd.read_csv(archivo_ventas, encoding='utf-8-sig', usecols=['id_venta', 'fecha'])
+        )
+        print(f"✓ Ventas exportadas: {convertir_csv_a_parquet(archivo_ventas, 'Ventas', carpeta)}")
+        print(f"✓ Detalle_Ventas exportado: "
+              f"{convertir_csv_a_parquet(archivo_detalle, 'Detalle_Ventas', carpeta, anio_mes)}")
+        os.remove(archivo_ventas)
+        os.remove(archivo_detalle)
+    elif config.formato_salida == 'sqlite':
+        # Insertar por chunks los CSV recién escritos (misma transacción que las dimensiones)
+        with conexion:
+            cargar_csv(conexion, 'ventas', archivo_ventas)
+            cargar_csv(conexion, 'detalle_ventas', archivo_detalle)
+        finalizar_carga(conexion)
+        conexion.close()
+        os.remove(archivo_ventas)
+        os.remove(archivo_detalle)
+        print(f"✓ Base SQLite generada: {ruta_bd}")
+
+    imprimir_resumen_exportacion(carpeta, config.formato_salida, {
+        'Clientes': len(df_clientes), 'Productos': len(df_productos),
+        'Ventas': n_ventas, 'Detalle_Ventas': n_detalle,
+    })
 
 # ============================================================
-# EXPORTACIÓN DE TABLAS A ESCRITORIO
+# EJECUCIÓN
 # ============================================================
 
-# Ruta de destino
-ruta_escritorio = r"C:\Users\renzo\OneDrive\Escritorio"
-
-# Crear carpeta para el proyecto (opcional)
-carpeta_proyecto = os.path.join(ruta_escritorio, "BD_Aurelion")
-os.makedirs(carpeta_proyecto, exist_ok=True)
-
-print("\n" + "="*60)
-print("EXPORTANDO TABLAS...")
-print("="*60)
-
-# Exportar Clientes
-archivo_clientes = os.path.join(carpeta_proyecto, "Clientes.csv")
-df_clientes.to_csv(archivo_clientes, index=False, encoding='utf-8-sig')
-print(f"✓ Clientes exportados: {archivo_clientes}")
-
-# Exportar Productos (con popularidad agregada)
-archivo_productos = os.path.join(carpeta_proyecto, "Productos.csv")
-df_productos.to_csv(archivo_productos, index=False, encoding='utf-8-sig')
-print(f"✓ Productos exportados: {archivo_productos}")
-
-# Exportar Ventas
-archivo_ventas = os.path.join(carpeta_proyecto, "Ventas.csv")
-df_ventas.to_csv(archivo_ventas, index=False, encoding='utf-8-sig')
-print(f"✓ Ventas exportadas: {archivo_ventas}")
-
-# Exportar Detalle_Ventas
-archivo_detalle = os.path.join(carpeta_proyecto, "Detalle_Ventas.csv")
-df_detalle_nuevo.to_csv(archivo_detalle, index=False, encoding='utf-8-sig')
-print(f"✓ Detalle_Ventas exportado: {archivo_detalle}")
-
-print("\n" + "="*60)
-print("RESUMEN DE EXPORTACIÓN:")
-print("="*60)
-print(f"Carpeta destino: {carpeta_proyecto}")
-print(f"\nArchivos generados:")
-print(f"  - Clientes.csv ({len(df_clientes)} registros)")
-print(f"  - Productos.csv ({len(df_productos)} registros)")
-print(f"  - Ventas.csv ({len(df_ventas)} registros)")
-print(f"  - Detalle_Ventas.csv ({len(df_detalle_nuevo)} registros)")
-print("\n✓ Exportación completada exitosamente!")
\ No newline at end of file
+def ejecutar(config=None):
+    """
+    Corre el pipeline completo: clientes, productos, ventas, detalle,
+    validación y exportación. Devuelve las tablas generadas en forma compacta
+    (ver compacto; en streaming, Ventas y Detalle_Ventas quedan solo en disco
+    y se devuelven como None).
+    """
+    config = config or ConfiguracionGeneracion()
+    random.seed(config.semilla)
+    if config.modo_clientes == 'fila':
+        obtener_faker().seed_instance(config.semilla)
+
+    if config.archivo_metricas:
+        METRICAS.reiniciar()
+        METRICAS.activar()
+    carpeta_perfiles = os.path.join(os.path.dirname(config.archivo_metricas or '') or '.', 'perfiles')
+
+    def etapa(nombre):
+        return METRICAS.etapa(nombre, config.perfilar, config.medir_memoria, carpeta_perfiles)
+
+    try:
+        with etapa('clientes'):
+            df_clientes = generar_clientes(config)
+        imprimir_estadisticas_clientes(df_clientes)
+
+        with etapa('productos'):
+            df_productos = cargar_productos(config)
+        imprimir_popularidad(df_productos)
+
+        if config.modo_streaming:
+            with etapa('ventas_y_detalle_streaming'):
+                exportar_en_streaming(config, df_clientes, df_productos)
+            return df_clientes, df_productos, None, None
+
+        with etapa('ventas_y_detalle'):
+            df_ventas, df_detalle = generar_ventas_y_detalle(config, df_clientes, df_productos)
+        with etapa('compactacion'):
+            df_clientes, df_productos, df_ventas, df_detalle = compactar_tablas(
+                df_clientes, df_productos, df_ventas, df_detalle
+            )
+        imprimir_estadisticas_ventas(df_ventas, len(df_clientes))
+
+        with etapa('validacion'):
+            validar_detalle_ventas(df_detalle, df_ventas)
+
+        with etapa('exportacion'):
+            exportar_tablas(config, df_clientes, df_productos, df_ventas, df_detalle)
+        return df_clientes, df_productos, df_ventas, df_detalle
+    finally:
+        if config.archivo_metricas:
+            print(f"📈 Métricas exportadas: {METRICAS.exportar(config.archivo_metricas)}")
+            METRICAS.activar(False)
+
+def fecha_argumento(texto):
+    """Fecha AAAA-MM-DD de la línea de comandos"""
+    try:
+        return datetime.strptime(texto, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Fecha inválida: {texto} (usar AAAA-MM-DD)")
+
+def parsear_argumentos(argv=None):
+    """Construye la configuración a partir de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Genera la base de datos sintética de Aurelion")
+    parser.add_argument('--clientes', type=int, default=NUM_CLIENTES, help="Cantidad de clientes")
+    parser.add_argument('--desde', type=fecha_argumento, default=FECHA_INICIO_NEGOCIO,
+                        help="Inicio del negocio (AAAA-MM-DD)")
+    parser.add_argument('--hasta', type=fecha_argumento, default=FECHA_HOY,
+                        help="Última fecha de ventas (AAAA-MM-DD)")
+    parser.add_argument('--semilla', type=int, default=SEMILLA)
+    parser.add_argument('--salida', default=CARPETA_SALIDA, help="Carpeta de destino")
+    parser.add_argument('--formato', choices=FORMATOS_SALIDA, default=FORMATO_SALIDA)
+    parser.add_argument('--esquema', choices=ESQUEMAS_SALIDA, default=ESQUEMA_SALIDA,
+                        help="Ventas / Detalle_Ventas con atributos de las dimensiones (ancho) o solo ids")
+    parser.add_argument('--datos', default=None, help="Carpeta con Productos.xlsx/.csv")
+    parser.add_argument('--modo-clientes', choices=MODOS_GENERACION, default=MODO_CLIENTES)
+    parser.add_argument('--modo-fechas', choices=MODOS_GENERACION, default=MODO_FECHAS)
+    parser.add_argument('--modo-detalle', choices=MODOS_GENERACION, default=MODO_DETALLE)
+    parser.add_argument('--paralelo', action='store_true', default=MODO_PARALELO,
+                        help="Ventas + detalle en un pool de procesos")
+    parser.add_argument('--procesos', type=int, default=NUM_PROCESOS)
+    parser.add_argument('--streaming', action='store_true', default=MODO_STREAMING,
+                        help="Escribe Ventas / Detalle_Ventas por chunks (memoria acotada)")
+    parser.add_argument('--metricas', default=None,
+                        help="Archivo de métricas por etapa: .json o .prom (texto de Prometheus)")
+    parser.add_argument('--perfilar', action='store_true', help="Perfil cProfile por etapa (con --metricas)")
+    parser.add_argument('--memoria', action='store_true', help="Pico de tracemalloc por etapa (con --metricas)")
+    args = parser.parse_args(argv)
+
+    try:
+        return ConfiguracionGeneracion(
+            num_clientes=args.clientes,
+            fecha_inicio=args.desde,
+            fecha_fin=args.hasta,
+            semilla=args.semilla,
+            carpeta_salida=args.salida,
+            formato_salida=args.formato,
+            esquema_salida=args.esquema,
+            directorio_datos=args.datos,
+            modo_clientes=args.modo_clientes,
+            modo_fechas=args.modo_fechas,
+            modo_detalle=args.modo_detalle,
+            modo_paralelo=args.paralelo,
+            num_procesos=args.procesos,
+            modo_streaming=args.streaming,
+            archivo_metricas=args.metricas,
+            perfilar=args.perfilar,
+            medir_memoria=args.memoria,
+        )
+    except ValueError as error:
+        parser.error(str(error))
+
+def main(argv=None):
+    ejecutar(parsear_argumentos(argv))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+# ============================================================
+# ALMACÉN COLUMNAR DE DETALLE_VENTAS (MEMORY-MAPPED)
+# ============================================================
+#
+# Cada columna numérica de Detalle_Ventas se guarda como un arreglo binario de
+# ancho fijo (<columna>.bin) y offsets.bin indexa las líneas por id_venta: las
+# líneas de la venta v son las filas [offsets[v], offsets[v + 1]).
+# Las columnas se abren con np.memmap, sin parsear ni copiar, y se leen solo
+# las que se usan (el sistema operativo pagina lo necesario, aunque el detalle
+# no entre en RAM):
+#
+#   almacen = obtener_almacen('Base de datos')
+#   almacen.lineas(1234)['importe']        # vista de la venta 1234, O(1)
+#   almacen.idxmax_por_venta('cantidad')   # como groupby('id_venta')[...].idxmax()
+#   almacen.histograma('importe', bins=30)
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from cargador_datos import CARPETA_CACHE, buscar_archivo, cargar_tabla
+
+
+CARPETA_ALMACEN = 'detalle_columnar'
+VERSION_ALMACEN = 1
+TAMANO_CHUNK = 1_000_000
+
+# Columnas guardadas y su tipo en disco (nombre_producto se une desde Productos)
+TIPOS_COLUMNAS = {
+    'id_detalle': np.int32,
+    'id_venta': np.int32,
+    'id_producto': np.int32,
+    'cantidad': np.int16,
+    'precio_unitario': np.float64,
+    'importe': np.float64,
+}
+
+# ============================================================
+# CONSTRUCCIÓN
+# ============================================================
+
+def _convertir(serie, columna):
+    """Arreglo de la columna con el tipo del almacén (error si hay nulos o no entra)"""
+    if serie.isna().any():
+        raise ValueError(f"La columna {columna} tiene valores nulos")
+    valores = serie.to_numpy()
+    convertidos = valores.astype(TIPOS_COLUMNAS[columna])
+    if not np.array_equal(convertidos, valores):
+        raise ValueError(f"La columna {columna} no entra en {np.dtype(TIPOS_COLUMNAS[columna])}")
+    return convertidos
+
+
+def _escribir_columnas(chunks, carpeta):
+    """
+    Vuelca los chunks (ordenados por id_venta) a un .bin por columna y devuelve
+    (filas, conteo de líneas por id_venta).
+    """
+    archivos = {c: open(os.path.join(carpeta, f"{c}.bin"), 'wb') for c in TIPOS_COLUMNAS}
+    conteo = np.zeros(1024, dtype=np.int64)
+    filas, ultimo_id = 0, -1
+    try:
+        for chunk in chunks:
+            if len(chunk) == 0:
+                continue
+            ids = _convertir(chunk['id_venta'], 'id_venta')
+            if ids[0] < ultimo_id or (len(ids) > 1 and (np.diff(ids) < 0).any()):
+                raise ValueError("Detalle_Ventas debe estar ordenado por id_venta")
+            if ids[0] < 0:
+                raise ValueError("id_venta no puede ser negativo")
+            ultimo_id = int(ids[-1])
+
+            for columna in TIPOS_COLUMNAS:
+                valores = ids if columna == 'id_venta' else _convertir(chunk[columna], columna)
+                archivos[columna].write(valores.tobytes())
+
+            if ultimo_id + 1 > len(conteo):
+                nuevo = np.zeros(max(ultimo_id + 1, 2 * len(conteo)), dtype=np.int64)
+                nuevo[:len(conteo)] = conteo
+                conteo = nuevo
+            conteo[:ultimo_id + 1] += np.bincount(ids, minlength=ultimo_id + 1)
+            filas += len(ids)
+    finally:
+        for archivo in archivos.values():
+            archivo.close()
+    return filas, conteo[:ultimo_id + 1]
+
+
+def construir_almacen(chunks, carpeta, origen=None):
+    """
+    Construye el almacén en `carpeta` a partir de DataFrames de detalle
+    ordenados por id_venta (se escribe en una carpeta temporal y se reemplaza
+    al final, así un almacén a medio escribir nunca queda visible).
+    """
+    temporal = carpeta + '.tmp'
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+
+    try:
+        filas, conteo = _escribir_columnas(chunks, temporal)
+    except Exception:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+    offsets = np.zeros(len(conteo) + 1, dtype=np.int64)
+    np.cumsum(conteo, out=offsets[1:])
+    offsets.tofile(os.path.join(temporal, 'offsets.bin'))
+
+    meta = {
+        'version': VERSION_ALMACEN,
+        'filas': filas,
+        'max_id_venta': len(conteo) - 1,
+        'columnas': {c: np.dtype(t).str for c, t in TIPOS_COLUMNAS.items()},
+        'origen': origen,
+    }
+    with open(os.path.join(temporal, 'meta.json'), 'w', encoding='utf-8') as archivo:
+        json.dump(meta, archivo, indent=2)
+
+    shutil.rmtree(carpeta, ignore_errors=True)
+    os.replace(temporal, carpeta)
+    return AlmacenDetalle(carpeta)
+
+
+def construir_desde_csv(ruta, carpeta, tamano_chunk=TAMANO_CHUNK, origen=None):
+    """Construye el almacén leyendo el CSV por chunks (memoria acotada)"""
+    chunks = pd.read_csv(ruta, encoding='utf-8-sig', usecols=list(TIPOS_COLUMNAS), chunksize=tamano_chunk)
+    return construir_almacen(chunks, carpeta, origen)
+
+
+def _firma_origen(ruta):
+    """Identifica la versión del archivo fuente (nombre, mtime y tamaño)"""
+    estado = os.stat(ruta)
+    return {'archivo': os.path.basename(ruta), 'mtime_ns': estado.st_mtime_ns, 'tamano': estado.st_size}
+
+
+def obtener_almacen(directorio=None, tamano_chunk=TAMANO_CHUNK, reconstruir=False):
+    """
+    Abre el almacén de Detalle_Ventas del directorio de datos (en .cache, como
+    cargador_datos), construyéndolo si falta o si cambió el archivo fuente.
+    """
+    ruta = buscar_archivo('detalle_ventas', directorio)
+    carpeta = os.path.join(os.path.dirname(ruta), CARPETA_CACHE, CARPETA_ALMACEN)
+    firma = _firma_origen(ruta)
+
+    if not reconstruir and os.path.exists(os.path.join(carpeta, 'meta.json')):
+        almacen = AlmacenDetalle(carpeta)
+        if almacen.meta.get('version') == VERSION_ALMACEN and almacen.meta.get('origen') == firma:
+            return almacen
+
+    print(f"🔧 Construyendo almacén columnar de {os.path.basename(ruta)}...")
+    inicio = time.perf_counter()
+    if ruta.lower().endswith('.csv'):
+        almacen = construir_desde_csv(ruta, carpeta, tamano_chunk, firma)
+    else:
+        detalle = cargar_tabla('detalle_ventas', directorio).sort_values('id_venta', kind='mergesort')
+        almacen = construir_almacen([detalle], carpeta, firma)
+    print(f"✓ {almacen.filas:,} líneas en {time.perf_counter() - inicio:.2f} s: {carpeta}")
+    return almacen
+
+# ============================================================
+# LECTURA
+# ============================================================
+
+class AlmacenDetalle:
+    """Columnas de Detalle_Ventas mapeadas en memoria, con índice por id_venta"""
+
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        with open(os.path.join(carpeta, 'meta.json'), encoding='utf-8') as archivo:
+            self.meta = json.load(archivo)
+        self.filas = self.meta['filas']
+        self.columnas = list(self.meta['columnas'])
+        self._mapas = {}
+        self.offsets = self._mapear('offsets', np.int64, self.meta['max_id_venta'] + 2)
+
+    def _mapear(self, nombre, tipo, filas):
+        if filas == 0:
+            return np.empty(0, dtype=tipo)
+        return np.memmap(os.path.join(self.carpeta, f"{nombre}.bin"), dtype=tipo, mode='r', shape=(filas,))
+
+    def __len__(self):
+        return self.filas
+
+    def columna(self, nombre):
+        """Arreglo de solo lectura de la columna (se mapea una vez, al primer uso)"""
+        if nombre not in self._mapas:
+            if nombre not in self.meta['columnas']:
+                raise KeyError(f"Columna desconocida: {nombre} (disponibles: {', '.join(self.columnas)})")
+            self._mapas[nombre] = self._mapear(nombre, np.dtype(self.meta['columnas'][nombre]), self.filas)
+        return self._mapas[nombre]
+
+    def rango_venta(self, id_venta):
+        """(inicio, fin) de las filas de la venta; (0, 0) si no existe"""
+        if not 0 <= id_venta < len(self.offsets) - 1:
+            return 0, 0
+        return int(self.offsets[id_venta]), int(self.offsets[id_venta + 1])
+
+    def lineas(self, id_venta, columnas=None):
+        """Vistas (sin copia) de las líneas de una venta, por columna"""
+        inicio, fin = self.rango_venta(id_venta)
+        return {c: self.columna(c)[inicio:fin] for c in (columnas or self.columnas)}
+
+    def lineas_por_venta(self):
+        """Cantidad de líneas de cada id_venta (0 si no existe)"""
+        return np.diff(self.offsets)
+
+    def a_dataframe(self, columnas=None, inicio=0, fin=None):
+        """DataFrame de un rango de filas (copia solo las columnas pedidas)"""
+        return pd.DataFrame({c: np.asarray(self.columna(c)[inicio:fin]) for c in (columnas or self.columnas)})
+
+    # ------------------------------------------------------------
+    # Agregaciones por venta (sin groupby: las líneas son contiguas)
+    # ------------------------------------------------------------
+
+    def _inicios_con_lineas(self):
+        """id_venta con al menos una línea y la fila donde empieza cada una"""
+        conteo = self.lineas_por_venta()
+        ids = np.flatnonzero(conteo)
+        return ids, self.offsets[ids]
+
+    def suma_por_venta(self, nombre):
+        """Serie id_venta -> suma de la columna (ej. total de la venta con 'importe')"""
+        ids, inicios = self._inicios_con_lineas()
+        if len(ids) == 0:
+            return pd.Series(dtype=np.float64, name=nombre)
+        return pd.Series(np.add.reduceat(self.columna(nombre), inicios), index=ids, name=nombre)
+
+    def _bloques_de_ventas(self, inicios, tamano_bloque):
+        """Cortes [a, b) de ventas consecutivas (con líneas) de unas tamano_bloque filas cada uno"""
+        cortes = np.searchsorted(inicios, np.arange(tamano_bloque, self.filas, tamano_bloque))
+        cortes = np.unique(np.r_[0, cortes, len(inicios)])
+        return zip(cortes[:-1].tolist(), cortes[1:].tolist())
+
+    def idxmax_por_venta(self, nombre, tamano_bloque=TAMANO_CHUNK):
+        """
+        Serie id_venta -> fila de la primera línea con el máximo de la columna,
+        igual que detalle.groupby('id_venta')[nombre].idxmax() con índice 0..n-1.
+        Recorre la columna por bloques de ventas completas (memoria acotada por el bloque).
+        """
+        ids, inicios = self._inicios_con_lineas()
+        if len(ids) == 0:
+            return pd.Series(dtype=np.int64, name=nombre)
+        inicios = np.asarray(inicios)
+        columna = self.columna(nombre)
+        resultado = np.empty(len(ids), dtype=np.int64)
+        for a, b in self._bloques_de_ventas(inicios, tamano_bloque):
+            inicio = int(inicios[a])
+            fin = int(inicios[b]) if b < len(inicios) else self.filas
+            valores = np.asarray(columna[inicio:fin])
+            locales = inicios[a:b] - inicio
+            largos = np.diff(np.r_[locales, fin - inicio])
+            maximos = np.maximum.reduceat(valores, locales)
+            # Primera fila del bloque que alcanza el máximo de su venta
+            filas = np.where(valores == np.repeat(maximos, largos), np.arange(fin - inicio), fin - inicio)
+            resultado[a:b] = np.minimum.reduceat(filas, locales) + inicio
+        return pd.Series(resultado, index=ids, name=nombre)
+
+    def histograma(self, nombre, bins=30, tamano_bloque=TAMANO_CHUNK):
+        """(conteos, bordes) de la columna, recorriéndola por bloques"""
+        valores = self.columna(nombre)
+        if len(valores) == 0:
+            return np.histogram(np.empty(0), bins=bins)
+        minimo = min(valores[i:i + tamano_bloque].min() for i in range(0, len(valores), tamano_bloque))
+        maximo = max(valores[i:i + tamano_bloque].max() for i in range(0, len(valores), tamano_bloque))
+        bordes = np.histogram_bin_edges(np.array([minimo, maximo], dtype=np.float64), bins=bins)
+        conteos = np.zeros(len(bordes) - 1, dtype=np.int64)
+        for i in range(0, len(valores), tamano_bloque):
+            conteos += np.histogram(valores[i:i + tamano_bloque], bins=bordes)[0]
+        return conteos, bordes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construye el almacén columnar de Detalle_Ventas")
+    parser.add_argument('directorio', nargs='?', default=None, help="Carpeta con las tablas")
+    parser.add_argument('--chunk', type=int, default=TAMANO_CHUNK, help="Filas por chunk")
+    parser.add_argument('--reconstruir', action='store_true', help="Ignora el almacén existente")
+    args = parser.parse_args()
+
+    almacen = obtener_almacen(args.directorio, args.chunk, args.reconstruir)
+    print(f"📦 {len(almacen):,} líneas · {len(almacen.offsets) - 1:,} ids de venta · "
+          f"columnas: {', '.join(almacen.columnas)}")
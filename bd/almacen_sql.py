@@ -0,0 +1,227 @@
+# ============================================================
+# ALMACÉN SQL EMBEBIDO (SQLITE) CON MODELO ESTRELLA
+# ============================================================
+
+import os
+import sqlite3
+
+import pandas as pd
+
+
+ARCHIVO_BD = 'Aurelion.db'
+TAMANO_LOTE = 100_000
+
+# Dimensiones (Clientes, Productos) y hechos (Ventas, Detalle_Ventas) con PK / FK
+ESQUEMA = """
+CREATE TABLE clientes (
+    id_cliente      INTEGER PRIMARY KEY,
+    nombre_cliente  TEXT,
+    email           TEXT,
+    ciudad          TEXT,
+    fecha_alta      TEXT
+);
+CREATE TABLE productos (
+    id_producto     INTEGER PRIMARY KEY,
+    nombre_producto TEXT,
+    categoria       TEXT,
+    precio_unitario REAL,
+    score_pop       INTEGER,
+    popularidad     TEXT
+);
+CREATE TABLE ventas (
+    id_venta        INTEGER PRIMARY KEY,
+    id_cliente      INTEGER NOT NULL REFERENCES clientes (id_cliente),
+    fecha           TEXT NOT NULL,
+    nombre_cliente  TEXT,
+    email           TEXT,
+    medio_pago      TEXT
+);
+CREATE TABLE detalle_ventas (
+    id_detalle      INTEGER PRIMARY KEY,
+    id_venta        INTEGER NOT NULL REFERENCES ventas (id_venta),
+    id_producto     INTEGER NOT NULL REFERENCES productos (id_producto),
+    nombre_producto TEXT,
+    cantidad        INTEGER,
+    precio_unitario REAL,
+    importe         REAL
+);
+"""
+
+# Se crean después de la carga masiva (más rápido que mantenerlos fila a fila)
+INDICES = """
+CREATE INDEX IF NOT EXISTS idx_ventas_cliente ON ventas (id_cliente, fecha);
+CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas (fecha, id_cliente);
+CREATE INDEX IF NOT EXISTS idx_detalle_venta ON detalle_ventas (id_venta, importe);
+CREATE INDEX IF NOT EXISTS idx_detalle_producto ON detalle_ventas (id_producto);
+CREATE INDEX IF NOT EXISTS idx_clientes_ciudad ON clientes (ciudad);
+"""
+
+TABLAS = ['clientes', 'productos', 'ventas', 'detalle_ventas']
+
+# Formato de las fechas guardadas como texto ISO (ordenable e indexable)
+FORMATO_FECHAS = {
+    'fecha_alta': '%Y-%m-%d',
+    'fecha': '%Y-%m-%d %H:%M:%S',
+}
+
+
+# ============================================================
+# CONSULTAS PREDEFINIDAS
+# ============================================================
+
+CONSULTAS = {
+    # RFM igual que en Limpieza_datos2 (solo ventas con detalle; snapshot = última venta + 1 día)
+    'rfm': """
+        WITH total_venta AS (
+            SELECT id_venta, SUM(importe) AS total
+            FROM detalle_ventas
+            GROUP BY id_venta
+        ),
+        base AS (
+            SELECT v.id_cliente, v.fecha, t.total
+            FROM ventas v
+            JOIN total_venta t ON t.id_venta = v.id_venta
+        ),
+        snapshot AS (
+            SELECT COALESCE(:snapshot_date, datetime(MAX(fecha), '+1 day')) AS fecha FROM base
+        ),
+        por_cliente AS (
+            SELECT
+                id_cliente,
+                CAST(strftime('%s', (SELECT fecha FROM snapshot)) AS INTEGER)
+                    - CAST(strftime('%s', MAX(fecha)) AS INTEGER) AS segundos,
+                COUNT(*) AS Frecuencia,
+                SUM(total) AS Monetario
+            FROM base
+            GROUP BY id_cliente
+        )
+        -- Días completos redondeando hacia abajo (como Timedelta.days)
+        SELECT
+            id_cliente,
+            (segundos - ((segundos % 86400) + 86400) % 86400) / 86400 AS Recencia,
+            Frecuencia,
+            Monetario
+        FROM por_cliente
+        ORDER BY id_cliente
+    """,
+    'gasto_por_ciudad': """
+        SELECT
+            c.ciudad,
+            COUNT(DISTINCT v.id_cliente) AS clientes,
+            COUNT(DISTINCT v.id_venta) AS ventas,
+            SUM(d.importe) AS monto_total
+        FROM detalle_ventas d
+        JOIN ventas v ON v.id_venta = d.id_venta
+        JOIN clientes c ON c.id_cliente = v.id_cliente
+        GROUP BY c.ciudad
+        ORDER BY monto_total DESC
+    """,
+    'clientes_unicos_por_mes': """
+        SELECT
+            strftime('%Y-%m', fecha) AS anio_mes,
+            COUNT(DISTINCT id_cliente) AS clientes_unicos,
+            COUNT(*) AS ventas
+        FROM ventas
+        GROUP BY anio_mes
+        ORDER BY anio_mes
+    """,
+}
+
+
+# ============================================================
+# CONEXIÓN Y CARGA
+# ============================================================
+
+def conectar(ruta_bd):
+    """Abre la base con claves foráneas activadas"""
+    conexion = sqlite3.connect(ruta_bd)
+    conexion.execute("PRAGMA foreign_keys = ON")
+    return conexion
+
+
+def filas_para_insertar(df, columnas):
+    """Itera las filas de un DataFrame con tipos que acepta sqlite (fechas como texto ISO)"""
+    df = df[columnas].copy()
+    for columna, formato in FORMATO_FECHAS.items():
+        if columna in df.columns:
+            df[columna] = pd.to_datetime(df[columna]).dt.strftime(formato)
+    for columna in df.columns:
+        if isinstance(df[columna].dtype, pd.CategoricalDtype):
+            df[columna] = df[columna].astype(object)
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+
+def insertar_tabla(conexion, tabla, df, tamano_lote=TAMANO_LOTE):
+    """Inserta un DataFrame en lotes (dentro de la transacción abierta)"""
+    existentes = [fila[1] for fila in conexion.execute(f"PRAGMA table_info({tabla})")]
+    columnas = [columna for columna in existentes if columna in df.columns]
+    sql = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})"
+    for inicio in range(0, len(df), tamano_lote):
+        conexion.executemany(sql, filas_para_insertar(df.iloc[inicio:inicio + tamano_lote], columnas))
+    return len(df)
+
+
+def crear_base(ruta_bd, reemplazar=True):
+    """Crea el archivo con el esquema (sin índices) listo para la carga masiva"""
+    if reemplazar and os.path.exists(ruta_bd):
+        os.remove(ruta_bd)
+    conexion = conectar(ruta_bd)
+    # La carga es reproducible desde los generadores: se prioriza la velocidad
+    conexion.execute("PRAGMA journal_mode = MEMORY")
+    conexion.execute("PRAGMA synchronous = OFF")
+    conexion.executescript(ESQUEMA)
+    return conexion
+
+
+def finalizar_carga(conexion):
+    """Crea los índices, actualiza estadísticas y verifica las FKs"""
+    conexion.executescript(INDICES)
+    conexion.execute("ANALYZE")
+    errores = conexion.execute("PRAGMA foreign_key_check").fetchall()
+    if errores:
+        print(f"⚠️  {len(errores)} filas con claves foráneas inválidas")
+    conexion.commit()
+
+
+def cargar_base(ruta_bd, df_clientes, df_productos, df_ventas, df_detalle, reemplazar=True):
+    """Carga las cuatro tablas en una sola transacción y crea los índices"""
+    conexion = crear_base(ruta_bd, reemplazar)
+    try:
+        with conexion:
+            for tabla, df in zip(TABLAS, [df_clientes, df_productos, df_ventas, df_detalle]):
+                n = insertar_tabla(conexion, tabla, df)
+                print(f"  → {tabla}: {n} filas insertadas")
+        finalizar_carga(conexion)
+    finally:
+        conexion.close()
+    return ruta_bd
+
+
+def cargar_csv(conexion, tabla, ruta_csv, tamano_chunk=500_000):
+    """Inserta un CSV exportado leyendo por chunks (dentro de la transacción abierta)"""
+    total = 0
+    for chunk in pd.read_csv(ruta_csv, encoding='utf-8-sig', chunksize=tamano_chunk):
+        total += insertar_tabla(conexion, tabla, chunk)
+    return total
+
+
+# ============================================================
+# CONSULTAS
+# ============================================================
+
+def consultar(ruta_bd, sql, parametros=None):
+    """Ejecuta una consulta (SQL o nombre de CONSULTAS) y devuelve un DataFrame"""
+    sql = CONSULTAS.get(sql, sql)
+    conexion = conectar(ruta_bd) if isinstance(ruta_bd, str) else ruta_bd
+    try:
+        return pd.read_sql_query(sql, conexion, params=parametros)
+    finally:
+        if isinstance(ruta_bd, str):
+            conexion.close()
+
+
+def rfm_sql(ruta_bd, snapshot_date=None):
+    """Tabla RFM calculada en la base (mismas columnas que calcular_rfm)"""
+    if snapshot_date is not None:
+        snapshot_date = pd.Timestamp(snapshot_date).strftime(FORMATO_FECHAS['fecha'])
+    return consultar(ruta_bd, 'rfm', {'snapshot_date': snapshot_date})
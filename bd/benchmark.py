@@ -0,0 +1,392 @@
+# ============================================================
+# BENCHMARK DEL PIPELINE DE GENERACIÓN Y ANÁLISIS
+# ============================================================
+#
+# Corre cada etapa (clientes, ventas, detalle, validación, RFM) a distintas
+# escalas con semillas fijas y registra tiempo, pico de RSS y filas/seg en un
+# historial JSON (bd/benchmarks, fuera de git). Cada etapa se repite y se toma
+# la mejor medición; si existe una línea base, falla (código 1) cuando una
+# etapa empeora más allá del umbral y de la tolerancia en segundos.
+#
+#   python benchmark.py --escalas 1k,10k
+#   python benchmark.py --escalas 1k,10k --fijar-base
+#   python benchmark.py --etapas ventas,detalle --escalas 100k --umbral 0.15
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import Script_BD
+from detalle_ventas_mejorado import (
+    generar_tabla_detalle_ventas_mejorada,
+    generar_tabla_detalle_ventas_por_lotes,
+    validar_detalle_ventas,
+)
+from rfm import calcular_rfm
+
+
+SEMILLA = 42
+
+ESCALAS = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1M': 1_000_000}
+ESCALAS_POR_DEFECTO = ['1k', '10k']
+
+CARPETA_BENCHMARK = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks')
+ARCHIVO_HISTORIAL = 'historial.json'
+ARCHIVO_BASE = 'base.json'
+
+# Regresión: más lento / más memoria que la base por encima de estos márgenes
+UMBRAL_TIEMPO = 0.20
+UMBRAL_MEMORIA = 0.25
+# Además del margen relativo, el tiempo tiene que empeorar al menos esto: en
+# etapas de pocos segundos un 20% puede ser ruido de la máquina, no del código
+TOLERANCIA_SEGUNDOS = 1.0
+# Repeticiones por etapa (se toma la mejor, la menos afectada por el ruido)
+REPETICIONES = 3
+
+INTERVALO_RSS = 0.005
+
+
+# ============================================================
+# MEDICIÓN DE MEMORIA
+# ============================================================
+
+def rss_actual():
+    """RSS actual del proceso en bytes (psutil o /proc; None si no se puede medir)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as archivo:
+            return int(archivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class MedidorPicoRSS:
+    """Muestrea el RSS en un hilo mientras dura el bloque y guarda el pico (bytes)"""
+
+    def __init__(self, intervalo=INTERVALO_RSS):
+        self.intervalo = intervalo
+        self.pico = None
+        self._detener = threading.Event()
+
+    def _muestrear(self):
+        while not self._detener.wait(self.intervalo):
+            self._registrar()
+
+    def _registrar(self):
+        rss = rss_actual()
+        if rss is not None:
+            self.pico = rss if self.pico is None else max(self.pico, rss)
+
+    def __enter__(self):
+        self._registrar()
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *args):
+        self._detener.set()
+        self._hilo.join()
+        self._registrar()
+
+
+# ============================================================
+# DATOS DE ENTRADA Y ETAPAS
+# ============================================================
+
+def productos_benchmark(ruta=None, semilla=SEMILLA):
+    """
+    Catálogo de productos con popularidad: el archivo indicado (Excel/CSV)
+    o uno sintético de 100 productos con la misma forma que Productos.xlsx.
+    """
+    if ruta:
+        df = pd.read_excel(ruta) if ruta.lower().endswith('.xlsx') else pd.read_csv(ruta, encoding='utf-8-sig')
+    else:
+        rng = np.random.default_rng(semilla)
+        basicos = ['Coca Cola', 'Agua Mineral', 'Leche Entera', 'Pan Lactal', 'Yerba Mate', 'Café Molido']
+        nombres = basicos + [f"Producto {i}" for i in range(len(basicos) + 1, 101)]
+        df = pd.DataFrame({
+            'id_producto': np.arange(1, 101),
+            'nombre_producto': nombres,
+            'categoria': rng.choice(['Alimentos', 'Limpieza'], size=100, p=[0.56, 0.44]),
+            'precio_unitario': rng.integers(300, 5000, size=100),
+        })
+    return Script_BD.asignar_popularidad(df)
+
+
+def _etapa_clientes(datos, num_clientes, semilla):
+    df = Script_BD.generar_tabla_clientes_por_lotes(num_clientes, semilla=semilla)
+    df['fecha_alta'] = pd.to_datetime(df['fecha_alta'])
+    datos['clientes'] = df
+    return len(df)
+
+
+def _etapa_clientes_fila(datos, num_clientes, semilla):
+    random.seed(semilla)
+    Script_BD.obtener_faker().seed_instance(semilla)
+    return len(Script_BD.generar_tabla_clientes(num_clientes))
+
+
+def _etapa_ventas(datos, num_clientes, semilla):
+    random.seed(semilla)
+    datos['ventas'] = Script_BD.generar_tabla_ventas(datos['clientes'])
+    return len(datos['ventas'])
+
+
+def _etapa_detalle(datos, num_clientes, semilla):
+    datos['detalle'] = generar_tabla_detalle_ventas_por_lotes(datos['ventas'], datos['productos'], seed=semilla)
+    return len(datos['detalle'])
+
+
+def _etapa_detalle_fila(datos, num_clientes, semilla):
+    random.seed(semilla)
+    return len(generar_tabla_detalle_ventas_mejorada(datos['ventas'], datos['productos']))
+
+
+def _etapa_validacion(datos, num_clientes, semilla):
+    validar_detalle_ventas(datos['detalle'], datos['ventas'])
+    return len(datos['detalle'])
+
+
+def _etapa_rfm(datos, num_clientes, semilla):
+    calcular_rfm(datos['ventas'], datos['detalle'])
+    return len(datos['detalle'])
+
+
+# Etapas en orden de ejecución; las de fila a fila se limitan a escalas chicas
+ETAPAS = {
+    'clientes':      {'funcion': _etapa_clientes, 'requiere': []},
+    'clientes_fila': {'funcion': _etapa_clientes_fila, 'requiere': [], 'max_clientes': 100_000},
+    'ventas':        {'funcion': _etapa_ventas, 'requiere': ['clientes']},
+    'detalle':       {'funcion': _etapa_detalle, 'requiere': ['ventas']},
+    'detalle_fila':  {'funcion': _etapa_detalle_fila, 'requiere': ['ventas'], 'max_clientes': 10_000},
+    'validacion':    {'funcion': _etapa_validacion, 'requiere': ['detalle']},
+    'rfm':           {'funcion': _etapa_rfm, 'requiere': ['detalle']},
+}
+
+
+def etapas_necesarias(etapas):
+    """Etapas pedidas más sus dependencias, en el orden de ETAPAS"""
+    necesarias = set()
+    pendientes = list(etapas)
+    while pendientes:
+        etapa = pendientes.pop()
+        if etapa not in ETAPAS:
+            raise ValueError(f"Etapa desconocida: {etapa} (disponibles: {', '.join(ETAPAS)})")
+        if etapa not in necesarias:
+            necesarias.add(etapa)
+            pendientes.extend(ETAPAS[etapa]['requiere'])
+    return [etapa for etapa in ETAPAS if etapa in necesarias]
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+
+def medir_etapa(etapa, datos, num_clientes, semilla, repeticiones=REPETICIONES, silencioso=True):
+    """Corre una etapa y devuelve filas, segundos y pico de RSS (de la mejor repetición en cada uno)"""
+    funcion = ETAPAS[etapa]['funcion']
+    mejores_segundos = None
+    pico = None
+    for _ in range(repeticiones):
+        gc.collect()
+        salida = io.StringIO() if silencioso else sys.stdout
+        with contextlib.redirect_stdout(salida), MedidorPicoRSS() as medidor:
+            inicio = time.perf_counter()
+            filas = funcion(datos, num_clientes, semilla)
+            segundos = time.perf_counter() - inicio
+        mejores_segundos = segundos if mejores_segundos is None else min(mejores_segundos, segundos)
+        if medidor.pico is not None:
+            pico = medidor.pico if pico is None else min(pico, medidor.pico)
+    return {
+        'etapa': etapa,
+        'clientes': num_clientes,
+        'filas': int(filas),
+        'segundos': round(mejores_segundos, 4),
+        'filas_por_seg': round(filas / mejores_segundos, 1) if mejores_segundos > 0 else None,
+        'pico_rss_mb': round(pico / 2 ** 20, 1) if pico is not None else None,
+    }
+
+
+def correr_escala(escala, etapas, productos, semilla=SEMILLA, repeticiones=REPETICIONES, silencioso=True):
+    """Corre las etapas pedidas (y sus dependencias) para una escala"""
+    num_clientes = ESCALAS[escala] if escala in ESCALAS else int(escala)
+    datos = {'productos': productos}
+    resultados = []
+    for etapa in etapas_necesarias(etapas):
+        limite = ETAPAS[etapa].get('max_clientes')
+        if etapa in etapas and limite is not None and num_clientes > limite:
+            print(f"  → {etapa}: omitida en {escala} (máximo {limite} clientes)")
+            continue
+        medido = etapa in etapas
+        resultado = medir_etapa(etapa, datos, num_clientes, semilla,
+                                repeticiones if medido else 1, silencioso)
+        if medido:
+            resultado['escala'] = escala
+            resultados.append(resultado)
+            print(f"  → {etapa:<14} {resultado['filas']:>10} filas  {resultado['segundos']:>9.3f} s  "
+                  f"{resultado['filas_por_seg'] or 0:>12,.0f} filas/s  {resultado['pico_rss_mb']} MB")
+    return resultados
+
+
+def entorno():
+    """Datos del entorno para el historial (commit, versiones, máquina)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'maquina': platform.node(),
+        'cpus': os.cpu_count(),
+    }
+
+
+# ============================================================
+# HISTORIAL Y LÍNEA BASE
+# ============================================================
+
+def leer_json(ruta, por_defecto):
+    if not os.path.exists(ruta):
+        return por_defecto
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def escribir_json(ruta, contenido):
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(contenido, archivo, indent=2, ensure_ascii=False)
+
+
+def clave_resultado(resultado):
+    return f"{resultado['etapa']}@{resultado['escala']}"
+
+
+def comparar_con_base(resultados, base, umbral_tiempo=UMBRAL_TIEMPO, umbral_memoria=UMBRAL_MEMORIA,
+                      tolerancia_segundos=TOLERANCIA_SEGUNDOS):
+    """Lista de regresiones (etapa@escala, métrica, base, actual, variación) respecto de la base"""
+    regresiones = []
+    for resultado in resultados:
+        referencia = base.get(clave_resultado(resultado))
+        if referencia is None:
+            continue
+        if resultado['segundos'] > referencia['segundos'] * (1 + umbral_tiempo) and \
+                resultado['segundos'] - referencia['segundos'] > tolerancia_segundos:
+            regresiones.append((clave_resultado(resultado), 'segundos',
+                                referencia['segundos'], resultado['segundos']))
+        if referencia.get('pico_rss_mb') and resultado.get('pico_rss_mb') and \
+                resultado['pico_rss_mb'] > referencia['pico_rss_mb'] * (1 + umbral_memoria):
+            regresiones.append((clave_resultado(resultado), 'pico_rss_mb',
+                                referencia['pico_rss_mb'], resultado['pico_rss_mb']))
+    return [(clave, metrica, antes, ahora, ahora / antes - 1) for clave, metrica, antes, ahora in regresiones]
+
+
+def correr_benchmark(escalas=ESCALAS_POR_DEFECTO, etapas=None, carpeta=CARPETA_BENCHMARK,
+                     semilla=SEMILLA, repeticiones=REPETICIONES, ruta_productos=None, fijar_base=False,
+                     umbral_tiempo=UMBRAL_TIEMPO, umbral_memoria=UMBRAL_MEMORIA,
+                     tolerancia_segundos=TOLERANCIA_SEGUNDOS, silencioso=True):
+    """
+    Corre el benchmark, lo agrega al historial y lo compara con la base.
+    Devuelve (corrida, regresiones).
+    """
+    etapas = list(etapas or ETAPAS)
+    productos = productos_benchmark(ruta_productos, semilla)
+
+    resultados = []
+    for escala in escalas:
+        print(f"\n⏱️  Escala {escala}:")
+        resultados.extend(correr_escala(escala, etapas, productos, semilla, repeticiones, silencioso))
+
+    corrida = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'semilla': semilla,
+        'repeticiones': repeticiones,
+        'entorno': entorno(),
+        'resultados': resultados,
+    }
+
+    ruta_historial = os.path.join(carpeta, ARCHIVO_HISTORIAL)
+    historial = leer_json(ruta_historial, [])
+    historial.append(corrida)
+    escribir_json(ruta_historial, historial)
+    print(f"\n✓ Historial actualizado: {ruta_historial} ({len(historial)} corridas)")
+
+    ruta_base = os.path.join(carpeta, ARCHIVO_BASE)
+    base = leer_json(ruta_base, {})
+    regresiones = [] if fijar_base else comparar_con_base(resultados, base, umbral_tiempo, umbral_memoria, tolerancia_segundos)
+
+    if fijar_base:
+        base.update({clave_resultado(r): r for r in resultados})
+        escribir_json(ruta_base, base)
+        print(f"✓ Línea base actualizada: {ruta_base}")
+    elif not base:
+        print("⚠️  Sin línea base: correr con --fijar-base para guardarla")
+
+    return corrida, regresiones
+
+
+def imprimir_regresiones(regresiones):
+    if not regresiones:
+        print("✅ Sin regresiones respecto de la línea base")
+        return
+    print(f"❌ {len(regresiones)} regresiones:")
+    for clave, metrica, antes, ahora, variacion in regresiones:
+        print(f"   {clave:<24} {metrica:<12} {antes:>10} → {ahora:<10} ({variacion:+.1%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de generación y análisis")
+    parser.add_argument('--escalas', default=','.join(ESCALAS_POR_DEFECTO),
+                        help=f"Escalas separadas por coma ({', '.join(ESCALAS)} o un número de clientes)")
+    parser.add_argument('--etapas', default=','.join(ETAPAS),
+                        help=f"Etapas separadas por coma ({', '.join(ETAPAS)})")
+    parser.add_argument('--carpeta', default=CARPETA_BENCHMARK, help="Carpeta del historial y la línea base")
+    parser.add_argument('--semilla', type=int, default=SEMILLA)
+    parser.add_argument('--repeticiones', type=int, default=REPETICIONES,
+                        help="Repeticiones por etapa (se toma la mejor)")
+    parser.add_argument('--productos', default=None, help="Productos.xlsx/.csv (por defecto, catálogo sintético)")
+    parser.add_argument('--umbral', type=float, default=UMBRAL_TIEMPO, help="Margen de regresión en tiempo")
+    parser.add_argument('--umbral-memoria', type=float, default=UMBRAL_MEMORIA,
+                        help="Margen de regresión en pico de RSS")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_SEGUNDOS,
+                        help="Segundos mínimos de empeoramiento para contar como regresión")
+    parser.add_argument('--fijar-base', action='store_true', help="Guarda esta corrida como línea base")
+    parser.add_argument('--detalle', action='store_true', help="Muestra la salida de cada etapa")
+    args = parser.parse_args()
+
+    _, regresiones = correr_benchmark(
+        escalas=args.escalas.split(','),
+        etapas=args.etapas.split(','),
+        carpeta=args.carpeta,
+        semilla=args.semilla,
+        repeticiones=args.repeticiones,
+        ruta_productos=args.productos,
+        fijar_base=args.fijar_base,
+        umbral_tiempo=args.umbral,
+        umbral_memoria=args.umbral_memoria,
+        tolerancia_segundos=args.tolerancia,
+        silencioso=not args.detalle,
+    )
+    imprimir_regresiones(regresiones)
+    sys.exit(1 if regresiones else 0)
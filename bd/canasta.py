@@ -0,0 +1,390 @@
+# ============================================================
+# ANÁLISIS DE CANASTA: CO-OCURRENCIA, FP-GROWTH Y REGLAS
+# ============================================================
+#
+# Una pasada por las ventas del almacén columnar (las líneas de cada id_venta
+# son contiguas) arma la matriz dispersa producto × producto de co-ocurrencia,
+# cuya diagonal da la frecuencia de cada producto. Una segunda pasada inserta
+# los productos frecuentes de cada canasta en el árbol de FP-growth (sin
+# guardar las canastas), que encuentra los itemsets frecuentes; de ahí salen
+# las reglas de asociación (soporte / confianza / lift). El resultado se guarda
+# en .cache/canasta y se reutiliza mientras no cambien los datos ni los parámetros:
+#
+#   canasta = obtener_canasta('Base de datos')
+#   canasta.companeros('Yerba')          # productos que más acompañan a la yerba
+#   canasta.reglas_de('Yerba', top=5)
+
+import argparse
+import json
+import math
+import os
+import pickle
+import shutil
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from almacen_columnar import obtener_almacen
+from cargador_datos import cargar_tabla
+
+
+CARPETA_CANASTA = 'canasta'
+VERSION_CANASTA = 1
+
+SOPORTE_MINIMO = 0.001    # Fracción de ventas que debe contener el itemset
+CONFIANZA_MINIMA = 0.05
+MAX_ITEMS = 3             # Tamaño máximo de los itemsets
+VENTAS_POR_BLOQUE = 200_000
+ORDENES = ['lift', 'confianza', 'ventas']
+
+# ============================================================
+# PASADAS POR LAS VENTAS
+# ============================================================
+
+def _bloques_incidencia(almacen, ventas_por_bloque, columna_de_producto=None, num_columnas=None):
+    """
+    Matriz de incidencia venta × producto (0/1, CSR) de cada bloque de ventas.
+    Con `columna_de_producto` (arreglo id_producto -> columna, -1 = descartar)
+    las columnas se renumeran y solo quedan los productos elegidos.
+    """
+    offsets = almacen.offsets
+    productos = almacen.columna('id_producto')
+    if num_columnas is None:
+        num_columnas = int(productos.max()) + 1 if len(productos) else 0
+    for primera in range(0, len(offsets) - 1, ventas_por_bloque):
+        limites = np.asarray(offsets[primera:primera + ventas_por_bloque + 1])
+        inicio, fin = int(limites[0]), int(limites[-1])
+        if inicio == fin:
+            continue
+        venta = np.repeat(np.arange(len(limites) - 1), np.diff(limites))
+        columna = np.asarray(productos[inicio:fin])
+        if columna_de_producto is not None:
+            columna = columna_de_producto[columna]
+            elegidas = columna >= 0
+            venta, columna = venta[elegidas], columna[elegidas]
+        incidencia = sparse.csr_matrix(
+            (np.ones(len(venta), dtype=np.int64), (venta, columna)),
+            shape=(len(limites) - 1, num_columnas)
+        )
+        incidencia.sum_duplicates()
+        incidencia.data[:] = 1
+        yield incidencia
+
+
+def recorrer_canastas(almacen, ventas_por_bloque=VENTAS_POR_BLOQUE):
+    """
+    Primera pasada: (matriz de co-ocurrencia, ventas con líneas).
+    La diagonal de la matriz es la cantidad de ventas de cada producto; un
+    producto repetido dentro de la misma venta cuenta una sola vez.
+    """
+    productos = almacen.columna('id_producto')
+    num_productos = int(productos.max()) + 1 if len(productos) else 0
+
+    coocurrencia = sparse.csr_matrix((num_productos, num_productos), dtype=np.int64)
+    num_ventas = 0
+    for incidencia in _bloques_incidencia(almacen, ventas_por_bloque, num_columnas=num_productos):
+        coocurrencia = coocurrencia + (incidencia.T @ incidencia).tocsr()
+        num_ventas += int(np.count_nonzero(np.diff(incidencia.indptr)))
+    return coocurrencia, num_ventas
+
+
+def recorrer_transacciones(almacen, orden, ventas_por_bloque=VENTAS_POR_BLOQUE):
+    """
+    Segunda pasada: (items, veces) con los productos de `orden` de cada canasta,
+    en ese orden. Solo se agrupan las canastas repetidas dentro de un bloque,
+    así la memoria no crece con la cantidad de ventas.
+    """
+    productos = almacen.columna('id_producto')
+    columna_de_producto = np.full(int(productos.max()) + 1 if len(productos) else 0, -1, dtype=np.int64)
+    columna_de_producto[orden] = np.arange(len(orden))
+    for incidencia in _bloques_incidencia(almacen, ventas_por_bloque, columna_de_producto, len(orden)):
+        # Índices de columna ordenados = productos en el orden pedido
+        items = orden[incidencia.indices].tolist()
+        punteros = incidencia.indptr.tolist()
+        yield from Counter(tuple(items[i:j]) for i, j in zip(punteros[:-1], punteros[1:]) if j > i).items()
+
+# ============================================================
+# FP-GROWTH
+# ============================================================
+
+class _Nodo:
+    __slots__ = ('item', 'conteo', 'padre', 'hijos')
+
+    def __init__(self, item, padre):
+        self.item = item
+        self.conteo = 0
+        self.padre = padre
+        self.hijos = {}
+
+
+def _construir_arbol(transacciones):
+    """FP-tree de (items en orden de frecuencia, veces); devuelve los nodos de cada item"""
+    raiz = _Nodo(None, None)
+    enlaces = {}
+    for items, veces in transacciones:
+        nodo = raiz
+        for item in items:
+            hijo = nodo.hijos.get(item)
+            if hijo is None:
+                hijo = nodo.hijos[item] = _Nodo(item, nodo)
+                enlaces.setdefault(item, []).append(hijo)
+            hijo.conteo += veces
+            nodo = hijo
+    return enlaces
+
+
+def _minar(enlaces, sufijo, minimo, max_items, resultado):
+    """Agrega a `resultado` los itemsets frecuentes que terminan en `sufijo`"""
+    for item, nodos in enlaces.items():
+        soporte = sum(nodo.conteo for nodo in nodos)
+        if soporte < minimo:
+            continue
+        itemset = (item,) + sufijo
+        resultado[tuple(sorted(itemset))] = soporte
+        if len(itemset) >= max_items:
+            continue
+
+        # Base condicional: caminos desde la raíz hasta cada nodo del item
+        base = Counter()
+        for nodo in nodos:
+            camino = []
+            padre = nodo.padre
+            while padre.item is not None:
+                camino.append(padre.item)
+                padre = padre.padre
+            if camino:
+                base[tuple(reversed(camino))] += nodo.conteo
+
+        conteos = Counter()
+        for camino, veces in base.items():
+            for anterior in camino:
+                conteos[anterior] += veces
+        frecuentes = {i for i, c in conteos.items() if c >= minimo}
+        if not frecuentes:
+            continue
+
+        condicional = Counter()
+        for camino, veces in base.items():
+            filtrado = tuple(i for i in camino if i in frecuentes)
+            if filtrado:
+                condicional[filtrado] += veces
+        _minar(_construir_arbol(condicional.items()), itemset, minimo, max_items, resultado)
+
+
+def items_frecuentes(ventas_producto, minimo):
+    """ids con al menos `minimo` ventas, del más vendido al menos vendido (empates por id)"""
+    candidatos = np.flatnonzero(np.asarray(ventas_producto) >= minimo)
+    return candidatos[np.argsort(-np.asarray(ventas_producto)[candidatos], kind='stable')]
+
+
+def fp_growth(almacen, coocurrencia, num_ventas, soporte_minimo=SOPORTE_MINIMO, max_items=MAX_ITEMS,
+              ventas_por_bloque=VENTAS_POR_BLOQUE):
+    """
+    Itemsets frecuentes. Las frecuencias de cada producto salen de la diagonal
+    de la co-ocurrencia (primera pasada); el árbol se arma con una segunda
+    pasada por el almacén que inserta solo los items frecuentes de cada
+    canasta. Devuelve un DataFrame (itemset, items, ventas, soporte) ordenado por ventas.
+    """
+    minimo = max(1, math.ceil(soporte_minimo * num_ventas))
+    orden = items_frecuentes(coocurrencia.diagonal(), minimo)
+    transacciones = recorrer_transacciones(almacen, orden, ventas_por_bloque) if len(orden) else []
+
+    resultado = {}
+    _minar(_construir_arbol(transacciones), (), minimo, max_items, resultado)
+
+    itemsets = pd.DataFrame({
+        'itemset': list(resultado.keys()),
+        'items': [len(i) for i in resultado],
+        'ventas': list(resultado.values()),
+    })
+    itemsets['soporte'] = itemsets['ventas'] / num_ventas if num_ventas else 0.0
+    return itemsets.sort_values(['ventas', 'items'], ascending=[False, True], ignore_index=True)
+
+
+def reglas_asociacion(itemsets, num_ventas, confianza_minima=CONFIANZA_MINIMA):
+    """Reglas antecedente → consecuente de cada itemset de 2 o más productos"""
+    soportes = dict(zip(itemsets['itemset'], itemsets['ventas']))
+    filas = []
+    for itemset, ventas in soportes.items():
+        if len(itemset) < 2:
+            continue
+        # Cada subconjunto propio no vacío como antecedente (todos son frecuentes)
+        for mascara in range(1, 2 ** len(itemset) - 1):
+            antecedente = tuple(i for b, i in enumerate(itemset) if mascara >> b & 1)
+            consecuente = tuple(i for b, i in enumerate(itemset) if not mascara >> b & 1)
+            confianza = ventas / soportes[antecedente]
+            if confianza < confianza_minima:
+                continue
+            filas.append({
+                'antecedente': antecedente,
+                'consecuente': consecuente,
+                'ventas': ventas,
+                'soporte': ventas / num_ventas,
+                'confianza': confianza,
+                'lift': confianza * num_ventas / soportes[consecuente],
+            })
+    columnas = ['antecedente', 'consecuente', 'ventas', 'soporte', 'confianza', 'lift']
+    return pd.DataFrame(filas, columns=columnas).sort_values(['lift', 'ventas'], ascending=False,
+                                                              ignore_index=True)
+
+# ============================================================
+# RESULTADO CACHEADO Y CONSULTAS
+# ============================================================
+
+class AnalisisCanasta:
+    """Co-ocurrencia, itemsets y reglas, con consultas por producto"""
+
+    def __init__(self, coocurrencia, num_ventas, itemsets, reglas, productos):
+        self.coocurrencia = coocurrencia.tocsr()
+        self.num_ventas = num_ventas
+        self.itemsets = itemsets
+        self.reglas = reglas
+        self.productos = productos  # Serie id_producto -> nombre_producto
+        self.ventas_producto = self.coocurrencia.diagonal()
+
+    def id_producto(self, producto):
+        """id de un producto por id o por nombre (coincidencia parcial, sin mayúsculas)"""
+        if isinstance(producto, (int, np.integer)):
+            return int(producto)
+        coincidencias = self.productos[self.productos.str.contains(producto, case=False, regex=False)]
+        if coincidencias.empty:
+            raise KeyError(f"No hay productos que coincidan con {producto!r}")
+        # Entre varias coincidencias, la del producto más vendido
+        ids = coincidencias.index.to_numpy()
+        ventas = np.array([self.ventas_producto[i] if i < len(self.ventas_producto) else 0 for i in ids])
+        return int(ids[np.argmax(ventas)])
+
+    def nombre(self, id_producto):
+        return self.productos.get(id_producto, f"Producto {id_producto}")
+
+    def companeros(self, producto, top=10, orden='lift', minimo_ventas=None):
+        """
+        Productos comprados junto con `producto`: ventas en común, confianza
+        (de las ventas del producto, qué fracción los incluye) y lift. Por
+        defecto solo cuenta pares con el soporte mínimo (el lift de pocos casos es ruido).
+        """
+        if minimo_ventas is None:
+            minimo_ventas = max(1, math.ceil(SOPORTE_MINIMO * self.num_ventas))
+        if orden not in ORDENES:
+            raise ValueError(f"Orden desconocido: {orden} (usar {', '.join(ORDENES)})")
+        id_producto = self.id_producto(producto)
+        if id_producto >= self.coocurrencia.shape[0] or self.ventas_producto[id_producto] == 0:
+            return pd.DataFrame(columns=['id_producto', 'nombre_producto', 'ventas', 'confianza', 'lift'])
+
+        fila = self.coocurrencia.getrow(id_producto)
+        otros, ventas = fila.indices, fila.data
+        elegidos = (otros != id_producto) & (ventas >= minimo_ventas)
+        otros, ventas = otros[elegidos], ventas[elegidos]
+
+        confianza = ventas / self.ventas_producto[id_producto]
+        lift = confianza * self.num_ventas / self.ventas_producto[otros]
+        df = pd.DataFrame({
+            'id_producto': otros,
+            'nombre_producto': [self.nombre(i) for i in otros],
+            'ventas': ventas,
+            'confianza': confianza,
+            'lift': lift,
+        })
+        return df.sort_values([orden, 'ventas'], ascending=False, ignore_index=True).head(top)
+
+    def reglas_de(self, producto, top=10):
+        """Reglas cuyo antecedente contiene al producto, con nombres"""
+        id_producto = self.id_producto(producto)
+        reglas = self.reglas[self.reglas['antecedente'].map(lambda a: id_producto in a)].head(top).copy()
+        for lado in ['antecedente', 'consecuente']:
+            reglas[lado] = reglas[lado].map(lambda items: ' + '.join(self.nombre(i) for i in items))
+        return reglas
+
+
+def _parametros(soporte_minimo, confianza_minima, max_items):
+    return {'soporte_minimo': soporte_minimo, 'confianza_minima': confianza_minima, 'max_items': max_items}
+
+
+def guardar_canasta(canasta, carpeta, meta):
+    """Escribe la co-ocurrencia (.npz), itemsets / reglas (pickle) y los metadatos"""
+    temporal = carpeta + '.tmp'
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+    sparse.save_npz(os.path.join(temporal, 'coocurrencia.npz'), canasta.coocurrencia)
+    with open(os.path.join(temporal, 'resultados.pkl'), 'wb') as archivo:
+        pickle.dump({'num_ventas': canasta.num_ventas, 'itemsets': canasta.itemsets,
+                     'reglas': canasta.reglas, 'productos': canasta.productos}, archivo)
+    with open(os.path.join(temporal, 'meta.json'), 'w', encoding='utf-8') as archivo:
+        json.dump(meta, archivo, indent=2)
+    shutil.rmtree(carpeta, ignore_errors=True)
+    os.replace(temporal, carpeta)
+
+
+def leer_canasta(carpeta):
+    """(AnalisisCanasta, meta) de una carpeta guardada"""
+    with open(os.path.join(carpeta, 'meta.json'), encoding='utf-8') as archivo:
+        meta = json.load(archivo)
+    with open(os.path.join(carpeta, 'resultados.pkl'), 'rb') as archivo:
+        datos = pickle.load(archivo)
+    coocurrencia = sparse.load_npz(os.path.join(carpeta, 'coocurrencia.npz'))
+    canasta = AnalisisCanasta(coocurrencia, datos['num_ventas'], datos['itemsets'],
+                              datos['reglas'], datos['productos'])
+    return canasta, meta
+
+
+def obtener_canasta(directorio=None, soporte_minimo=SOPORTE_MINIMO, confianza_minima=CONFIANZA_MINIMA,
+                    max_items=MAX_ITEMS, reconstruir=False):
+    """
+    Análisis de canasta de la base del directorio. Se recalcula solo si
+    cambió Detalle_Ventas (el almacén columnar) o los parámetros.
+    """
+    almacen = obtener_almacen(directorio)
+    carpeta = os.path.join(os.path.dirname(almacen.carpeta), CARPETA_CANASTA)
+    parametros = _parametros(soporte_minimo, confianza_minima, max_items)
+
+    if not reconstruir and os.path.exists(os.path.join(carpeta, 'meta.json')):
+        canasta, meta = leer_canasta(carpeta)
+        if (meta.get('version') == VERSION_CANASTA and meta.get('origen') == almacen.meta['origen']
+                and meta.get('parametros') == parametros):
+            return canasta
+
+    print("🛒 Calculando análisis de canasta...")
+    inicio = time.perf_counter()
+    coocurrencia, num_ventas = recorrer_canastas(almacen)
+    itemsets = fp_growth(almacen, coocurrencia, num_ventas, soporte_minimo, max_items)
+    reglas = reglas_asociacion(itemsets, num_ventas, confianza_minima)
+    df_productos = cargar_tabla('productos', directorio)
+    productos = pd.Series(df_productos['nombre_producto'].astype(str).to_numpy(),
+                          index=df_productos['id_producto'].to_numpy())
+
+    canasta = AnalisisCanasta(coocurrencia, num_ventas, itemsets, reglas, productos)
+    guardar_canasta(canasta, carpeta, {
+        'version': VERSION_CANASTA,
+        'origen': almacen.meta['origen'],
+        'parametros': parametros,
+    })
+    print(f"✓ {num_ventas:,} ventas · {len(itemsets):,} itemsets · "
+          f"{len(reglas):,} reglas ({time.perf_counter() - inicio:.2f} s)")
+    return canasta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Co-ocurrencia de productos, itemsets frecuentes y reglas")
+    parser.add_argument('directorio', nargs='?', default=None, help="Carpeta con las tablas")
+    parser.add_argument('--producto', default=None, help="Id o nombre: muestra sus compañeros y reglas")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--orden', choices=ORDENES, default='lift')
+    parser.add_argument('--soporte', type=float, default=SOPORTE_MINIMO, help="Soporte mínimo (fracción)")
+    parser.add_argument('--confianza', type=float, default=CONFIANZA_MINIMA)
+    parser.add_argument('--max-items', type=int, default=MAX_ITEMS)
+    parser.add_argument('--reconstruir', action='store_true')
+    args = parser.parse_args()
+
+    canasta = obtener_canasta(args.directorio, args.soporte, args.confianza, args.max_items, args.reconstruir)
+    if args.producto:
+        producto = int(args.producto) if args.producto.isdigit() else args.producto
+        print(f"\n🤝 Compañeros de {canasta.nombre(canasta.id_producto(producto))}:")
+        print(canasta.companeros(producto, args.top, args.orden).to_string(index=False))
+        print("\n📐 Reglas:")
+        print(canasta.reglas_de(producto, args.top).to_string(index=False))
+    else:
+        print("\n📐 Reglas con mayor lift:")
+        print(canasta.reglas.head(args.top).to_string(index=False))
@@ -0,0 +1,171 @@
+# ============================================================
+# CARGA RÁPIDA DE LAS CUATRO TABLAS (CON CACHÉ BINARIA)
+# ============================================================
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from compacto import COLUMNAS_REDUNDANTES, compactar_tabla
+
+
+# Carpeta de datos: variable de entorno AURELION_DATOS o "Base de datos" en la raíz del repo
+DIRECTORIO_DATOS = os.environ.get(
+    'AURELION_DATOS',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Base de datos')
+)
+
+CARPETA_CACHE = '.cache'
+VERSION_CACHE = 1  # Subir si cambian las reglas de tipos
+
+# Archivo fuente (sin extensión) y tipos de cada tabla
+TABLAS = {
+    'clientes': {
+        'archivo': 'Clientes',
+        'enteros': ['id_cliente'],
+        'fechas': ['fecha_alta'],
+        'categorias': ['ciudad'],
+    },
+    'productos': {
+        'archivo': 'Productos',
+        'enteros': ['id_producto'],
+        'numericos': ['precio_unitario'],
+        'categorias': ['categoria'],
+    },
+    'ventas': {
+        'archivo': 'Ventas',
+        'enteros': ['id_venta', 'id_cliente'],
+        'fechas': ['fecha'],
+        'categorias': ['medio_pago'],
+    },
+    'detalle_ventas': {
+        'archivo': 'Detalle_ventas',
+        'enteros': ['id_detalle', 'id_venta', 'id_producto', 'cantidad'],
+        'numericos': ['precio_unitario', 'importe'],
+    },
+}
+
+EXTENSIONES = ['.xlsx', '.csv']
+
+
+def buscar_archivo(nombre_tabla, directorio=None):
+    """Busca el archivo fuente de una tabla (sin distinguir mayúsculas; .xlsx antes que .csv)"""
+    directorio = directorio or DIRECTORIO_DATOS
+    base = TABLAS[nombre_tabla]['archivo'].lower()
+    archivos = {archivo.lower(): archivo for archivo in os.listdir(directorio)}
+    for extension in EXTENSIONES:
+        if base + extension in archivos:
+            return os.path.join(directorio, archivos[base + extension])
+    raise FileNotFoundError(f"No se encontró {TABLAS[nombre_tabla]['archivo']}.xlsx/.csv en {directorio}")
+
+
+def huella_archivo(ruta):
+    """Hash SHA-256 del contenido del archivo"""
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def aplicar_tipos(df, nombre_tabla):
+    """Convierte las columnas a los tipos de la tabla"""
+    tipos = TABLAS[nombre_tabla]
+    for columna in tipos.get('fechas', []):
+        if columna in df.columns:
+            df[columna] = pd.to_datetime(df[columna])
+    for columna in tipos.get('enteros', []) + tipos.get('numericos', []):
+        if columna in df.columns:
+            df[columna] = pd.to_numeric(df[columna], errors='coerce')
+    for columna in tipos.get('categorias', []):
+        if columna in df.columns:
+            df[columna] = df[columna].astype('category')
+    return df
+
+
+def leer_fuente(ruta, nombre_tabla, compacto=False):
+    """
+    Parsea el archivo fuente (Excel o CSV) y aplica los tipos. Con compacto=True
+    no lee los atributos de dimensiones repetidos en las tablas de hechos y
+    reduce ids / categorías (ver compacto).
+    """
+    if not compacto:
+        if ruta.lower().endswith('.xlsx'):
+            df = pd.read_excel(ruta)
+        else:
+            df = pd.read_csv(ruta, encoding='utf-8-sig')
+        return aplicar_tipos(df, nombre_tabla)
+
+    redundantes = set(COLUMNAS_REDUNDANTES.get(nombre_tabla, []))
+    if ruta.lower().endswith('.xlsx'):
+        df = pd.read_excel(ruta, usecols=lambda columna: columna not in redundantes)
+    else:
+        df = pd.read_csv(ruta, encoding='utf-8-sig', usecols=lambda columna: columna not in redundantes)
+    return compactar_tabla(aplicar_tipos(df, nombre_tabla), nombre_tabla)
+
+
+def _escribir_meta(ruta_meta, meta):
+    """Escribe el archivo de metadatos de la caché de forma atómica"""
+    temporal = ruta_meta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(meta, archivo)
+    os.replace(temporal, ruta_meta)
+
+
+def cargar_tabla(nombre_tabla, directorio=None, usar_cache=True, compacto=False):
+    """
+    Carga una tabla. La primera vez parsea la fuente y guarda una caché binaria;
+    después la caché se reutiliza mientras no cambie el archivo fuente
+    (se compara mtime/tamaño y, si difieren, el hash del contenido).
+    La forma compacta tiene su propia caché.
+    """
+    ruta = buscar_archivo(nombre_tabla, directorio)
+    if not usar_cache:
+        return leer_fuente(ruta, nombre_tabla, compacto)
+
+    carpeta_cache = os.path.join(os.path.dirname(ruta), CARPETA_CACHE)
+    base_cache = f"{nombre_tabla}_compacto" if compacto else nombre_tabla
+    ruta_cache = os.path.join(carpeta_cache, f"{base_cache}.pkl")
+    ruta_meta = os.path.join(carpeta_cache, f"{base_cache}.json")
+
+    estado = os.stat(ruta)
+    meta = None
+    if os.path.exists(ruta_meta) and os.path.exists(ruta_cache):
+        with open(ruta_meta, encoding='utf-8') as archivo:
+            meta = json.load(archivo)
+        if meta.get('version') != VERSION_CACHE or meta.get('origen') != os.path.basename(ruta):
+            meta = None
+
+    # Camino rápido: el archivo no se tocó
+    if meta and meta['mtime_ns'] == estado.st_mtime_ns and meta['tamano'] == estado.st_size:
+        return pd.read_pickle(ruta_cache)
+
+    # Cambió el mtime: solo se vuelve a parsear si cambió el contenido
+    huella = huella_archivo(ruta)
+    if meta and meta['sha256'] == huella:
+        meta.update(mtime_ns=estado.st_mtime_ns, tamano=estado.st_size)
+        _escribir_meta(ruta_meta, meta)
+        return pd.read_pickle(ruta_cache)
+
+    df = leer_fuente(ruta, nombre_tabla, compacto)
+    os.makedirs(carpeta_cache, exist_ok=True)
+    df.to_pickle(ruta_cache + '.tmp')
+    os.replace(ruta_cache + '.tmp', ruta_cache)
+    _escribir_meta(ruta_meta, {
+        'version': VERSION_CACHE,
+        'origen': os.path.basename(ruta),
+        'mtime_ns': estado.st_mtime_ns,
+        'tamano': estado.st_size,
+        'sha256': huella,
+    })
+    return df
+
+
+def cargar_tablas(directorio=None, usar_cache=True, compacto=False):
+    """Carga (df_clientes, df_productos, df_ventas, df_detalle)"""
+    return tuple(
+        cargar_tabla(nombre, directorio, usar_cache, compacto)
+        for nombre in ['clientes', 'productos', 'ventas', 'detalle_ventas']
+    )
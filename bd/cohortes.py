@@ -0,0 +1,280 @@
+# ============================================================
+# COHORTES DE ALTA: RETENCIÓN E INGRESOS POR MES
+# ============================================================
+#
+# Cada cliente pertenece a la cohorte del mes de su fecha_alta (el generador
+# no crea ventas antes del alta). Los meses se codifican como enteros (meses
+# desde 1970-01) y las matrices cohorte × meses desde el alta se arman con un
+# solo ordenamiento (pares cliente-mes distintos) y bincount, sin merge ni
+# pivot_table. El motor admite lotes mensuales en orden:
+#
+#   motor = MotorCohortes().agregar_clientes(df_clientes)
+#   motor.aplicar_lote(ventas_enero, detalle_enero)
+#   motor.aplicar_lote(ventas_febrero, detalle_febrero)
+#   motor.matriz_retencion()
+#   motor.exportar('cohortes.csv')   # tabla densa para el dashboard
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from cargador_datos import cargar_tablas
+
+
+SIN_MES = np.iinfo(np.int64).min
+
+
+def codificar_meses(fechas):
+    """Mes de cada fecha como entero (meses desde 1970-01)"""
+    return pd.to_datetime(fechas).to_numpy().astype('datetime64[M]').astype(np.int64)
+
+
+def etiqueta_mes(codigo):
+    """'AAAA-MM' de un mes codificado"""
+    return str(np.datetime64(int(codigo), 'M'))
+
+
+def _agrandar_matriz(matriz, filas, columnas, desplazar_filas=0):
+    """Matriz con al menos filas × columnas, corriendo el contenido `desplazar_filas` hacia abajo"""
+    if filas <= matriz.shape[0] and columnas <= matriz.shape[1] and desplazar_filas == 0:
+        return matriz
+    nueva = np.zeros((max(filas, matriz.shape[0] + desplazar_filas), max(columnas, matriz.shape[1])),
+                     dtype=matriz.dtype)
+    nueva[desplazar_filas:desplazar_filas + matriz.shape[0], :matriz.shape[1]] = matriz
+    return nueva
+
+# ============================================================
+# MOTOR DE COHORTES
+# ============================================================
+
+class MotorCohortes:
+    """
+    Estado acumulado por cohorte (fila = mes de alta - primer mes de alta) y
+    meses desde el alta (columna): clientes activos distintos, ventas e
+    ingresos. Los lotes de ventas deben llegar en orden de mes (un lote puede
+    repetir el último mes ya cargado); el detalle de cada venta, en su mismo lote.
+    """
+
+    ARREGLOS = ['mes_alta', 'ultimo_mes_activo', 'tamanos', 'activos', 'ventas', 'ingresos']
+
+    def __init__(self):
+        # Por cliente (índice = id_cliente)
+        self.mes_alta = np.full(0, SIN_MES, dtype=np.int64)
+        self.ultimo_mes_activo = np.full(0, SIN_MES, dtype=np.int64)
+        # Por cohorte y meses desde el alta
+        self.primer_mes = None
+        self.tamanos = np.zeros(0, dtype=np.int64)
+        self.activos = np.zeros((0, 0), dtype=np.int64)
+        self.ventas = np.zeros((0, 0), dtype=np.int64)
+        self.ingresos = np.zeros((0, 0), dtype=np.float64)
+        # Último mes con ventas cargadas y ventas descartadas
+        self.ultimo_mes = SIN_MES
+        self.ventas_sin_cliente = 0
+        self.ventas_antes_del_alta = 0
+
+    def _asegurar_forma(self, primera_cohorte, ultima_cohorte, meses):
+        """Agranda las matrices para cubrir las cohortes y los meses desde el alta"""
+        desplazar = 0
+        if self.primer_mes is None:
+            self.primer_mes = primera_cohorte
+        elif primera_cohorte < self.primer_mes:
+            desplazar = self.primer_mes - primera_cohorte
+            self.primer_mes = primera_cohorte
+        filas = ultima_cohorte - self.primer_mes + 1
+
+        if desplazar or filas > len(self.tamanos):
+            tamanos = np.zeros(max(filas, len(self.tamanos) + desplazar), dtype=np.int64)
+            tamanos[desplazar:desplazar + len(self.tamanos)] = self.tamanos
+            self.tamanos = tamanos
+        self.activos = _agrandar_matriz(self.activos, filas, meses, desplazar)
+        self.ventas = _agrandar_matriz(self.ventas, filas, meses, desplazar)
+        self.ingresos = _agrandar_matriz(self.ingresos, filas, meses, desplazar)
+
+    def agregar_clientes(self, clientes):
+        """Registra la cohorte (mes de fecha_alta) de clientes nuevos"""
+        ids = clientes['id_cliente'].to_numpy(dtype=np.int64)
+        if len(ids) == 0:
+            return self
+        meses = codificar_meses(clientes['fecha_alta'])
+
+        tope = int(ids.max()) + 1
+        if tope > len(self.mes_alta):
+            for nombre in ['mes_alta', 'ultimo_mes_activo']:
+                anterior = getattr(self, nombre)
+                nuevo = np.full(max(tope, 2 * len(anterior)), SIN_MES, dtype=np.int64)
+                nuevo[:len(anterior)] = anterior
+                setattr(self, nombre, nuevo)
+
+        previos = self.mes_alta[ids]
+        if ((previos != SIN_MES) & (previos != meses)).any():
+            raise ValueError("Un cliente ya registrado no puede cambiar de cohorte")
+        nuevos = previos == SIN_MES
+        ids, meses = ids[nuevos], meses[nuevos]
+        if len(ids) == 0:
+            return self
+
+        self.mes_alta[ids] = meses
+        self._asegurar_forma(int(meses.min()), int(meses.max()), self.activos.shape[1])
+        self.tamanos += np.bincount(meses - self.primer_mes, minlength=len(self.tamanos))
+        return self
+
+    def aplicar_lote(self, ventas, detalle=None):
+        """
+        Suma un lote de ventas (y el detalle de esas ventas, para los ingresos).
+        El costo es proporcional al lote más el tamaño de las matrices.
+        """
+        ids_venta = ventas['id_venta'].to_numpy(dtype=np.int64)
+        if len(ids_venta) == 0:
+            return self
+        clientes = ventas['id_cliente'].to_numpy(dtype=np.int64)
+        meses = codificar_meses(ventas['fecha'])
+        if meses.min() < self.ultimo_mes:
+            raise ValueError(f"El lote empieza en {etiqueta_mes(meses.min())}, antes del último mes "
+                             f"cargado ({etiqueta_mes(self.ultimo_mes)}): los lotes van en orden de mes")
+        self.ultimo_mes = max(self.ultimo_mes, int(meses.max()))
+
+        # Importe total de cada venta del lote
+        importes = np.zeros(len(ids_venta), dtype=np.float64)
+        if detalle is not None and len(detalle):
+            posicion = pd.Index(ids_venta).get_indexer(detalle['id_venta'].to_numpy(dtype=np.int64))
+            conocidas = posicion >= 0
+            importes = np.bincount(posicion[conocidas], minlength=len(ids_venta),
+                                   weights=detalle['importe'].to_numpy(dtype=np.float64)[conocidas])
+
+        # Ventas de clientes registrados, desde su mes de alta
+        registrado = (clientes >= 0) & (clientes < len(self.mes_alta))
+        registrado[registrado] = self.mes_alta[clientes[registrado]] != SIN_MES
+        self.ventas_sin_cliente += int(np.count_nonzero(~registrado))
+        clientes, meses, importes = clientes[registrado], meses[registrado], importes[registrado]
+        desde_alta = meses - self.mes_alta[clientes]
+        validas = desde_alta >= 0
+        self.ventas_antes_del_alta += int(np.count_nonzero(~validas))
+        clientes, meses, importes, desde_alta = (clientes[validas], meses[validas],
+                                                 importes[validas], desde_alta[validas])
+        if len(clientes) == 0:
+            return self
+
+        self._asegurar_forma(self.primer_mes, self.primer_mes + len(self.tamanos) - 1, int(desde_alta.max()) + 1)
+        filas, columnas = self.activos.shape
+        celda = (self.mes_alta[clientes] - self.primer_mes) * columnas + desde_alta
+        self.ventas += np.bincount(celda, minlength=filas * columnas).reshape(filas, columnas)
+        self.ingresos += np.bincount(celda, weights=importes, minlength=filas * columnas).reshape(filas, columnas)
+
+        # Pares cliente-mes distintos (un solo ordenamiento); cuentan solo los que no se vieron antes
+        orden = np.lexsort((meses, clientes))
+        clientes, meses, celda = clientes[orden], meses[orden], celda[orden]
+        primero = np.ones(len(clientes), dtype=bool)
+        primero[1:] = (clientes[1:] != clientes[:-1]) | (meses[1:] != meses[:-1])
+        clientes, meses, celda = clientes[primero], meses[primero], celda[primero]
+        nuevos = meses > self.ultimo_mes_activo[clientes]
+        np.maximum.at(self.ultimo_mes_activo, clientes[nuevos], meses[nuevos])
+        self.activos += np.bincount(celda[nuevos], minlength=filas * columnas).reshape(filas, columnas)
+        return self
+
+    # ------------------------------------------------------------
+    # Resultados
+    # ------------------------------------------------------------
+
+    def _observadas(self):
+        """Máscara de celdas cuyo mes de actividad ya ocurrió (las demás son NaN)"""
+        filas, columnas = self.activos.shape
+        mes_actividad = self.primer_mes + np.arange(filas)[:, None] + np.arange(columnas)[None, :]
+        return mes_actividad <= self.ultimo_mes
+
+    def _como_dataframe(self, valores):
+        filas = len(self.tamanos)
+        indice = pd.Index([etiqueta_mes(self.primer_mes + i) for i in range(filas)], name='cohorte')
+        columnas = pd.RangeIndex(self.activos.shape[1], name='meses_desde_alta')
+        valores = np.where(self._observadas(), valores, np.nan)
+        return pd.DataFrame(valores, index=indice, columns=columnas)
+
+    def matriz_retencion(self, relativa=True):
+        """Clientes activos por cohorte y meses desde el alta (fracción de la cohorte si relativa)"""
+        activos = self.activos.astype(np.float64)
+        if relativa:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                activos = activos / self.tamanos[:, None]
+        return self._como_dataframe(activos)
+
+    def matriz_ingresos(self, por_cliente=False, acumulada=False):
+        """Ingresos por cohorte y meses desde el alta (por cliente de la cohorte / acumulados)"""
+        ingresos = np.cumsum(self.ingresos, axis=1) if acumulada else self.ingresos.copy()
+        if por_cliente:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                ingresos = ingresos / self.tamanos[:, None]
+        return self._como_dataframe(ingresos)
+
+    def tabla_densa(self):
+        """Una fila por cohorte y mes observado (con ceros), lista para el dashboard"""
+        fila, columna = np.nonzero(self._observadas())
+        tamanos = self.tamanos[fila]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            retencion = self.activos[fila, columna] / tamanos
+        return pd.DataFrame({
+            'cohorte': [etiqueta_mes(self.primer_mes + f) for f in fila],
+            'mes_actividad': [etiqueta_mes(self.primer_mes + f + c) for f, c in zip(fila, columna)],
+            'meses_desde_alta': columna,
+            'clientes_cohorte': tamanos,
+            'clientes_activos': self.activos[fila, columna],
+            'retencion': retencion,
+            'ventas': self.ventas[fila, columna],
+            'ingresos': self.ingresos[fila, columna],
+        })
+
+    def exportar(self, ruta):
+        """Exporta la tabla densa a CSV"""
+        self.tabla_densa().to_csv(ruta, index=False, encoding='utf-8-sig')
+        return ruta
+
+    # ------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------
+
+    def guardar(self, ruta):
+        """Persiste el estado en un archivo .npz"""
+        np.savez(
+            ruta,
+            **{nombre: getattr(self, nombre) for nombre in self.ARREGLOS},
+            escalares=np.array([
+                SIN_MES if self.primer_mes is None else self.primer_mes,
+                self.ultimo_mes, self.ventas_sin_cliente, self.ventas_antes_del_alta,
+            ], dtype=np.int64),
+        )
+
+    @classmethod
+    def cargar(cls, ruta):
+        """Reconstruye el motor desde un archivo guardado con guardar()"""
+        motor = cls()
+        with np.load(ruta) as datos:
+            for nombre in cls.ARREGLOS:
+                setattr(motor, nombre, datos[nombre])
+            primer_mes, ultimo_mes, sin_cliente, antes_del_alta = (int(v) for v in datos['escalares'])
+        motor.primer_mes = None if primer_mes == SIN_MES else primer_mes
+        motor.ultimo_mes = ultimo_mes
+        motor.ventas_sin_cliente = sin_cliente
+        motor.ventas_antes_del_alta = antes_del_alta
+        return motor
+
+
+def calcular_cohortes(clientes, ventas, detalle=None):
+    """Motor de cohortes con todas las ventas en un solo lote"""
+    return MotorCohortes().agregar_clientes(clientes).aplicar_lote(ventas, detalle)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retención e ingresos por cohorte de alta")
+    parser.add_argument('directorio', nargs='?', default=None, help="Carpeta con las tablas")
+    parser.add_argument('--salida', default=None, help="CSV de la tabla densa (por defecto, cohortes.csv)")
+    args = parser.parse_args()
+
+    df_clientes, _, df_ventas, df_detalle = cargar_tablas(args.directorio, compacto=True)
+    motor = calcular_cohortes(df_clientes, df_ventas, df_detalle)
+    print("📅 Retención por cohorte (fracción de clientes activos):")
+    print(motor.matriz_retencion().iloc[:, :13].round(2).to_string())
+    if motor.ventas_sin_cliente or motor.ventas_antes_del_alta:
+        print(f"⚠️  Ventas descartadas: {motor.ventas_sin_cliente} sin cliente, "
+              f"{motor.ventas_antes_del_alta} anteriores al alta")
+    ruta = args.salida or os.path.join(args.directorio or '.', 'cohortes.csv')
+    print(f"✓ Tabla densa exportada: {motor.exportar(ruta)}")
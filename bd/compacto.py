@@ -0,0 +1,174 @@
+# ============================================================
+# REPRESENTACIÓN COMPACTA DE LAS TABLAS (ENTEROS Y CATEGORÍAS)
+# ============================================================
+#
+# Las tablas de hechos no guardan atributos de las dimensiones (nombre_cliente,
+# email, nombre_producto): se unen solo cuando hacen falta (expandir_*).
+# Los enteros se reducen (ids a int32 como mínimo, para que max() + 1 y los
+# índices por id no desborden; cantidades a int16), los textos de pocos valores
+# pasan a categorías y los flotantes a float32 cuando no se pierde precisión.
+
+import numpy as np
+import pandas as pd
+
+
+# Columnas de las tablas de hechos que repiten atributos de una dimensión
+COLUMNAS_REDUNDANTES = {
+    'ventas': ['nombre_cliente', 'email'],
+    'detalle_ventas': ['nombre_producto'],
+}
+
+# Orden de las columnas en el formato ancho (CSV original)
+COLUMNAS_ANCHAS = {
+    'ventas': ['id_venta', 'id_cliente', 'fecha', 'nombre_cliente', 'email', 'medio_pago'],
+    'detalle_ventas': ['id_detalle', 'id_venta', 'id_producto', 'nombre_producto',
+                       'cantidad', 'precio_unitario', 'importe'],
+}
+
+# Categorías fijas (códigos estables entre archivos / chunks); None = las del dato
+MEDIOS_PAGO = ['efectivo', 'qr', 'tarjeta', 'transferencia']
+NIVELES_POPULARIDAD = ['estrella', 'alta', 'media', 'baja', 'muy_baja']
+
+TIPOS_COMPACTOS = {
+    'clientes': {
+        'ids': ['id_cliente'],
+        'fechas': ['fecha_alta'],
+        'categorias': {'ciudad': None},
+    },
+    'productos': {
+        'ids': ['id_producto'],
+        'enteros': ['score_pop'],
+        'flotantes': ['precio_unitario'],
+        'categorias': {'categoria': None, 'popularidad': NIVELES_POPULARIDAD},
+    },
+    'ventas': {
+        'ids': ['id_venta', 'id_cliente'],
+        'fechas': ['fecha'],
+        'categorias': {'medio_pago': MEDIOS_PAGO},
+    },
+    'detalle_ventas': {
+        'ids': ['id_detalle', 'id_venta', 'id_producto'],
+        'enteros': ['cantidad'],
+        'flotantes': ['precio_unitario', 'importe'],
+    },
+}
+
+TABLAS = ['clientes', 'productos', 'ventas', 'detalle_ventas']
+
+
+# ============================================================
+# REDUCCIÓN DE TIPOS
+# ============================================================
+
+def reducir_entero(serie, minimo=np.int16):
+    """Entero más chico que contiene los valores, sin bajar de `minimo` (no toca columnas con nulos)"""
+    if serie.isna().any():
+        return serie
+    serie = pd.to_numeric(serie, downcast='integer')
+    if serie.dtype.itemsize < np.dtype(minimo).itemsize:
+        serie = serie.astype(minimo)
+    return serie
+
+
+def reducir_flotante(serie):
+    """float32 si todos los valores se representan exactos; si no, float64 (los enteros siguen enteros)"""
+    if pd.api.types.is_integer_dtype(serie):
+        return reducir_entero(serie, np.int32)
+    valores = serie.to_numpy(dtype=np.float64)
+    reducidos = valores.astype(np.float32)
+    if np.array_equal(reducidos.astype(np.float64), valores, equal_nan=True):
+        return pd.Series(reducidos, index=serie.index, name=serie.name)
+    return serie.astype(np.float64)
+
+
+def a_categoria(serie, categorias=None):
+    """Categoría con las categorías dadas (códigos estables) o las del dato"""
+    if categorias is None:
+        categorias = sorted(serie.dropna().astype(str).unique())
+    return pd.Categorical(serie, categories=categorias)
+
+
+def compactar_tabla(df, nombre_tabla, quitar_redundantes=True):
+    """Devuelve la tabla con tipos compactos (y sin atributos de dimensiones)"""
+    tipos = TIPOS_COMPACTOS[nombre_tabla]
+    if quitar_redundantes:
+        df = df.drop(columns=COLUMNAS_REDUNDANTES.get(nombre_tabla, []), errors='ignore')
+    df = df.copy()
+
+    for columna in tipos.get('fechas', []):
+        if columna in df.columns:
+            df[columna] = pd.to_datetime(df[columna])
+    for columna in tipos.get('ids', []):
+        if columna in df.columns:
+            df[columna] = reducir_entero(df[columna], np.int32)
+    for columna in tipos.get('enteros', []):
+        if columna in df.columns:
+            df[columna] = reducir_entero(df[columna])
+    for columna in tipos.get('flotantes', []):
+        if columna in df.columns:
+            df[columna] = reducir_flotante(df[columna])
+    for columna, categorias in tipos.get('categorias', {}).items():
+        if columna in df.columns:
+            df[columna] = a_categoria(df[columna], categorias)
+    return df
+
+
+def compactar_tablas(df_clientes, df_productos, df_ventas, df_detalle):
+    """Compacta las cuatro tablas (mismo orden que cargar_tablas)"""
+    return tuple(
+        compactar_tabla(df, nombre)
+        for df, nombre in zip([df_clientes, df_productos, df_ventas, df_detalle], TABLAS)
+    )
+
+
+# ============================================================
+# ATRIBUTOS DE DIMENSIONES BAJO DEMANDA
+# ============================================================
+
+def atributo_por_id(ids, df_dimension, clave, columna):
+    """Valores de `columna` de la dimensión para cada id (NaN si no existe)"""
+    posiciones = pd.Index(df_dimension[clave]).get_indexer(np.asarray(ids))
+    valores = df_dimension[columna].to_numpy(dtype=object)
+    resultado = np.full(len(posiciones), np.nan, dtype=object)
+    encontrados = posiciones >= 0
+    resultado[encontrados] = valores[posiciones[encontrados]]
+    return resultado
+
+
+def expandir_ventas(df_ventas, df_clientes):
+    """Ventas en formato ancho: agrega nombre_cliente y email desde Clientes"""
+    df = df_ventas.copy()
+    for columna in COLUMNAS_REDUNDANTES['ventas']:
+        df[columna] = atributo_por_id(df['id_cliente'], df_clientes, 'id_cliente', columna)
+    return df[[c for c in COLUMNAS_ANCHAS['ventas'] if c in df.columns]]
+
+
+def expandir_detalle(df_detalle, df_productos):
+    """Detalle en formato ancho: agrega nombre_producto desde Productos"""
+    df = df_detalle.copy()
+    df['nombre_producto'] = atributo_por_id(df['id_producto'], df_productos, 'id_producto', 'nombre_producto')
+    return df[[c for c in COLUMNAS_ANCHAS['detalle_ventas'] if c in df.columns]]
+
+
+# ============================================================
+# DIAGNÓSTICO
+# ============================================================
+
+def memoria_mb(df):
+    """Memoria real del DataFrame (incluye el contenido de los textos) en MB"""
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def comparar_memoria(tablas_anchas, tablas_compactas, nombres=TABLAS):
+    """DataFrame con la memoria antes / después de compactar cada tabla"""
+    filas = []
+    for nombre, ancha, compacta in zip(nombres, tablas_anchas, tablas_compactas):
+        antes, despues = memoria_mb(ancha), memoria_mb(compacta)
+        filas.append({
+            'tabla': nombre,
+            'filas': len(compacta),
+            'ancho_mb': round(antes, 2),
+            'compacto_mb': round(despues, 2),
+            'reduccion': round(antes / despues, 1) if despues else None,
+        })
+    return pd.DataFrame(filas)
@@ -0,0 +1,334 @@
+# ============================================================
+# CUBOS DE VENTAS PRE-AGREGADOS (DIARIOS / MENSUALES)
+# ============================================================
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from cargador_datos import cargar_tablas
+from hll import PRECISION, combinar, error_estandar, estimar, sketch_vacio, sketches_por_grupo
+
+
+# Granularidad de los cubos: día x ciudad (del cliente) x medio de pago [x categoría]
+DIMENSIONES = ['fecha', 'ciudad', 'medio_pago']
+PERIODOS = {'D': 'fecha', 'M': 'anio_mes'}
+CUBOS = ['ventas_dia', 'categorias_dia', 'clientes_dia', 'clientes_ciudad']
+
+# Clientes únicos: 'hll' (sketch HyperLogLog por celda, memoria acotada, error ~3.25% con p=10)
+# o 'exacto' (lista de clientes por celda; para validar corridas)
+MODOS_UNICOS = ['hll', 'exacto']
+
+
+def _vacio(columnas):
+    """DataFrame vacío con las columnas dadas (fecha como datetime)"""
+    return pd.DataFrame({
+        columna: pd.Series(dtype='datetime64[ns]' if columna == 'fecha' else object)
+        for columna in columnas
+    })
+
+
+def _solo_dias_nuevos(actual, nuevo):
+    """True si el lote trae solo días posteriores a los ya cargados (caso habitual)"""
+    return len(actual) == 0 or nuevo['fecha'].min() > actual['fecha'].max()
+
+
+def _combinar(actual, nuevo, claves):
+    """
+    Suma un cubo parcial (ordenado por claves) al cubo acumulado (medidas aditivas).
+    Si el lote trae solo días nuevos alcanza con agregarlo al final.
+    Devuelve (cubo, grupos): grupos[i] es la fila destino de la fila i de actual + nuevo,
+    o None si solo se agregó al final.
+    """
+    if _solo_dias_nuevos(actual, nuevo):
+        return (pd.concat([actual, nuevo], ignore_index=True) if len(actual) else nuevo), None
+    combinado = pd.concat([actual, nuevo], ignore_index=True)
+    agrupado = combinado.groupby(claves, observed=True, sort=True)
+    return agrupado.sum().reset_index(), agrupado.ngroup().to_numpy()
+
+
+def _agregar_periodo(df, periodo):
+    """Agrega la columna del período (fecha del día o 'AAAA-MM')"""
+    df = df.copy()
+    if periodo == 'M':
+        df['anio_mes'] = df['fecha'].dt.strftime('%Y-%m')
+    elif periodo != 'D':
+        raise ValueError(f"Período desconocido: {periodo} (usar 'D' o 'M')")
+    return df
+
+
+def _filtrar_fechas(df, desde, hasta):
+    """Filtra un cubo por rango de fechas (inclusive)"""
+    if desde is not None:
+        df = df[df['fecha'] >= pd.Timestamp(desde)]
+    if hasta is not None:
+        df = df[df['fecha'] <= pd.Timestamp(hasta)]
+    return df
+
+
+class CubosVentas:
+    """
+    Capa de agregados para el dashboard, construida una vez por actualización de datos:
+    - ventas_dia: ventas, monto y clientes únicos por día x ciudad x medio de pago
+    - categorias_dia: líneas, unidades, ventas y monto por día x ciudad x medio de pago x categoría
+    - sketches: un HyperLogLog por fila de ventas_dia (modo 'hll'), o bien
+      clientes_dia: clientes distintos de cada celda diaria (modo 'exacto')
+    - clientes_ciudad: cantidad de clientes registrados por ciudad
+    Los únicos de cualquier rango o agrupación salen de unir los sketches (o las listas)
+    de las celdas diarias. Los días nuevos se agregan con actualizar(), sin volver a
+    recorrer los hechos anteriores.
+    """
+
+    def __init__(self, modo_unicos='hll', p=PRECISION):
+        if modo_unicos not in MODOS_UNICOS:
+            raise ValueError(f"Modo desconocido: {modo_unicos} (usar 'hll' o 'exacto')")
+        self.modo_unicos = modo_unicos
+        self.p = p
+        self.ventas_dia = _vacio(DIMENSIONES + ['ventas', 'monto', 'clientes'])
+        self.categorias_dia = _vacio(DIMENSIONES + ['categoria', 'lineas', 'unidades', 'ventas', 'monto'])
+        self.clientes_dia = _vacio(DIMENSIONES + ['id_cliente'])
+        self.sketches = sketch_vacio(0, p)
+        self.clientes_ciudad = _vacio(['ciudad', 'clientes'])
+        # Dimensiones necesarias para ubicar los hechos nuevos
+        self.ciudad_por_cliente = pd.Series(dtype=object)
+        self.categoria_por_producto = pd.Series(dtype=object)
+
+    @classmethod
+    def construir(cls, df_ventas, df_detalle, df_clientes, df_productos, modo_unicos='hll'):
+        """Construye los cubos desde las cuatro tablas"""
+        return cls(modo_unicos).actualizar(df_ventas, df_detalle, df_clientes, df_productos)
+
+    # ============================================================
+    # ACTUALIZACIÓN
+    # ============================================================
+
+    def _actualizar_dimensiones(self, df_clientes, df_productos):
+        """Incorpora clientes / productos nuevos o modificados"""
+        if df_clientes is not None:
+            nuevos = pd.Series(df_clientes['ciudad'].astype(str).to_numpy(), index=df_clientes['id_cliente'].to_numpy())
+            self.ciudad_por_cliente = nuevos.combine_first(self.ciudad_por_cliente)
+            self.clientes_ciudad = (
+                self.ciudad_por_cliente.value_counts().rename_axis('ciudad').reset_index(name='clientes')
+            )
+        if df_productos is not None:
+            nuevos = pd.Series(df_productos['categoria'].astype(str).to_numpy(), index=df_productos['id_producto'].to_numpy())
+            self.categoria_por_producto = nuevos.combine_first(self.categoria_por_producto)
+
+    def actualizar(self, df_ventas, df_detalle, df_clientes=None, df_productos=None):
+        """
+        Agrega un lote de ventas con su detalle (por ejemplo, los días nuevos de una carga).
+        Solo se recorren las filas del lote; los cubos existentes se combinan por suma.
+        """
+        self._actualizar_dimensiones(df_clientes, df_productos)
+        if len(df_ventas) == 0:
+            return self
+
+        ventas = pd.DataFrame({
+            'id_venta': df_ventas['id_venta'].to_numpy(),
+            'id_cliente': df_ventas['id_cliente'].to_numpy(),
+            'fecha': pd.to_datetime(df_ventas['fecha']).dt.normalize().to_numpy(),
+            'ciudad': df_ventas['id_cliente'].map(self.ciudad_por_cliente).to_numpy(),
+            'medio_pago': df_ventas['medio_pago'].astype(str).to_numpy(),
+        })
+        sin_ciudad = ventas['ciudad'].isna().sum()
+        if sin_ciudad:
+            print(f"⚠️  {sin_ciudad} ventas de clientes desconocidos (ciudad 'desconocida')")
+            ventas['ciudad'] = ventas['ciudad'].fillna('desconocida')
+
+        # Detalle ubicado en su celda (fecha, ciudad y medio de pago de la venta)
+        ubicacion = ventas.set_index('id_venta')[DIMENSIONES]
+        detalle = df_detalle[['id_venta', 'id_producto', 'cantidad', 'importe']].join(ubicacion, on='id_venta')
+        huerfanas = detalle['fecha'].isna()
+        if huerfanas.any():
+            print(f"⚠️  {huerfanas.sum()} líneas de detalle sin su venta en el lote (ignoradas)")
+            detalle = detalle[~huerfanas]
+        detalle['categoria'] = detalle['id_producto'].map(self.categoria_por_producto).fillna('sin_categoria')
+
+        # Monto por venta -> cubo diario
+        monto_venta = detalle.groupby('id_venta')['importe'].sum()
+        ventas['monto'] = ventas['id_venta'].map(monto_venta).fillna(0.0)
+        cubo_dia = ventas.groupby(DIMENSIONES, sort=True).agg(
+            ventas=('id_venta', 'size'),
+            monto=('monto', 'sum'),
+        ).reset_index()
+
+        cubo_categoria = detalle.groupby(DIMENSIONES + ['categoria'], sort=True).agg(
+            lineas=('importe', 'size'),
+            unidades=('cantidad', 'sum'),
+            ventas=('id_venta', 'nunique'),
+            monto=('importe', 'sum'),
+        ).reset_index()
+
+        if self.modo_unicos == 'hll':
+            self._actualizar_sketches(ventas, cubo_dia)
+        else:
+            self._actualizar_clientes_exactos(ventas, cubo_dia)
+
+        self.categorias_dia, _ = _combinar(self.categorias_dia, cubo_categoria, DIMENSIONES + ['categoria'])
+        return self
+
+    def _actualizar_sketches(self, ventas, cubo_dia):
+        """Modo 'hll': un sketch por celda diaria; las celdas repetidas se unen con máximo"""
+        celdas = ventas.groupby(DIMENSIONES, sort=True).ngroup().to_numpy()
+        sketches_nuevos = sketches_por_grupo(celdas, ventas['id_cliente'].to_numpy(), len(cubo_dia), self.p)
+        cubo_dia['clientes'] = 0
+
+        self.ventas_dia, grupos = _combinar(self.ventas_dia, cubo_dia, DIMENSIONES)
+        self.sketches = np.concatenate([self.sketches, sketches_nuevos])
+        if grupos is not None:
+            self.sketches = combinar(self.sketches, grupos, len(self.ventas_dia))
+            self.ventas_dia['clientes'] = np.rint(estimar(self.sketches))
+        else:
+            inicio = len(self.ventas_dia) - len(cubo_dia)
+            self.ventas_dia.loc[inicio:, 'clientes'] = np.rint(estimar(sketches_nuevos))
+        self.ventas_dia['clientes'] = self.ventas_dia['clientes'].astype('int64')
+
+    def _actualizar_clientes_exactos(self, ventas, cubo_dia):
+        """Modo 'exacto': lista de clientes distintos por celda diaria"""
+        clientes_nuevos = (
+            ventas[DIMENSIONES + ['id_cliente']].drop_duplicates()
+            .sort_values(DIMENSIONES + ['id_cliente'], ignore_index=True)
+        )
+        cubo_dia['clientes'] = clientes_nuevos.groupby(DIMENSIONES, sort=True).size().to_numpy()
+
+        if _solo_dias_nuevos(self.ventas_dia, cubo_dia):
+            self.clientes_dia = pd.concat([self.clientes_dia, clientes_nuevos], ignore_index=True)
+            self.ventas_dia, _ = _combinar(self.ventas_dia, cubo_dia, DIMENSIONES)
+        else:
+            # Días que ya existían: los únicos no se suman, se recalculan en los días del lote
+            self.clientes_dia = (
+                pd.concat([self.clientes_dia, clientes_nuevos], ignore_index=True)
+                .drop_duplicates()
+                .sort_values(DIMENSIONES + ['id_cliente'], ignore_index=True)
+            )
+            ventas_dia, _ = _combinar(self.ventas_dia.drop(columns='clientes'),
+                                      cubo_dia.drop(columns='clientes'), DIMENSIONES)
+            dias = clientes_nuevos['fecha'].unique()
+            clientes = self.clientes_dia[self.clientes_dia['fecha'].isin(dias)].groupby(DIMENSIONES).size()
+            anteriores = self.ventas_dia.set_index(DIMENSIONES)['clientes']
+            clientes = clientes.combine_first(anteriores[~anteriores.index.get_level_values('fecha').isin(dias)])
+            ventas_dia['clientes'] = ventas_dia.set_index(DIMENSIONES).index.map(clientes)
+            self.ventas_dia = ventas_dia
+        self.clientes_dia['id_cliente'] = self.clientes_dia['id_cliente'].astype('int64')
+        self.ventas_dia['clientes'] = self.ventas_dia['clientes'].astype('int64')
+
+    # ============================================================
+    # CONSULTAS
+    # ============================================================
+
+    def resumen(self, periodo='D', por=(), desde=None, hasta=None):
+        """
+        Ventas, monto y clientes únicos por período ('D' o 'M') y dimensiones `por`
+        (subconjunto de ciudad / medio_pago), leyendo solo los cubos.
+        En modo 'hll' los clientes únicos son estimados (ver error_unicos()).
+        """
+        columna = PERIODOS[periodo]
+        claves = [columna] + list(por)
+
+        ventas = _agregar_periodo(_filtrar_fechas(self.ventas_dia, desde, hasta), periodo)
+        agrupado = ventas.groupby(claves, observed=True, sort=True)
+        tabla = agrupado.agg(ventas=('ventas', 'sum'), monto=('monto', 'sum'))
+
+        if self.modo_unicos == 'hll':
+            sketches = combinar(self.sketches[ventas.index.to_numpy()], agrupado.ngroup().to_numpy(), len(tabla))
+            tabla['clientes_unicos'] = np.rint(estimar(sketches)).astype('int64')
+        else:
+            clientes = _agregar_periodo(_filtrar_fechas(self.clientes_dia, desde, hasta), periodo)
+            tabla['clientes_unicos'] = clientes.drop_duplicates(claves + ['id_cliente']).groupby(claves).size()
+        return tabla.reset_index()
+
+    def error_unicos(self):
+        """Error estándar relativo de los clientes únicos (0 en modo exacto)"""
+        return error_estandar(self.p) if self.modo_unicos == 'hll' else 0.0
+
+    def ventas_por_dia(self, desde=None, hasta=None):
+        """Tendencia diaria (reemplaza el resample('D') sobre df_base)"""
+        return self.resumen('D', desde=desde, hasta=hasta)
+
+    def clientes_unicos_por_mes(self, desde=None, hasta=None):
+        """Clientes únicos y ventas por mes (reemplaza el groupby por Año_mes)"""
+        return self.resumen('M', desde=desde, hasta=hasta)[['anio_mes', 'clientes_unicos', 'ventas']]
+
+    def por_categoria(self, periodo='M', por=(), desde=None, hasta=None):
+        """Líneas, unidades, ventas y monto por período y categoría"""
+        claves = [PERIODOS[periodo]] + list(por) + ['categoria']
+        categorias = _agregar_periodo(_filtrar_fechas(self.categorias_dia, desde, hasta), periodo)
+        return categorias.groupby(claves, observed=True)[['lineas', 'unidades', 'ventas', 'monto']].sum().reset_index()
+
+    # ============================================================
+    # PERSISTENCIA
+    # ============================================================
+
+    def guardar(self, carpeta):
+        """Guarda los cubos (pickle) para la próxima actualización"""
+        os.makedirs(carpeta, exist_ok=True)
+        for nombre in CUBOS + ['ciudad_por_cliente', 'categoria_por_producto']:
+            getattr(self, nombre).to_pickle(os.path.join(carpeta, f"{nombre}.pkl"))
+        np.save(os.path.join(carpeta, 'sketches.npy'), self.sketches)
+        meta = {
+            'ultimo_dia': str(self.ventas_dia['fecha'].max().date()) if len(self.ventas_dia) else None,
+            'modo_unicos': self.modo_unicos,
+            'p': self.p,
+        }
+        with open(os.path.join(carpeta, 'cubos.json'), 'w', encoding='utf-8') as archivo:
+            json.dump(meta, archivo)
+
+    @classmethod
+    def cargar(cls, carpeta):
+        """Carga cubos guardados con guardar()"""
+        with open(os.path.join(carpeta, 'cubos.json'), encoding='utf-8') as archivo:
+            meta = json.load(archivo)
+        cubos = cls(meta['modo_unicos'], meta['p'])
+        cubos.sketches = np.load(os.path.join(carpeta, 'sketches.npy'))
+        for nombre in CUBOS + ['ciudad_por_cliente', 'categoria_por_producto']:
+            setattr(cubos, nombre, pd.read_pickle(os.path.join(carpeta, f"{nombre}.pkl")))
+        return cubos
+
+    def exportar_csv(self, carpeta):
+        """Exporta los cubos a CSV (para Power BI)"""
+        os.makedirs(carpeta, exist_ok=True)
+        for nombre in ['ventas_dia', 'categorias_dia', 'clientes_ciudad']:
+            getattr(self, nombre).to_csv(os.path.join(carpeta, f"{nombre}.csv"), index=False, encoding='utf-8-sig')
+        return carpeta
+
+
+# ============================================================
+# ACTUALIZACIÓN DESDE LA BASE
+# ============================================================
+
+def actualizar_cubos(directorio=None, carpeta_cubos='cubos', modo_unicos='hll'):
+    """
+    Construye los cubos la primera vez; en las siguientes solo agrega
+    las ventas posteriores al último día ya cargado (con el modo guardado).
+    """
+    df_clientes, df_productos, df_ventas, df_detalle = cargar_tablas(directorio)
+
+    if os.path.exists(os.path.join(carpeta_cubos, 'cubos.json')):
+        with open(os.path.join(carpeta_cubos, 'cubos.json'), encoding='utf-8') as archivo:
+            ultimo_dia = json.load(archivo)['ultimo_dia']
+        cubos = CubosVentas.cargar(carpeta_cubos)
+        if ultimo_dia is not None:
+            df_ventas = df_ventas[pd.to_datetime(df_ventas['fecha']) >= pd.Timestamp(ultimo_dia) + pd.Timedelta(days=1)]
+            df_detalle = df_detalle[df_detalle['id_venta'].isin(df_ventas['id_venta'])]
+        print(f"Actualizando cubos con {len(df_ventas)} ventas nuevas...")
+        cubos.actualizar(df_ventas, df_detalle, df_clientes, df_productos)
+    else:
+        print(f"Construyendo cubos con {len(df_ventas)} ventas...")
+        cubos = CubosVentas.construir(df_ventas, df_detalle, df_clientes, df_productos, modo_unicos)
+
+    cubos.guardar(carpeta_cubos)
+    cubos.exportar_csv(carpeta_cubos)
+    print(f"✓ Cubos guardados en {carpeta_cubos} ({len(cubos.ventas_dia)} celdas diarias)")
+    return cubos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construye / actualiza los cubos de ventas del dashboard")
+    parser.add_argument('directorio', nargs='?', default=None, help="Carpeta con las tablas")
+    parser.add_argument('--salida', default='cubos', help="Carpeta de los cubos")
+    parser.add_argument('--exacto', action='store_true', help="Clientes únicos exactos (validación)")
+    args = parser.parse_args()
+    actualizar_cubos(args.directorio, args.salida, 'exacto' if args.exacto else 'hll')
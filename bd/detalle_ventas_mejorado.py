@@ -2,9 +2,13 @@
 # VERSIÓN MEJORADA DE GENERACIÓN DE DETALLE_VENTAS
 # ============================================================
 
+import numpy as np
 import pandas as pd
 import random
 
+from muestreador_popularidad import MuestreadorPopularidad
+from instrumentacion import METRICAS
+
 # Configuración (mantener igual)
 TIPOS_COMPRA = {
     'rapida_snack': {
@@ -45,7 +49,7 @@ PROB_SELECCION = {
 # FUNCIONES MEJORADAS
 # ============================================================
 
-def determinar_tipo_compra(medio_pago):
+def determinar_tipo_compra(medio_pago, rng=random):
     """Determina tipo de compra, influenciado por medio de pago"""
     if medio_pago == 'efectivo':
         pesos_ajustados = [0.50, 0.40, 0.08, 0.02]
@@ -55,65 +59,54 @@ def determinar_tipo_compra(medio_pago):
         pesos_ajustados = [v['peso'] for v in TIPOS_COMPRA.values()]
     
     tipos = list(TIPOS_COMPRA.keys())
-    return random.choices(tipos, weights=pesos_ajustados, k=1)[0]
-
-
-def seleccionar_producto_por_popularidad(df_productos):
-    """Selecciona un producto respetando probabilidades de popularidad"""
-    popularidades = list(PROB_SELECCION.keys())
-    probs = list(PROB_SELECCION.values())
-    
-    popularidad_elegida = random.choices(popularidades, weights=probs, k=1)[0]
-    productos_disponibles = df_productos[df_productos['popularidad'] == popularidad_elegida]
-    
-    if len(productos_disponibles) > 0:
-        return productos_disponibles.sample(1).iloc[0]
-    else:
-        return df_productos.sample(1).iloc[0]
+    return rng.choices(tipos, weights=pesos_ajustados, k=1)[0]
 
 
-def calcular_cantidad(precio_unitario, tipo_compra):
+def calcular_cantidad(precio_unitario, tipo_compra, rng=random):
     """Calcula cantidad realista según precio Y tipo de compra"""
     
     # PRODUCTOS BARATOS (<$2000)
     if precio_unitario < 2000:
         if tipo_compra == 'rapida_snack':
-            return random.randint(1, 2)
+            return rng.randint(1, 2)
         elif tipo_compra == 'diaria_basica':
-            return random.randint(1, 4)
+            return rng.randint(1, 4)
         elif tipo_compra == 'semanal':
-            return random.randint(2, 8)
+            return rng.randint(2, 8)
         else:  # grande_mensual
-            return random.randint(3, 12)
+            return rng.randint(3, 12)
     
     # PRODUCTOS MEDIOS ($2000-$4000)
     elif precio_unitario < 4000:
         if tipo_compra in ['rapida_snack', 'diaria_basica']:
-            return random.randint(1, 2)
+            return rng.randint(1, 2)
         elif tipo_compra == 'semanal':
-            return random.randint(1, 4)
+            return rng.randint(1, 4)
         else:  # grande_mensual
-            return random.randint(2, 6)
+            return rng.randint(2, 6)
     
     # PRODUCTOS CAROS (>$4000)
     else:
         if tipo_compra in ['rapida_snack', 'diaria_basica']:
             return 1
         else:  # semanal o grande_mensual
-            return random.randint(1, 3)
+            return rng.randint(1, 3)
 
 
 # ============================================================
 # FUNCIÓN MEJORADA DE GENERACIÓN DE DETALLE
 # ============================================================
 
-def generar_detalle_venta_mejorado(venta, tipo_compra, df_productos):
+def generar_detalle_venta_mejorado(venta, tipo_compra, df_productos, muestreador=None, rng=random):
     """
     Genera el detalle completo de una venta de forma ROBUSTA
     GARANTIZA al menos 1 producto por venta
     """
+    if muestreador is None:
+        muestreador = MuestreadorPopularidad(df_productos, PROB_SELECCION)
+
     config = TIPOS_COMPRA[tipo_compra]
-    num_productos_objetivo = random.randint(config['num_productos'][0], config['num_productos'][1])
+    num_productos_objetivo = rng.randint(config['num_productos'][0], config['num_productos'][1])
     
     detalles = []
     productos_seleccionados = set()
@@ -122,63 +115,61 @@ def generar_detalle_venta_mejorado(venta, tipo_compra, df_productos):
     
     for i in range(num_productos_objetivo):
         
-        # FILTRAR productos que SÍ caben en el presupuesto restante
-        productos_viables = df_productos[
-            (~df_productos['id_producto'].isin(productos_seleccionados)) &  # No duplicados
-            (df_productos['precio_unitario'] <= presupuesto_restante)      # Caben en presupuesto
-        ]
-        
-        # Si no hay productos viables sin duplicar, permitir duplicados como último recurso
-        if len(productos_viables) == 0:
-            productos_viables = df_productos[
-                df_productos['precio_unitario'] <= presupuesto_restante
-            ]
+        # Elegir entre productos que SÍ caben en el presupuesto restante (sin duplicar si se puede)
+        with METRICAS.temporizador('detalle.seleccion_producto'):
+            posicion = muestreador.elegir_con_presupuesto(presupuesto_restante, productos_seleccionados, rng)
         
-        # Si AÚN no hay productos viables (presupuesto muy bajo), tomar el más barato
-        if len(productos_viables) == 0:
+        # Si no hay productos viables (presupuesto muy bajo), tomar el más barato
+        if posicion is None:
             # Si ya tiene productos, terminar aquí
             if len(detalles) > 0:
+                METRICAS.contar('detalle.cortes_presupuesto')
                 break
             # Si no tiene ninguno, FORZAR el producto más barato
-            productos_viables = df_productos.nsmallest(1, 'precio_unitario')
+            METRICAS.contar('detalle.forzados_mas_barato')
+            posicion = muestreador.mas_barato
         
-        # Seleccionar producto de los viables
-        producto = seleccionar_producto_por_popularidad(productos_viables)
-        productos_seleccionados.add(producto['id_producto'])
+        productos_seleccionados.add(posicion)
+        precio_producto = muestreador.precios[posicion]
         
         # Calcular cantidad
-        cantidad = calcular_cantidad(producto['precio_unitario'], tipo_compra)
-        
-        # Opcional: Aplicar variación de precio histórico (5% de los productos)
-        precio_unitario = producto['precio_unitario']
-        if random.random() < 0.05:
-            variacion = random.uniform(-0.10, 0.10)
-            precio_unitario = round(precio_unitario * (1 + variacion), -1)
-        
-        importe = cantidad * precio_unitario
+        with METRICAS.temporizador('detalle.calculo_cantidad'):
+            cantidad = calcular_cantidad(precio_producto, tipo_compra, rng)
+            
+            # Opcional: Aplicar variación de precio histórico (5% de los productos)
+            precio_unitario = precio_producto
+            if rng.random() < 0.05:
+                variacion = rng.uniform(-0.10, 0.10)
+                precio_unitario = round(precio_unitario * (1 + variacion), -1)
+            
+            importe = cantidad * precio_unitario
         
         # Ajustar cantidad si excede presupuesto restante
         if importe > presupuesto_restante:
-            # Calcular cuántas unidades SÍ caben
-            cantidad_maxima = int(presupuesto_restante / precio_unitario)
-            
-            if cantidad_maxima >= 1:
-                cantidad = cantidad_maxima
-                importe = cantidad * precio_unitario
-            else:
-                # No cabe ni 1 unidad
-                if len(detalles) > 0:
-                    break  # Ya tiene productos, puede terminar
+            METRICAS.contar('detalle.ajustes_presupuesto')
+            with METRICAS.temporizador('detalle.ajuste_presupuesto'):
+                # Calcular cuántas unidades SÍ caben
+                cantidad_maxima = int(presupuesto_restante / precio_unitario)
+                
+                if cantidad_maxima >= 1:
+                    cantidad = cantidad_maxima
+                    importe = cantidad * precio_unitario
                 else:
-                    # FORZAR 1 unidad aunque exceda (para no dejar venta vacía)
-                    cantidad = 1
-                    importe = precio_unitario
+                    # No cabe ni 1 unidad
+                    if len(detalles) > 0:
+                        METRICAS.contar('detalle.cortes_presupuesto')
+                        break  # Ya tiene productos, puede terminar
+                    else:
+                        # FORZAR 1 unidad aunque exceda (para no dejar venta vacía)
+                        METRICAS.contar('detalle.forzados_una_unidad')
+                        cantidad = 1
+                        importe = precio_unitario
         
         # Agregar el detalle
         detalle = {
             'id_venta': venta['id_venta'],
-            'id_producto': int(producto['id_producto']),
-            'nombre_producto': producto['nombre_producto'],
+            'id_producto': int(muestreador.ids[posicion]),
+            'nombre_producto': muestreador.nombres[posicion],
             'cantidad': cantidad,
             'precio_unitario': precio_unitario,
             'importe': importe
@@ -191,7 +182,7 @@ def generar_detalle_venta_mejorado(venta, tipo_compra, df_productos):
         
         # Si alcanzó monto mínimo y ya tiene suficientes productos, puede terminar opcionalmente
         if total_acumulado >= config['monto_min'] and len(detalles) >= config['num_productos'][0]:
-            if random.random() < 0.3:  # 30% chance de terminar antes
+            if rng.random() < 0.3:  # 30% chance de terminar antes
                 break
         
         # Si el presupuesto restante es muy bajo, terminar
@@ -200,16 +191,17 @@ def generar_detalle_venta_mejorado(venta, tipo_compra, df_productos):
     
     # VALIDACIÓN FINAL: Si por alguna razón imposible no hay detalles, agregar 1 producto básico
     if len(detalles) == 0:
-        producto_basico = df_productos.nsmallest(1, 'precio_unitario').iloc[0]
+        METRICAS.contar('detalle.ventas_vacias_completadas')
+        posicion = muestreador.mas_barato
         cantidad = 1
         
         detalle = {
             'id_venta': venta['id_venta'],
-            'id_producto': int(producto_basico['id_producto']),
-            'nombre_producto': producto_basico['nombre_producto'],
+            'id_producto': int(muestreador.ids[posicion]),
+            'nombre_producto': muestreador.nombres[posicion],
             'cantidad': cantidad,
-            'precio_unitario': producto_basico['precio_unitario'],
-            'importe': cantidad * producto_basico['precio_unitario']
+            'precio_unitario': muestreador.precios[posicion],
+            'importe': cantidad * muestreador.precios[posicion]
         }
         detalles.append(detalle)
     
@@ -227,15 +219,19 @@ def generar_tabla_detalle_ventas_mejorada(df_ventas, df_productos):
     id_detalle_counter = 1  # Contador para ID único
     
     print(f"\n🔄 Generando detalles mejorados para {len(df_ventas)} ventas...")
+    progreso = METRICAS.progreso('detalle_fila', total=len(df_ventas), unidad='ventas')
     
     ventas_list = df_ventas.to_dict('records')
     
+    # Índice de muestreo construido una sola vez para todas las ventas
+    muestreador = MuestreadorPopularidad(df_productos, PROB_SELECCION)
+    
     for idx, venta in enumerate(ventas_list):
         # Determinar tipo de compra
         tipo_compra = determinar_tipo_compra(venta['medio_pago'])
         
         # Generar detalles con función mejorada
-        detalles_venta = generar_detalle_venta_mejorado(venta, tipo_compra, df_productos)
+        detalles_venta = generar_detalle_venta_mejorado(venta, tipo_compra, df_productos, muestreador)
         
         # Agregar ID único a cada detalle
         for detalle in detalles_venta:
@@ -243,10 +239,10 @@ def generar_tabla_detalle_ventas_mejorada(df_ventas, df_productos):
             id_detalle_counter += 1
         
         todos_detalles.extend(detalles_venta)
-        
-        if (idx + 1) % 500 == 0:
-            print(f"  → {idx + 1} ventas procesadas...")
+        progreso.avanzar()
     
+    progreso.cerrar()
+    METRICAS.contar('detalle_fila.lineas', len(todos_detalles))
     # Convertir a DataFrame
     df_detalle = pd.DataFrame(todos_detalles)
     
@@ -259,6 +255,219 @@ def generar_tabla_detalle_ventas_mejorada(df_ventas, df_productos):
     return df_detalle
 
 
+# ============================================================
+# MODO POR LOTES (NUMPY)
+# ============================================================
+
+# Pesos de tipo de compra por medio de pago (mismo criterio que determinar_tipo_compra)
+PESOS_TIPO_POR_MEDIO = {
+    'efectivo': [0.50, 0.40, 0.08, 0.02],
+    'transferencia': [0.10, 0.30, 0.40, 0.20],
+}
+
+# Rangos de cantidad [nivel de precio][tipo de compra] (mismo criterio que calcular_cantidad)
+# Niveles de precio: 0 = <$2000, 1 = <$4000, 2 = resto
+CANTIDAD_MIN = np.array([[1, 1, 2, 3],
+                         [1, 1, 1, 2],
+                         [1, 1, 1, 1]])
+CANTIDAD_MAX = np.array([[2, 4, 8, 12],
+                         [2, 2, 4, 6],
+                         [1, 1, 3, 3]])
+
+
+def _elegir_por_pesos(pesos, rng):
+    """Elige un índice por fila según una matriz de pesos (n_filas x n_opciones)"""
+    acumulado = np.cumsum(pesos, axis=1)
+    u = rng.random(len(pesos)) * acumulado[:, -1]
+    elegido = (u[:, None] >= acumulado).sum(axis=1)
+    return np.minimum(elegido, pesos.shape[1] - 1)
+
+
+def _elegir_k_esimo(mascara, rng):
+    """Elige uniformemente una columna True por fila de la máscara"""
+    disponibles = mascara.sum(axis=1)
+    k = (rng.random(len(mascara)) * disponibles).astype(np.int64)
+    acumulado = np.cumsum(mascara, axis=1)
+    return (acumulado <= k[:, None]).sum(axis=1)
+
+
+def _generar_bloque_detalle(medios_pago, catalogo, rng):
+    """
+    Genera las líneas de un bloque de ventas en paralelo.
+    Cada iteración agrega (como máximo) una línea a todas las ventas activas.
+    """
+    tipos = list(TIPOS_COMPRA.keys())
+    n_ventas = len(medios_pago)
+    precios = catalogo['precios']
+    n_prod = len(precios)
+
+    # Tipo de compra por venta
+    pesos_defecto = [v['peso'] for v in TIPOS_COMPRA.values()]
+    pesos = np.tile(np.array(pesos_defecto, dtype=float), (n_ventas, 1))
+    for medio, pesos_medio in PESOS_TIPO_POR_MEDIO.items():
+        pesos[medios_pago == medio] = pesos_medio
+    tipo = _elegir_por_pesos(pesos, rng)
+
+    num_min = np.array([TIPOS_COMPRA[t]['num_productos'][0] for t in tipos])[tipo]
+    num_max = np.array([TIPOS_COMPRA[t]['num_productos'][1] for t in tipos])[tipo]
+    monto_min = np.array([TIPOS_COMPRA[t]['monto_min'] for t in tipos])[tipo]
+    monto_max = np.array([TIPOS_COMPRA[t]['monto_max'] for t in tipos])[tipo]
+
+    objetivo = rng.integers(num_min, num_max + 1)
+    presupuesto = monto_max * 1.1
+    total = np.zeros(n_ventas)
+    n_lineas = np.zeros(n_ventas, dtype=np.int64)
+    activas = np.ones(n_ventas, dtype=bool)
+    seleccionados = np.zeros((n_ventas, n_prod), dtype=bool)
+
+    lineas = []
+    for paso in range(int(objetivo.max())):
+        activas &= paso < objetivo
+        filas = np.flatnonzero(activas)
+        if len(filas) == 0:
+            break
+
+        # Productos que caben en el presupuesto y no están repetidos
+        cabe = precios[None, :] <= presupuesto[filas, None]
+        viables = cabe & ~seleccionados[filas]
+
+        # Sin productos viables (ni siquiera repitiendo, porque una venta sin
+        # líneas no tiene seleccionados): terminar si ya tiene líneas, si no
+        # forzar el más barato
+        sin_viables = ~viables.any(axis=1)
+        terminan = sin_viables & (n_lineas[filas] > 0)
+        viables[sin_viables & ~terminan, catalogo['mas_barato']] = True
+        activas[filas[terminan]] = False
+        viables = viables[~terminan]
+        filas = filas[~terminan]
+        if len(filas) == 0:
+            continue
+
+        # Selección por popularidad entre los viables
+        nivel = _elegir_por_pesos(np.tile(catalogo['probs_nivel'], (len(filas), 1)), rng)
+        en_nivel = viables & (catalogo['nivel'][None, :] == nivel[:, None])
+        hay_en_nivel = en_nivel.any(axis=1)
+        viables[hay_en_nivel] = en_nivel[hay_en_nivel]
+        producto = _elegir_k_esimo(viables, rng)
+        seleccionados[filas, producto] = True
+
+        # Cantidad y variación de precio histórico (5%)
+        tipo_filas = tipo[filas]
+        nivel_precio = catalogo['nivel_precio'][producto]
+        cantidad = rng.integers(CANTIDAD_MIN[nivel_precio, tipo_filas],
+                                CANTIDAD_MAX[nivel_precio, tipo_filas] + 1)
+        precio = precios[producto].copy()
+        varia = rng.random(len(filas)) < 0.05
+        variacion = rng.uniform(-0.10, 0.10, len(filas))
+        precio[varia] = np.round(precio[varia] * (1 + variacion[varia]), -1)
+        importe = cantidad * precio
+
+        # Ajustar cantidad si excede el presupuesto restante
+        restante = presupuesto[filas]
+        excede = importe > restante
+        cantidad_maxima = np.floor(restante / precio).astype(np.int64)
+        recorta = excede & (cantidad_maxima >= 1)
+        cantidad[recorta] = cantidad_maxima[recorta]
+        no_cabe = excede & (cantidad_maxima < 1)
+        fuerza = no_cabe & (n_lineas[filas] == 0)
+        cantidad[fuerza] = 1
+        importe = cantidad * precio
+
+        # No cabe ni 1 unidad y ya tiene productos: terminar sin agregar
+        descarta = no_cabe & ~fuerza
+        activas[filas[descarta]] = False
+        agrega = ~descarta
+        filas = filas[agrega]
+        lineas.append((filas, np.full(len(filas), paso), producto[agrega],
+                       cantidad[agrega], precio[agrega], importe[agrega]))
+
+        # Actualizar acumuladores y cortes tempranos
+        total[filas] += importe[agrega]
+        presupuesto[filas] -= importe[agrega]
+        n_lineas[filas] += 1
+        minimo_ok = n_lineas[filas] >= num_min[filas]
+        corta = minimo_ok & (total[filas] >= monto_min[filas]) & (rng.random(len(filas)) < 0.3)
+        corta |= minimo_ok & (presupuesto[filas] < 500)
+        activas[filas[corta]] = False
+
+    # VALIDACIÓN FINAL: toda venta debe tener al menos 1 producto
+    vacias = np.flatnonzero(n_lineas == 0)
+    if len(vacias) > 0:
+        barato = catalogo['mas_barato']
+        lineas.append((vacias, np.zeros(len(vacias), dtype=np.int64),
+                       np.full(len(vacias), barato), np.ones(len(vacias), dtype=np.int64),
+                       np.full(len(vacias), precios[barato]), np.full(len(vacias), precios[barato])))
+
+    columnas = [np.concatenate(c) for c in zip(*lineas)]
+    orden = np.lexsort((columnas[1], columnas[0]))
+    return [c[orden] for c in columnas]
+
+
+def generar_tabla_detalle_ventas_por_lotes(df_ventas, df_productos, tamano_bloque=20000, seed=None):
+    """
+    Genera la tabla de detalle de ventas procesando bloques de ventas con NumPy.
+    Respeta las mismas reglas que generar_tabla_detalle_ventas_mejorada
+    (presupuesto monto_max * 1.1, al menos 1 producto, sin duplicados por venta)
+    y devuelve las mismas columnas.
+    """
+    rng = np.random.default_rng(seed)
+    niveles = list(PROB_SELECCION.keys())
+    probs = np.array(list(PROB_SELECCION.values()), dtype=float)
+
+    precios = df_productos['precio_unitario'].to_numpy(dtype=float)
+    if 'popularidad' in df_productos.columns:
+        nivel = pd.Categorical(df_productos['popularidad'], categories=niveles).codes
+    else:
+        nivel = np.full(len(df_productos), -1)
+
+    catalogo = {
+        'precios': precios,
+        'nivel': np.asarray(nivel),
+        'probs_nivel': probs / probs.sum(),
+        'nivel_precio': np.select([precios < 2000, precios < 4000], [0, 1], 2),
+        'mas_barato': int(np.argmin(precios)),
+    }
+    ids_producto = df_productos['id_producto'].to_numpy()
+    nombres_producto = df_productos['nombre_producto'].to_numpy()
+
+    ids_venta = df_ventas['id_venta'].to_numpy()
+    medios_pago = df_ventas['medio_pago'].to_numpy()
+
+    print(f"\n🔄 Generando detalles por lotes para {len(df_ventas)} ventas...")
+    progreso = METRICAS.progreso('detalle_lotes', total=len(df_ventas), unidad='ventas')
+
+    bloques = []
+    for inicio in range(0, len(df_ventas), tamano_bloque):
+        fin = min(inicio + tamano_bloque, len(df_ventas))
+        with METRICAS.temporizador('detalle_lotes.bloque'):
+            fila, _, producto, cantidad, precio, importe = _generar_bloque_detalle(
+                medios_pago[inicio:fin], catalogo, rng
+            )
+        bloques.append(pd.DataFrame({
+            'id_venta': ids_venta[inicio:fin][fila],
+            'id_producto': ids_producto[producto].astype(int),
+            'nombre_producto': nombres_producto[producto],
+            'cantidad': cantidad,
+            'precio_unitario': precio,
+            'importe': importe,
+        }))
+        progreso.avanzar(fin - inicio)
+
+    columnas_orden = ['id_detalle', 'id_venta', 'id_producto', 'nombre_producto',
+                      'cantidad', 'precio_unitario', 'importe']
+    if bloques:
+        df_detalle = pd.concat(bloques, ignore_index=True)
+    else:
+        df_detalle = pd.DataFrame(columns=columnas_orden[1:])
+    df_detalle.insert(0, 'id_detalle', range(1, len(df_detalle) + 1))
+    df_detalle = df_detalle[columnas_orden]
+
+    progreso.cerrar()
+    METRICAS.contar('detalle_lotes.lineas', len(df_detalle))
+    print("✓ Generación completada!")
+    return df_detalle
+
+
 # ============================================================
 # FUNCIONES DE VALIDACIÓN
 # ============================================================
@@ -330,6 +539,8 @@ if __name__ == "__main__":
     print("  3. ✅ Agrega ID único (id_detalle) a cada línea")
     print("  4. ✅ Opción de precios históricos (5% de variación)")
     print("  5. ✅ Validación de calidad completa")
+    print("  6. ✅ Modo por lotes con NumPy para grandes volúmenes")
     print("\nPara usar:")
     print("  df_detalle = generar_tabla_detalle_ventas_mejorada(df_ventas, df_productos)")
+    print("  df_detalle = generar_tabla_detalle_ventas_por_lotes(df_ventas, df_productos, seed=42)")
     print("  validar_detalle_ventas(df_detalle, df_ventas)")
\ No newline at end of file
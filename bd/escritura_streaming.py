@@ -0,0 +1,63 @@
+# ============================================================
+# ESCRITURA EN STREAMING (CHUNKS Y RUNS ORDENADOS)
+# ============================================================
+
+import csv
+import heapq
+import os
+
+
+class EscritorCSVPorChunks:
+    """
+    Escribe un CSV fila por fila, volcando al disco cada `tamano_chunk` filas.
+    Usa el mismo formato que DataFrame.to_csv(index=False, encoding='utf-8-sig').
+    """
+
+    def __init__(self, ruta, columnas, tamano_chunk=50000):
+        self.ruta = ruta
+        self.tamano_chunk = tamano_chunk
+        self.filas_escritas = 0
+        self._buffer = []
+        self._archivo = open(ruta, 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._archivo, lineterminator=os.linesep)
+        self._writer.writerow(columnas)
+
+    def agregar(self, fila):
+        """Agrega una fila (lista de valores ya formateados)"""
+        self._buffer.append(fila)
+        if len(self._buffer) >= self.tamano_chunk:
+            self.volcar()
+
+    def volcar(self):
+        """Escribe el chunk pendiente en el archivo"""
+        self._writer.writerows(self._buffer)
+        self.filas_escritas += len(self._buffer)
+        self._buffer = []
+
+    def cerrar(self):
+        """Vuelca lo pendiente y cierra el archivo"""
+        self.volcar()
+        self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def escribir_run(df, ruta):
+    """Escribe un run ordenado (sin encabezado) en un CSV temporal"""
+    df.to_csv(ruta, index=False, header=False, encoding='utf-8', lineterminator='\n')
+    return ruta
+
+
+def leer_run(ruta):
+    """Lee un run fila por fila"""
+    with open(ruta, encoding='utf-8', newline='') as archivo:
+        yield from csv.reader(archivo)
+
+
+def fusionar_runs(rutas, clave):
+    """Fusiona (k-way merge) runs ordenados sin cargarlos en memoria"""
+    return heapq.merge(*(leer_run(ruta) for ruta in rutas), key=clave)
@@ -0,0 +1,152 @@
+# ============================================================
+# EXPORTACIÓN COLUMNAR (PARQUET) CON ESQUEMA TIPADO
+# ============================================================
+
+import os
+import shutil
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: solo se necesita para el formato parquet
+    pa = None
+    pq = None
+
+
+# Tablas particionadas por año-mes de la venta (carpetas anio_mes=AAAA-MM)
+TABLAS_PARTICIONADAS = ['Ventas', 'Detalle_Ventas']
+
+
+def _verificar_pyarrow():
+    """Falla con un mensaje claro si pyarrow no está instalado"""
+    if pa is None:
+        raise ImportError("El formato parquet necesita pyarrow: pip install pyarrow")
+
+
+def esquema_tabla(tabla):
+    """Devuelve el esquema Arrow explícito de cada tabla"""
+    _verificar_pyarrow()
+    categoria = pa.dictionary(pa.int16(), pa.string())
+    esquemas = {
+        'Clientes': [
+            ('id_cliente', pa.int32()),
+            ('nombre_cliente', pa.string()),
+            ('email', pa.string()),
+            ('ciudad', categoria),
+            ('fecha_alta', pa.timestamp('s')),
+        ],
+        'Productos': [
+            ('id_producto', pa.int32()),
+            ('nombre_producto', pa.string()),
+            ('categoria', categoria),
+            ('precio_unitario', pa.float64()),
+            ('score_pop', pa.int32()),
+            ('popularidad', categoria),
+        ],
+        'Ventas': [
+            ('id_venta', pa.int32()),
+            ('id_cliente', pa.int32()),
+            ('fecha', pa.timestamp('s')),
+            ('nombre_cliente', pa.string()),
+            ('email', pa.string()),
+            ('medio_pago', categoria),
+            ('anio_mes', pa.string()),
+        ],
+        'Detalle_Ventas': [
+            ('id_detalle', pa.int32()),
+            ('id_venta', pa.int32()),
+            ('id_producto', pa.int32()),
+            ('nombre_producto', pa.string()),
+            ('cantidad', pa.int32()),
+            ('precio_unitario', pa.float64()),
+            ('importe', pa.float64()),
+            ('anio_mes', pa.string()),
+        ],
+    }
+    return pa.schema(esquemas[tabla])
+
+
+def anio_mes_por_venta(df_ventas):
+    """Serie id_venta -> 'AAAA-MM' para particionar el detalle"""
+    fechas = pd.to_datetime(df_ventas['fecha'])
+    return pd.Series(fechas.dt.strftime('%Y-%m').to_numpy(), index=df_ventas['id_venta'].to_numpy())
+
+
+def preparar_tabla(df, tabla, anio_mes=None):
+    """Convierte un DataFrame a una tabla Arrow con el esquema de `tabla`"""
+    esquema = esquema_tabla(tabla)
+    df = df.copy()
+
+    for campo in esquema:
+        if pa.types.is_timestamp(campo.type) and campo.name in df.columns:
+            df[campo.name] = pd.to_datetime(df[campo.name])
+
+    if tabla == 'Ventas':
+        df['anio_mes'] = df['fecha'].dt.strftime('%Y-%m')
+    elif tabla == 'Detalle_Ventas':
+        if anio_mes is None:
+            raise ValueError("Detalle_Ventas necesita anio_mes (ver anio_mes_por_venta)")
+        df['anio_mes'] = anio_mes.reindex(df['id_venta'].to_numpy()).to_numpy()
+
+    # Solo las columnas del esquema presentes en el DataFrame
+    esquema = pa.schema([campo for campo in esquema if campo.name in df.columns])
+    return pa.Table.from_pandas(df[esquema.names], schema=esquema, preserve_index=False)
+
+
+def exportar_parquet(df, tabla, carpeta, anio_mes=None, parte=0, reemplazar=True):
+    """
+    Exporta una tabla a parquet dentro de `carpeta`.
+    Ventas y Detalle_Ventas se escriben como dataset particionado por anio_mes;
+    `parte` permite escribir la misma tabla en varios chunks.
+    """
+    tabla_arrow = preparar_tabla(df, tabla, anio_mes)
+
+    if tabla not in TABLAS_PARTICIONADAS:
+        ruta = os.path.join(carpeta, f"{tabla}.parquet")
+        pq.write_table(tabla_arrow, ruta)
+        return ruta
+
+    ruta = os.path.join(carpeta, tabla)
+    if reemplazar and parte == 0 and os.path.isdir(ruta):
+        shutil.rmtree(ruta)
+    pq.write_to_dataset(
+        tabla_arrow,
+        root_path=ruta,
+        partition_cols=['anio_mes'],
+        basename_template=f"parte-{parte}-{{i}}.parquet",
+    )
+    return ruta
+
+
+def convertir_csv_a_parquet(ruta_csv, tabla, carpeta, anio_mes=None, tamano_chunk=500_000):
+    """Convierte un CSV exportado a parquet leyendo por chunks"""
+    ruta = None
+    for parte, chunk in enumerate(pd.read_csv(ruta_csv, encoding='utf-8-sig', chunksize=tamano_chunk)):
+        ruta = exportar_parquet(chunk, tabla, carpeta, anio_mes=anio_mes, parte=parte)
+    return ruta
+
+
+def leer_parquet(tabla, carpeta, desde=None, hasta=None, columnas=None):
+    """
+    Lee una tabla parquet. En las tablas particionadas, `desde` / `hasta` ('AAAA-MM')
+    descartan particiones completas sin leerlas.
+    """
+    _verificar_pyarrow()
+    if tabla not in TABLAS_PARTICIONADAS:
+        return pq.read_table(os.path.join(carpeta, f"{tabla}.parquet"), columns=columnas).to_pandas()
+
+    filtros = []
+    if desde is not None:
+        filtros.append(('anio_mes', '>=', desde))
+    if hasta is not None:
+        filtros.append(('anio_mes', '<=', hasta))
+
+    tabla_arrow = pq.read_table(
+        os.path.join(carpeta, tabla),
+        columns=columnas,
+        filters=filtros or None,
+        partitioning='hive',
+    )
+    return tabla_arrow.to_pandas()
@@ -0,0 +1,110 @@
+# ============================================================
+# HYPERLOGLOG: CONTEO APROXIMADO DE DISTINTOS (NUMPY)
+# ============================================================
+#
+# Cada sketch son 2^p registros de 1 byte. El error estándar relativo es
+# 1.04 / sqrt(2^p): con p = 10 (1 KiB por sketch) es ~3.25%, y ~95% de las
+# estimaciones caen dentro de ±6.5%. Para pocos distintos (hasta ~2.5 * 2^p)
+# se usa linear counting, que es prácticamente exacto en cardinalidades chicas.
+# Los sketches se combinan con el máximo registro a registro, así que se pueden
+# unir días, ciudades, meses o shards sin volver a leer los datos.
+
+import numpy as np
+
+
+PRECISION = 10
+
+_MASCARA_64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def error_estandar(p=PRECISION):
+    """Error estándar relativo de un sketch con 2^p registros"""
+    return 1.04 / np.sqrt(2 ** p)
+
+
+def hash64(valores):
+    """Hash de 64 bits (finalizador splitmix64) de enteros, vectorizado"""
+    x = np.asarray(valores).astype(np.uint64)
+    with np.errstate(over='ignore'):
+        x = x + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        x = x ^ (x >> np.uint64(31))
+    return x & _MASCARA_64
+
+
+def _largo_en_bits(x):
+    """Cantidad de bits significativos de enteros < 2^54 (exacto, sin redondeo de float)"""
+    alto = (x >> np.uint64(27)).astype(np.float64)
+    bajo = (x & np.uint64((1 << 27) - 1)).astype(np.float64)
+    _, exp_alto = np.frexp(alto)
+    _, exp_bajo = np.frexp(bajo)
+    return np.where(alto > 0, exp_alto + 27, exp_bajo)
+
+
+def indice_y_rango(valores, p=PRECISION):
+    """Registro (primeros p bits del hash) y rango (ceros iniciales + 1 del resto)"""
+    h = hash64(valores)
+    bits_resto = 64 - p
+    indice = (h >> np.uint64(bits_resto)).astype(np.int64)
+    resto = h & np.uint64((1 << bits_resto) - 1)
+    rango = (bits_resto - _largo_en_bits(resto) + 1).astype(np.uint8)
+    return indice, rango
+
+
+def sketch_vacio(n=None, p=PRECISION):
+    """Un sketch (o una matriz de n sketches) sin elementos"""
+    forma = 2 ** p if n is None else (n, 2 ** p)
+    return np.zeros(forma, dtype=np.uint8)
+
+
+def sketches_por_grupo(grupos, valores, n_grupos, p=PRECISION):
+    """Matriz (n_grupos x 2^p) con el sketch de los valores de cada grupo"""
+    matriz = sketch_vacio(n_grupos, p)
+    if len(valores):
+        indice, rango = indice_y_rango(valores, p)
+        np.maximum.at(matriz, (np.asarray(grupos, dtype=np.int64), indice), rango)
+    return matriz
+
+
+def combinar(matriz, grupos=None, n_grupos=None):
+    """
+    Une sketches con el máximo por registro: todos en uno, o por grupo
+    (grupos[i] = grupo destino de la fila i).
+    """
+    if grupos is None:
+        return matriz.max(axis=0) if len(matriz) else sketch_vacio(p=int(np.log2(matriz.shape[1])))
+    resultado = np.zeros((n_grupos, matriz.shape[1]), dtype=np.uint8)
+    np.maximum.at(resultado, np.asarray(grupos, dtype=np.int64), matriz)
+    return resultado
+
+
+def estimar(registros):
+    """Cantidad estimada de distintos (vectorizado sobre la última dimensión)"""
+    registros = np.asarray(registros)
+    m = registros.shape[-1]
+    alfa = 0.7213 / (1 + 1.079 / m)
+    crudo = alfa * m * m / np.sum(np.exp2(-registros.astype(np.float64)), axis=-1)
+    ceros = np.count_nonzero(registros == 0, axis=-1)
+    with np.errstate(divide='ignore'):
+        lineal = m * np.log(m / np.maximum(ceros, 1))
+    return np.where((crudo <= 2.5 * m) & (ceros > 0), lineal, crudo)
+
+
+class HyperLogLog:
+    """Sketch individual: agregar valores, unir con otro y estimar distintos"""
+
+    def __init__(self, p=PRECISION, registros=None):
+        self.p = p
+        self.registros = sketch_vacio(p=p) if registros is None else registros
+
+    def agregar(self, valores):
+        indice, rango = indice_y_rango(valores, self.p)
+        np.maximum.at(self.registros, indice, rango)
+        return self
+
+    def unir(self, otro):
+        return HyperLogLog(self.p, np.maximum(self.registros, otro.registros))
+
+    def estimar(self):
+        return float(estimar(self.registros))
@@ -0,0 +1,286 @@
+# ============================================================
+# INSTRUMENTACIÓN: TIEMPOS, CONTADORES, PROGRESO Y PERFILES
+# ============================================================
+#
+# METRICAS es la instancia compartida por los generadores. Está inactiva por
+# defecto (temporizadores y contadores no hacen nada); al activarla acumula
+# tiempos por etapa / sub-paso, contadores de filas y reintentos, picos de
+# memoria (tracemalloc) y perfiles cProfile, y se exporta como JSON o como
+# texto de Prometheus:
+#
+#   METRICAS.activar()
+#   with METRICAS.etapa('ventas', perfilar=True):
+#       ...
+#   METRICAS.exportar('metricas.prom')
+
+import cProfile
+import json
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from datetime import datetime
+
+
+INTERVALO_PROGRESO = 2.0   # Segundos entre mensajes de progreso
+TOP_FUNCIONES = 15         # Funciones del perfil que se guardan en el resumen
+PREFIJO_PROMETHEUS = 'aurelion'
+
+
+class _Temporizador:
+    """Suma la duración del bloque al tiempo del nombre dado"""
+
+    __slots__ = ('metricas', 'nombre', 'inicio')
+
+    def __init__(self, metricas, nombre):
+        self.metricas = metricas
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metricas.sumar_tiempo(self.nombre, time.perf_counter() - self.inicio)
+
+
+class _Nulo:
+    """Bloque que no mide nada (métricas inactivas)"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULO = _Nulo()
+
+
+class _Etapa:
+    """Tiempo de una etapa, con pico de memoria y perfil cProfile opcionales"""
+
+    def __init__(self, metricas, nombre, perfilar, memoria, carpeta_perfiles):
+        self.metricas = metricas
+        self.nombre = nombre
+        self.perfilar = perfilar
+        self.memoria = memoria
+        self.carpeta_perfiles = carpeta_perfiles
+        self._perfil = None
+        self._detener_tracemalloc = False
+
+    def __enter__(self):
+        if self.memoria:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._detener_tracemalloc = True
+            tracemalloc.reset_peak()
+        if self.perfilar:
+            self._perfil = cProfile.Profile()
+            self._perfil.enable()
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        segundos = time.perf_counter() - self.inicio
+        if self._perfil is not None:
+            self._perfil.disable()
+            self.metricas.guardar_perfil(self.nombre, self._perfil, self.carpeta_perfiles)
+        if self.memoria:
+            _, pico = tracemalloc.get_traced_memory()
+            self.metricas.memoria[self.nombre] = max(self.metricas.memoria.get(self.nombre, 0), pico)
+            if self._detener_tracemalloc:
+                tracemalloc.stop()
+        self.metricas.sumar_tiempo(self.nombre, segundos)
+        return False
+
+
+class Progreso:
+    """
+    Reemplaza los print cada N filas: informa avance, filas/seg y tiempo
+    restante cada `intervalo` segundos, y al cerrar registra el contador de filas.
+    """
+
+    def __init__(self, nombre, total=None, unidad='filas', metricas=None, intervalo=INTERVALO_PROGRESO):
+        self.nombre = nombre
+        self.total = total
+        self.unidad = unidad
+        self.metricas = metricas
+        self.intervalo = intervalo
+        self.hechos = 0
+        self.inicio = time.perf_counter()
+        self._ultimo_aviso = self.inicio
+
+    def avanzar(self, n=1):
+        self.hechos += n
+        ahora = time.perf_counter()
+        if ahora - self._ultimo_aviso >= self.intervalo:
+            self._ultimo_aviso = ahora
+            self._informar(ahora)
+
+    def _informar(self, ahora):
+        transcurrido = ahora - self.inicio
+        velocidad = self.hechos / transcurrido if transcurrido > 0 else 0.0
+        texto = f"  → {self.hechos:,}"
+        if self.total:
+            texto += f"/{self.total:,} {self.unidad} ({self.hechos / self.total:.0%})"
+            if velocidad > 0:
+                texto += f" · {velocidad:,.0f} {self.unidad}/s · faltan {(self.total - self.hechos) / velocidad:.0f} s"
+        else:
+            texto += f" {self.unidad} · {velocidad:,.0f} {self.unidad}/s"
+        print(texto)
+
+    def cerrar(self):
+        if self.metricas is not None:
+            self.metricas.contar(f"{self.nombre}.{self.unidad}", self.hechos)
+        return self.hechos
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+        return False
+
+
+class Metricas:
+    """Acumulador de tiempos, contadores, memoria y perfiles por etapa"""
+
+    def __init__(self, activa=False):
+        self.activa = activa
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.tiempos = {}      # nombre -> [segundos, llamadas, máximo]
+        self.contadores = {}   # nombre -> valor
+        self.memoria = {}      # etapa -> pico de bytes (tracemalloc)
+        self.perfiles = {}     # etapa -> {'archivo', 'funciones'}
+        self.inicio = datetime.now()
+
+    def activar(self, activa=True):
+        self.activa = activa
+        return self
+
+    # ------------------------------------------------------------
+    # Registro
+    # ------------------------------------------------------------
+
+    def temporizador(self, nombre):
+        """Bloque cuyo tiempo se suma a `nombre` (sub-pasos dentro de los loops)"""
+        return _Temporizador(self, nombre) if self.activa else _NULO
+
+    def sumar_tiempo(self, nombre, segundos):
+        if not self.activa:
+            return
+        tiempo = self.tiempos.get(nombre)
+        if tiempo is None:
+            self.tiempos[nombre] = [segundos, 1, segundos]
+        else:
+            tiempo[0] += segundos
+            tiempo[1] += 1
+            if segundos > tiempo[2]:
+                tiempo[2] = segundos
+
+    def contar(self, nombre, n=1):
+        if self.activa:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+
+    def etapa(self, nombre, perfilar=False, memoria=False, carpeta_perfiles=None):
+        """Bloque de una etapa completa (con cProfile / tracemalloc opcionales)"""
+        if not self.activa:
+            return _NULO
+        return _Etapa(self, nombre, perfilar, memoria, carpeta_perfiles)
+
+    def progreso(self, nombre, total=None, unidad='filas'):
+        return Progreso(nombre, total, unidad, self)
+
+    def guardar_perfil(self, nombre, perfil, carpeta=None):
+        """Guarda el .prof (si hay carpeta) y las funciones más costosas en el resumen"""
+        archivo = None
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+            archivo = os.path.join(carpeta, f"{nombre}.prof")
+            perfil.dump_stats(archivo)
+        estadisticas = pstats.Stats(perfil).sort_stats('cumulative')
+        funciones = []
+        for (archivo_fn, linea, funcion), (_, llamadas, propio, acumulado, _) in estadisticas.stats.items():
+            funciones.append({
+                'funcion': f"{os.path.basename(archivo_fn)}:{linea}({funcion})",
+                'llamadas': llamadas,
+                'propio_s': round(propio, 6),
+                'acumulado_s': round(acumulado, 6),
+            })
+        funciones.sort(key=lambda f: f['acumulado_s'], reverse=True)
+        self.perfiles[nombre] = {'archivo': archivo, 'funciones': funciones[:TOP_FUNCIONES]}
+
+    # ------------------------------------------------------------
+    # Exportación
+    # ------------------------------------------------------------
+
+    def resumen(self):
+        """Métricas como diccionario serializable"""
+        return {
+            'inicio': self.inicio.isoformat(timespec='seconds'),
+            'tiempos': {
+                nombre: {'segundos': round(total, 6), 'llamadas': llamadas, 'maximo_s': round(maximo, 6)}
+                for nombre, (total, llamadas, maximo) in sorted(self.tiempos.items())
+            },
+            'contadores': dict(sorted(self.contadores.items())),
+            'memoria_pico_bytes': dict(sorted(self.memoria.items())),
+            'perfiles': self.perfiles,
+        }
+
+    def exportar_json(self, ruta):
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            json.dump(self.resumen(), archivo, indent=2, ensure_ascii=False)
+        return ruta
+
+    def texto_prometheus(self, prefijo=PREFIJO_PROMETHEUS):
+        """Formato de exposición de texto de Prometheus"""
+        lineas = []
+
+        def serie(nombre, tipo, ayuda, valores, etiqueta):
+            if not valores:
+                return
+            lineas.append(f"# HELP {prefijo}_{nombre} {ayuda}")
+            lineas.append(f"# TYPE {prefijo}_{nombre} {tipo}")
+            for clave, valor in valores:
+                lineas.append(f'{prefijo}_{nombre}{{{etiqueta}="{_escapar(clave)}"}} {valor}')
+
+        serie('etapa_segundos_total', 'counter', 'Tiempo acumulado por etapa o sub-paso',
+              [(n, f"{t[0]:.6f}") for n, t in sorted(self.tiempos.items())], 'etapa')
+        serie('etapa_llamadas_total', 'counter', 'Veces que se midió la etapa o sub-paso',
+              [(n, t[1]) for n, t in sorted(self.tiempos.items())], 'etapa')
+        serie('etapa_segundos_max', 'gauge', 'Duración máxima de una medición',
+              [(n, f"{t[2]:.6f}") for n, t in sorted(self.tiempos.items())], 'etapa')
+        serie('eventos_total', 'counter', 'Filas producidas, reintentos y otros contadores',
+              sorted(self.contadores.items()), 'nombre')
+        serie('memoria_pico_bytes', 'gauge', 'Pico de memoria asignada por Python (tracemalloc)',
+              sorted(self.memoria.items()), 'etapa')
+        return '\n'.join(lineas) + '\n'
+
+    def exportar_prometheus(self, ruta, prefijo=PREFIJO_PROMETHEUS):
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write(self.texto_prometheus(prefijo))
+        return ruta
+
+    def exportar(self, ruta):
+        """JSON si la ruta termina en .json; si no, texto de Prometheus (.prom / .txt)"""
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        if ruta.lower().endswith('.json'):
+            return self.exportar_json(ruta)
+        return self.exportar_prometheus(ruta)
+
+
+def _escapar(texto):
+    """Escapa un valor de etiqueta de Prometheus"""
+    return re.sub(r'(["\\])', r'\\\1', str(texto)).replace('\n', '\\n')
+
+
+# Instancia compartida por los generadores
+METRICAS = Metricas()
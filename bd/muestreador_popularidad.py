@@ -0,0 +1,129 @@
+# ============================================================
+# MUESTREADOR DE PRODUCTOS POR POPULARIDAD
+# ============================================================
+
+import random
+from bisect import bisect_right
+
+import numpy as np
+
+from instrumentacion import METRICAS
+
+
+def construir_tabla_alias(pesos):
+    """Construye la tabla alias (método de Vose) para muestrear pesos en O(1)"""
+    n = len(pesos)
+    total = float(sum(pesos))
+    escalados = [p * n / total for p in pesos]
+    prob = [0.0] * n
+    alias = list(range(n))
+
+    pequenos = [i for i, p in enumerate(escalados) if p < 1.0]
+    grandes = [i for i, p in enumerate(escalados) if p >= 1.0]
+
+    while pequenos and grandes:
+        chico = pequenos.pop()
+        grande = grandes.pop()
+        prob[chico] = escalados[chico]
+        alias[chico] = grande
+        escalados[grande] = escalados[grande] + escalados[chico] - 1.0
+        if escalados[grande] < 1.0:
+            pequenos.append(grande)
+        else:
+            grandes.append(grande)
+
+    # Lo que queda tiene probabilidad 1 (por redondeo numérico)
+    for i in pequenos + grandes:
+        prob[i] = 1.0
+
+    return prob, alias
+
+
+class MuestreadorPopularidad:
+    """
+    Índice de muestreo de productos por nivel de popularidad.
+    Se construye una sola vez a partir de df_productos (después de asignar_popularidad)
+    y cada sorteo cuesta O(1), o O(log n) si se limita por presupuesto.
+    """
+
+    def __init__(self, df_productos, prob_seleccion):
+        self.ids = df_productos['id_producto'].to_numpy()
+        self.nombres = df_productos['nombre_producto'].to_numpy()
+        self.precios = df_productos['precio_unitario'].to_numpy()
+        precios = self.precios.astype(float)
+
+        if 'popularidad' in df_productos.columns:
+            popularidad = df_productos['popularidad'].to_numpy()
+        else:
+            popularidad = np.full(len(df_productos), None)
+
+        # Posiciones de cada nivel ordenadas por precio (para cortar por presupuesto)
+        self.niveles = list(prob_seleccion.keys())
+        self._posiciones_nivel = []
+        self._precios_nivel = []
+        for nivel in self.niveles:
+            posiciones = np.flatnonzero(popularidad == nivel)
+            posiciones = posiciones[np.argsort(precios[posiciones], kind='stable')]
+            self._posiciones_nivel.append(posiciones.tolist())
+            self._precios_nivel.append(precios[posiciones].tolist())
+
+        # Todos los productos ordenados por precio (respaldo cuando el nivel está vacío)
+        orden = np.argsort(precios, kind='stable')
+        self._posiciones_todas = orden.tolist()
+        self._precios_todos = precios[orden].tolist()
+        self.mas_barato = self._posiciones_todas[0]
+
+        self._prob_alias, self._alias = construir_tabla_alias(list(prob_seleccion.values()))
+
+    def __len__(self):
+        return len(self._posiciones_todas)
+
+    def elegir_nivel(self, rng=random):
+        """Sortea un nivel de popularidad (índice en self.niveles)"""
+        i = int(rng.random() * len(self._alias))
+        return i if rng.random() < self._prob_alias[i] else self._alias[i]
+
+    def elegir(self, rng=random):
+        """Devuelve la posición de un producto respetando las probabilidades de popularidad"""
+        posiciones = self._posiciones_nivel[self.elegir_nivel(rng)]
+        if not posiciones:
+            posiciones = self._posiciones_todas
+        return posiciones[int(rng.random() * len(posiciones))]
+
+    def _uniforme_sin(self, posiciones, k, excluir, rng, max_intentos):
+        """Uniforme entre posiciones[:k] que no están en `excluir` (None si no queda ninguna)"""
+        if k == 0:
+            return None
+        for _ in range(max_intentos):
+            posicion = posiciones[int(rng.random() * k)]
+            if posicion not in excluir:
+                return posicion
+            METRICAS.contar('muestreador.reintentos')
+
+        # Muchos rechazos: buscar explícitamente entre los que quedan
+        METRICAS.contar('muestreador.busquedas_explicitas')
+        restantes = [p for p in posiciones[:k] if p not in excluir]
+        return restantes[int(rng.random() * len(restantes))] if restantes else None
+
+    def elegir_con_presupuesto(self, presupuesto, excluir=(), rng=random, max_intentos=10):
+        """
+        Devuelve la posición de un producto con precio <= presupuesto con la
+        regla del filtrado original: se sortea un nivel y se elige uniforme entre
+        sus productos viables (que caben y no están en `excluir`); si el nivel no
+        tiene viables, uniforme entre todos los viables. Si todos los que caben
+        ya están en `excluir`, se permiten duplicados como último recurso.
+        Devuelve None si ningún producto cabe en el presupuesto.
+        """
+        k_todos = bisect_right(self._precios_todos, presupuesto)
+        if k_todos == 0:
+            return None
+        if len(excluir) >= k_todos and all(p in excluir for p in self._posiciones_todas[:k_todos]):
+            METRICAS.contar('muestreador.duplicados_permitidos')
+            excluir = ()
+
+        nivel = self.elegir_nivel(rng)
+        k = bisect_right(self._precios_nivel[nivel], presupuesto)
+        posicion = self._uniforme_sin(self._posiciones_nivel[nivel], k, excluir, rng, max_intentos)
+        if posicion is None:
+            posicion = self._uniforme_sin(self._posiciones_todas, k_todos, excluir, rng, max_intentos)
+        return posicion
@@ -0,0 +1,207 @@
+# ============================================================
+# PUNTUACIÓN DE CLIENTES NUEVOS CONTRA LOS SEGMENTOS GUARDADOS
+# ============================================================
+#
+# Asigna el segmento más cercano con el modelo de segmentacion.guardar_modelo()
+# (escala y centroides en JSON), sin reentrenar ni importar scikit-learn:
+#
+#   puntuador = cargar_puntuador('modelo_segmentos.json')
+#   puntuador.segmentar([12, 3], [4, 1], [52000, 8000])    # R, F, M crudos
+#   puntuador.segmentar_ventas(df_ventas, df_detalle, fecha_corte)
+#
+# Línea de comandos:
+#   python puntuacion.py modelo.json --rfm 12 4 52000
+#   python puntuacion.py modelo.json --csv rfm_nuevos.csv --salida segmentos.csv
+#   python puntuacion.py modelo.json --ventas Ventas.csv --detalle Detalle_Ventas.csv
+#   python puntuacion.py modelo.json --servidor --puerto 8080
+#
+# El servidor responde POST /segmentos con {"Recencia": [...], "Frecuencia": [...],
+# "Monetario": [...]} (o una lista de clientes con esas claves) y GET /modelo.
+
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from rfm import calcular_rfm
+
+
+COLUMNAS_RFM = ['Recencia', 'Frecuencia', 'Monetario']
+PUERTO = 8080
+MAX_CUERPO = 64 * 2 ** 20  # Bytes máximos de un pedido HTTP
+
+# ============================================================
+# PUNTUADOR
+# ============================================================
+
+class PuntuadorSegmentos:
+    """Segmento más cercano (distancia euclídea en el espacio RFM estandarizado)"""
+
+    def __init__(self, modelo):
+        if modelo.get('columnas', COLUMNAS_RFM) != COLUMNAS_RFM:
+            raise ValueError(f"El modelo usa columnas {modelo['columnas']}, se esperaba {COLUMNAS_RFM}")
+        self.modelo = modelo
+        self.k = int(modelo['k'])
+        self.media = np.asarray(modelo['media'], dtype=np.float64)
+        self.desvio = np.asarray(modelo['desvio'], dtype=np.float64)
+        self.centroides = np.asarray(modelo['centroides'], dtype=np.float64)
+        if self.centroides.shape != (self.k, len(COLUMNAS_RFM)):
+            raise ValueError(f"Centroides con forma {self.centroides.shape}, se esperaba ({self.k}, 3)")
+        # ||c||² precalculado: argmin ||z - c||² = argmin (||c||² - 2 z·c)
+        self._normas = (self.centroides ** 2).sum(axis=1)
+
+    def caracteristicas(self, recencia, frecuencia, monetario):
+        """Matriz estandarizada (mismo log1p que segmentacion.caracteristicas_rfm)"""
+        X = np.column_stack([
+            np.asarray(recencia, dtype=np.float64).ravel(),
+            np.asarray(frecuencia, dtype=np.float64).ravel(),
+            np.asarray(monetario, dtype=np.float64).ravel(),
+        ])
+        if np.isnan(X).any():
+            raise ValueError("Hay valores RFM faltantes")
+        return (np.log1p(np.clip(X, 0, None)) - self.media) / self.desvio
+
+    def segmentar(self, recencia, frecuencia, monetario, con_distancia=False):
+        """Segmento de cada cliente (arreglos o escalares de R, F y M crudos)"""
+        Z = self.caracteristicas(recencia, frecuencia, monetario)
+        distancias = self._normas - 2.0 * (Z @ self.centroides.T)
+        segmentos = distancias.argmin(axis=1)
+        if not con_distancia:
+            return segmentos
+        minimas = distancias[np.arange(len(Z)), segmentos] + (Z ** 2).sum(axis=1)
+        return segmentos, np.sqrt(np.clip(minimas, 0, None))
+
+    def segmentar_rfm(self, df_rfm):
+        """Copia de la tabla RFM con columnas 'segmento' y 'distancia'"""
+        faltantes = [c for c in COLUMNAS_RFM if c not in df_rfm.columns]
+        if faltantes:
+            raise ValueError(f"Faltan columnas RFM: {', '.join(faltantes)}")
+        segmentos, distancias = self.segmentar(
+            df_rfm['Recencia'], df_rfm['Frecuencia'], df_rfm['Monetario'], con_distancia=True
+        )
+        df = df_rfm.copy()
+        df['segmento'] = segmentos
+        df['distancia'] = distancias
+        return df
+
+    def segmentar_ventas(self, ventas, detalle, fecha_corte=None):
+        """Segmentos a partir de filas crudas de Ventas / Detalle_Ventas (RFM con rfm.calcular_rfm)"""
+        return self.segmentar_rfm(calcular_rfm(ventas, detalle, fecha_corte))
+
+
+def cargar_puntuador(ruta):
+    """Puntuador a partir del JSON de segmentacion.guardar_modelo()"""
+    with open(ruta, encoding='utf-8') as archivo:
+        return PuntuadorSegmentos(json.load(archivo))
+
+# ============================================================
+# SERVIDOR HTTP LOCAL
+# ============================================================
+
+def columnas_de_pedido(cuerpo):
+    """R, F y M de un pedido: dict de listas (o de escalares) o lista de clientes"""
+    if isinstance(cuerpo, list):
+        cuerpo = {c: [cliente[c] for cliente in cuerpo] for c in COLUMNAS_RFM}
+    if not isinstance(cuerpo, dict):
+        raise ValueError("Se esperaba un objeto JSON o una lista de clientes")
+    faltantes = [c for c in COLUMNAS_RFM if c not in cuerpo]
+    if faltantes:
+        raise ValueError(f"Faltan columnas RFM: {', '.join(faltantes)}")
+    return [np.atleast_1d(np.asarray(cuerpo[c], dtype=np.float64)) for c in COLUMNAS_RFM]
+
+
+def crear_manejador(puntuador):
+    """Clase de http.server que atiende los pedidos con el puntuador dado"""
+
+    class ManejadorPuntuacion(BaseHTTPRequestHandler):
+
+        def _responder(self, estado, datos):
+            cuerpo = json.dumps(datos).encode('utf-8')
+            self.send_response(estado)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def do_GET(self):
+            if self.path == '/modelo':
+                self._responder(200, {'k': puntuador.k, 'columnas': COLUMNAS_RFM})
+            else:
+                self._responder(404, {'error': f"Ruta desconocida: {self.path}"})
+
+        def do_POST(self):
+            if self.path != '/segmentos':
+                self._responder(404, {'error': f"Ruta desconocida: {self.path}"})
+                return
+            largo = int(self.headers.get('Content-Length') or 0)
+            if largo > MAX_CUERPO:
+                self._responder(413, {'error': "Pedido demasiado grande"})
+                return
+            try:
+                recencia, frecuencia, monetario = columnas_de_pedido(json.loads(self.rfile.read(largo)))
+                segmentos, distancias = puntuador.segmentar(recencia, frecuencia, monetario, con_distancia=True)
+            except (ValueError, KeyError, TypeError) as error:
+                self._responder(400, {'error': str(error)})
+                return
+            self._responder(200, {'segmento': segmentos.tolist(), 'distancia': np.round(distancias, 6).tolist()})
+
+        def log_message(self, formato, *args):
+            pass  # Sin una línea por pedido en la consola
+
+    return ManejadorPuntuacion
+
+
+def servir(puntuador, puerto=PUERTO, host='127.0.0.1'):
+    """Levanta el servidor local hasta Ctrl+C"""
+    servidor = ThreadingHTTPServer((host, puerto), crear_manejador(puntuador))
+    print(f"🌐 Puntuación de segmentos en http://{host}:{puerto}/segmentos (k={puntuador.k})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Asigna segmentos RFM con un modelo guardado")
+    parser.add_argument('modelo', help="JSON de segmentacion.guardar_modelo()")
+    entrada = parser.add_mutually_exclusive_group(required=True)
+    entrada.add_argument('--rfm', nargs=3, type=float, metavar=('R', 'F', 'M'), help="Un cliente")
+    entrada.add_argument('--csv', help="CSV con Recencia, Frecuencia y Monetario (y opcionalmente id_cliente)")
+    entrada.add_argument('--ventas', help="Ventas.csv crudo (requiere --detalle)")
+    entrada.add_argument('--servidor', action='store_true', help="Servidor HTTP local")
+    parser.add_argument('--detalle', help="Detalle_Ventas.csv crudo")
+    parser.add_argument('--fecha-corte', default=None, help="Snapshot para la Recencia (con --ventas)")
+    parser.add_argument('--salida', default=None, help="CSV de salida (por defecto se imprime)")
+    parser.add_argument('--puerto', type=int, default=PUERTO)
+    args = parser.parse_args()
+    if args.ventas and not args.detalle:
+        parser.error("--ventas requiere --detalle")
+
+    puntuador = cargar_puntuador(args.modelo)
+
+    if args.servidor:
+        servir(puntuador, args.puerto)
+    elif args.rfm:
+        segmentos, distancias = puntuador.segmentar(*args.rfm, con_distancia=True)
+        print(f"Segmento: {segmentos[0]} (distancia {distancias[0]:.3f})")
+    else:
+        inicio = time.perf_counter()
+        if args.csv:
+            resultado = puntuador.segmentar_rfm(pd.read_csv(args.csv, encoding='utf-8-sig'))
+        else:
+            resultado = puntuador.segmentar_ventas(
+                pd.read_csv(args.ventas, encoding='utf-8-sig'),
+                pd.read_csv(args.detalle, encoding='utf-8-sig'),
+                args.fecha_corte,
+            )
+        segundos = time.perf_counter() - inicio
+        if args.salida:
+            resultado.to_csv(args.salida, index=False, encoding='utf-8-sig')
+            print(f"✓ {len(resultado):,} clientes segmentados en {segundos:.2f} s: {args.salida}")
+        else:
+            print(resultado.to_string(index=False))
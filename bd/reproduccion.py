@@ -0,0 +1,231 @@
+# ============================================================
+# REPRODUCCIÓN DE VENTAS COMO FLUJO DE EVENTOS (PRUEBAS DE CARGA)
+# ============================================================
+#
+# Emite cada venta con sus líneas de detalle como un evento NDJSON, en orden
+# de fecha y respetando los tiempos entre ventas (con los picos de almuerzo y
+# noche de PERFILES_TEMPORAL) acelerados `velocidad` veces, o tan rápido como
+# se pueda con velocidad 0. El escenario es un rango de fechas de la base:
+#
+#   python reproduccion.py "Base de datos" --desde 2024-03-01 --hasta 2024-03-02 --velocidad 100
+#   python reproduccion.py --velocidad 0 --salida tcp://127.0.0.1:9000
+#   python reproduccion.py --velocidad 60 --salida eventos.ndjson    # tail -f eventos.ndjson
+#
+# Las estadísticas (eventos/s y atraso respecto del horario) van a stderr
+# para no mezclarse con los eventos cuando la salida es stdout.
+
+import argparse
+import json
+import socket
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from almacen_columnar import obtener_almacen
+from cargador_datos import cargar_tabla
+from instrumentacion import METRICAS
+
+
+VELOCIDAD = 100.0               # 1 = tiempo real, 0 = lo más rápido posible
+EVENTOS_POR_VACIADO = 1000      # Cada cuántos eventos se vacía el buffer de salida
+INTERVALO_ESTADISTICAS = 5.0    # Segundos entre reportes en stderr
+ESPERA_MINIMA = 0.001           # No se duerme por menos de esto
+
+# ============================================================
+# ESCENARIO Y EVENTOS
+# ============================================================
+
+def cargar_escenario(directorio=None, desde=None, hasta=None, limite=None):
+    """
+    Ventas del rango [desde, hasta) ordenadas por fecha (y id_venta) y el
+    almacén columnar del detalle para leer las líneas de cada venta.
+    """
+    df_ventas = cargar_tabla('ventas', directorio, compacto=True)
+    if desde is not None:
+        df_ventas = df_ventas[df_ventas['fecha'] >= desde]
+    if hasta is not None:
+        df_ventas = df_ventas[df_ventas['fecha'] < hasta]
+    df_ventas = df_ventas.sort_values(['fecha', 'id_venta'], kind='mergesort', ignore_index=True)
+    if limite is not None:
+        df_ventas = df_ventas.head(limite)
+    return df_ventas, obtener_almacen(directorio)
+
+
+def generar_eventos(df_ventas, almacen):
+    """(segundos desde epoch, evento) de cada venta, con sus líneas de detalle"""
+    segundos = df_ventas['fecha'].to_numpy().astype('datetime64[s]').astype(np.int64)
+    fechas = df_ventas['fecha'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+    ids_cliente = df_ventas['id_cliente'].tolist()
+    medios = df_ventas['medio_pago'].astype(str).tolist()
+
+    # Filas de detalle de cada venta (las ventas sin detalle quedan con 0 líneas)
+    offsets = np.asarray(almacen.offsets)
+    ids = df_ventas['id_venta'].to_numpy(dtype=np.int64)
+    con_rango = (ids >= 0) & (ids < len(offsets) - 1)
+    inicios = np.zeros(len(ids), dtype=np.int64)
+    fines = np.zeros(len(ids), dtype=np.int64)
+    inicios[con_rango] = offsets[ids[con_rango]]
+    fines[con_rango] = offsets[ids[con_rango] + 1]
+    inicios, fines, ids_venta = inicios.tolist(), fines.tolist(), ids.tolist()
+
+    # Vistas ndarray del mapeo (sin la sobrecarga de np.memmap al cortar)
+    columnas = ['id_detalle', 'id_producto', 'cantidad', 'precio_unitario', 'importe']
+    arreglos = [np.asarray(almacen.columna(c)) for c in columnas]
+    for i, id_venta in enumerate(ids_venta):
+        inicio, fin = inicios[i], fines[i]
+        lineas = [dict(zip(columnas, valores))
+                  for valores in zip(*(arreglo[inicio:fin].tolist() for arreglo in arreglos))]
+        yield int(segundos[i]), {
+            'tipo': 'venta',
+            'id_venta': id_venta,
+            'id_cliente': ids_cliente[i],
+            'fecha': fechas[i],
+            'medio_pago': medios[i],
+            'lineas': lineas,
+        }
+
+# ============================================================
+# SALIDAS
+# ============================================================
+
+def abrir_salida(destino):
+    """
+    Flujo binario para '-' (stdout), 'tcp://host:puerto' (se conecta a un
+    receptor local) o una ruta de archivo (se agrega al final, apto para tail -f).
+    Devuelve (flujo, función para cerrarlo).
+    """
+    if destino in (None, '-'):
+        return sys.stdout.buffer, sys.stdout.buffer.flush
+    if destino.startswith('tcp://'):
+        host, _, puerto = destino[len('tcp://'):].rpartition(':')
+        conexion = socket.create_connection((host or '127.0.0.1', int(puerto)))
+        flujo = conexion.makefile('wb')
+
+        def cerrar():
+            flujo.close()
+            conexion.close()
+        return flujo, cerrar
+    flujo = open(destino, 'ab')
+    return flujo, flujo.close
+
+# ============================================================
+# REPRODUCCIÓN
+# ============================================================
+
+def _informar(estadisticas, ahora):
+    transcurrido = ahora - estadisticas['inicio']
+    velocidad = estadisticas['eventos'] / transcurrido if transcurrido > 0 else 0.0
+    print(f"  → {estadisticas['eventos']:,} eventos · {velocidad:,.0f} eventos/s · "
+          f"atraso máx. {estadisticas['atraso_max']:.3f} s · hora simulada {estadisticas['hora']}",
+          file=sys.stderr)
+
+
+def reproducir(eventos, flujo, velocidad=VELOCIDAD, intervalo=INTERVALO_ESTADISTICAS):
+    """
+    Escribe los eventos como NDJSON respetando su horario acelerado `velocidad`
+    veces (0 = sin esperas). Cada evento lleva 'emitido' (epoch del envío)
+    para medir la latencia del lado que lo recibe. Devuelve las estadísticas.
+    """
+    inicio = time.perf_counter()
+    estadisticas = {'eventos': 0, 'lineas': 0, 'bytes': 0, 'atraso_max': 0.0, 'hora': None, 'inicio': inicio}
+    primero = None
+    pendientes = 0
+    ultimo_aviso = inicio
+
+    try:
+        for segundos, evento in eventos:
+            if primero is None:
+                primero = segundos
+            ahora = time.perf_counter()
+            if velocidad > 0:
+                objetivo = inicio + (segundos - primero) / velocidad
+                if objetivo - ahora >= ESPERA_MINIMA:
+                    # Antes de dormir se entrega lo pendiente
+                    flujo.flush()
+                    pendientes = 0
+                    time.sleep(objetivo - ahora)
+                    ahora = time.perf_counter()
+                estadisticas['atraso_max'] = max(estadisticas['atraso_max'], ahora - objetivo)
+
+            evento['emitido'] = round(time.time(), 6)
+            linea = json.dumps(evento, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+            flujo.write(linea)
+            estadisticas['eventos'] += 1
+            estadisticas['lineas'] += len(evento['lineas'])
+            estadisticas['bytes'] += len(linea)
+            estadisticas['hora'] = evento['fecha']
+
+            pendientes += 1
+            if pendientes >= EVENTOS_POR_VACIADO:
+                flujo.flush()
+                pendientes = 0
+            if ahora - ultimo_aviso >= intervalo:
+                ultimo_aviso = ahora
+                _informar(estadisticas, ahora)
+        flujo.flush()
+    except BrokenPipeError:
+        # El receptor cerró (ej. `| head`): se termina sin error
+        estadisticas['cortado'] = True
+
+    estadisticas['segundos'] = time.perf_counter() - inicio
+    del estadisticas['inicio']
+    METRICAS.contar('reproduccion.eventos', estadisticas['eventos'])
+    METRICAS.contar('reproduccion.lineas', estadisticas['lineas'])
+    return estadisticas
+
+
+def imprimir_estadisticas(estadisticas):
+    segundos = estadisticas['segundos']
+    velocidad = estadisticas['eventos'] / segundos if segundos > 0 else 0.0
+    print("\n" + "="*60, file=sys.stderr)
+    print("RESUMEN DE LA REPRODUCCIÓN:", file=sys.stderr)
+    print("="*60, file=sys.stderr)
+    print(f"Eventos: {estadisticas['eventos']:,} ({estadisticas['lineas']:,} líneas de detalle)", file=sys.stderr)
+    print(f"Duración: {segundos:.2f} s · {velocidad:,.0f} eventos/s · "
+          f"{estadisticas['bytes'] / 2 ** 20 / max(segundos, 1e-9):.1f} MB/s", file=sys.stderr)
+    print(f"Atraso máximo respecto del horario: {estadisticas['atraso_max']:.3f} s", file=sys.stderr)
+    if estadisticas.get('cortado'):
+        print("⚠️  El receptor cerró la conexión antes del final", file=sys.stderr)
+
+
+def fecha_argumento(texto):
+    """Fecha AAAA-MM-DD (o AAAA-MM-DD HH:MM) de la línea de comandos"""
+    for formato in ['%Y-%m-%d %H:%M', '%Y-%m-%d']:
+        try:
+            return datetime.strptime(texto, formato)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"Fecha inválida: {texto} (usar AAAA-MM-DD o 'AAAA-MM-DD HH:MM')")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reproduce las ventas como flujo de eventos NDJSON")
+    parser.add_argument('directorio', nargs='?', default=None, help="Carpeta con las tablas")
+    parser.add_argument('--desde', type=fecha_argumento, default=None, help="Inicio del escenario (incluido)")
+    parser.add_argument('--hasta', type=fecha_argumento, default=None, help="Fin del escenario (excluido)")
+    parser.add_argument('--limite', type=int, default=None, help="Máximo de ventas a emitir")
+    parser.add_argument('--velocidad', type=float, default=VELOCIDAD,
+                        help="Aceleración respecto del tiempo real (1 = real, 0 = sin esperas)")
+    parser.add_argument('--salida', default='-', help="'-' (stdout), tcp://host:puerto o archivo")
+    parser.add_argument('--intervalo', type=float, default=INTERVALO_ESTADISTICAS,
+                        help="Segundos entre reportes en stderr")
+    args = parser.parse_args()
+    if args.velocidad < 0:
+        parser.error("--velocidad no puede ser negativa")
+
+    df_ventas, almacen = cargar_escenario(args.directorio, args.desde, args.hasta, args.limite)
+    print(f"🎬 Escenario: {len(df_ventas):,} ventas"
+          + (f" de {df_ventas['fecha'].iloc[0]} a {df_ventas['fecha'].iloc[-1]}" if len(df_ventas) else "")
+          + (f" · velocidad {args.velocidad:g}x" if args.velocidad else " · sin esperas"), file=sys.stderr)
+
+    flujo, cerrar = abrir_salida(args.salida)
+    try:
+        estadisticas = reproducir(generar_eventos(df_ventas, almacen), flujo, args.velocidad, args.intervalo)
+    finally:
+        try:
+            cerrar()
+        except BrokenPipeError:
+            pass
+    imprimir_estadisticas(estadisticas)
@@ -0,0 +1,321 @@
+# ============================================================
+# CÁLCULO RFM (RECENCIA, FRECUENCIA, MONETARIO)
+# ============================================================
+
+import numpy as np
+import pandas as pd
+
+
+SEGUNDOS_DIA = 86400
+SIN_FECHA = np.iinfo(np.int64).min
+
+# Variantes recientes: ventanas móviles (días antes del snapshot) y decaimiento exponencial
+VENTANAS_DIAS = [30, 90, 180]
+VIDA_MEDIA_DIAS = 90  # Una venta de hace 90 días pesa la mitad que una de hoy
+
+
+def a_segundos(fechas):
+    """Convierte fechas (texto o datetime) a segundos desde epoch (int64)"""
+    return pd.to_datetime(fechas).to_numpy().astype('datetime64[s]').astype(np.int64)
+
+
+def _agrandar(arreglo, tamano, relleno):
+    """Devuelve el arreglo con al menos `tamano` posiciones (crece al doble)"""
+    if tamano <= len(arreglo):
+        return arreglo
+    nuevo = np.full(max(tamano, 2 * len(arreglo)), relleno, dtype=arreglo.dtype)
+    nuevo[:len(arreglo)] = arreglo
+    return nuevo
+
+
+def _sumar_por_indice(destino, indices, valores=None):
+    """destino[indices] += valores (o += 1), acumulando índices repetidos"""
+    if len(indices) == 0:
+        return
+    unicos, inversa = np.unique(indices, return_inverse=True)
+    destino[unicos] += np.bincount(inversa, weights=valores).astype(destino.dtype)
+
+
+# ============================================================
+# CÁLCULO RFM VECTORIZADO
+# ============================================================
+
+def _ventas_con_detalle(ventas, detalle):
+    """
+    (cliente, fecha en segundos, monto) de cada venta con detalle, en una sola
+    pasada detalle -> venta con ids enteros (arreglos vacíos si no hay ninguna).
+    """
+    ids_venta = ventas['id_venta'].to_numpy(dtype=np.int64)
+    ids_cliente = ventas['id_cliente'].to_numpy(dtype=np.int64)
+    fechas = a_segundos(ventas['fecha'])
+
+    # Detalle -> posición de su venta en `ventas`
+    venta_detalle = detalle['id_venta'].to_numpy(dtype=np.int64)
+    importes = detalle['importe'].to_numpy(dtype=np.float64)
+    n_ventas = len(ids_venta)
+    if n_ventas == 0 or len(venta_detalle) == 0:
+        # Ej. un mes recién abierto o un recorte sin detalle todavía
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+    primero = int(ids_venta[0])
+    if primero >= 0 and ids_venta[-1] - primero == n_ventas - 1 and (np.diff(ids_venta) == 1).all():
+        # Caso habitual: ids consecutivos, se agrega directo por id_venta y se recorta
+        desde = primero
+        if venta_detalle.min() < primero or venta_detalle.max() >= primero + n_ventas:
+            # Detalle de ventas inexistentes (el merge inner las descarta)
+            validos = (venta_detalle >= primero) & (venta_detalle < primero + n_ventas)
+            venta_detalle = venta_detalle[validos]
+            importes = importes[validos]
+    else:
+        desde = 0
+        posicion = np.full(int(ids_venta.max()) + 1, -1, dtype=np.int64)
+        posicion[ids_venta] = np.arange(n_ventas)
+        validos = (venta_detalle >= 0) & (venta_detalle < len(posicion))
+        venta_detalle = posicion[venta_detalle[validos]]
+        importes = importes[validos][venta_detalle >= 0]
+        venta_detalle = venta_detalle[venta_detalle >= 0]
+
+    # Monto total por venta y si la venta tiene detalle
+    total_venta = np.bincount(venta_detalle, weights=importes, minlength=desde + n_ventas)[desde:]
+    con_detalle = np.zeros(desde + n_ventas, dtype=bool)
+    con_detalle[venta_detalle] = True
+    con_detalle = con_detalle[desde:]
+
+    if con_detalle.all():
+        return ids_cliente, fechas, total_venta
+    return ids_cliente[con_detalle], fechas[con_detalle], total_venta[con_detalle]
+
+
+def _snapshot(fechas, snapshot_date):
+    """Snapshot en segundos: el dado o un día después de la última venta"""
+    if snapshot_date is None:
+        # Sin ventas la tabla queda vacía y el snapshot no se usa
+        return fechas.max() + SEGUNDOS_DIA if len(fechas) else 0
+    return a_segundos([snapshot_date])[0]
+
+
+def _tabla_rfm(clientes, fechas, montos, snapshot):
+    """Tabla RFM de vida completa a partir de (cliente, fecha, monto) por venta"""
+    tope = int(clientes.max()) + 1 if len(clientes) else 0
+    frecuencia = np.bincount(clientes, minlength=tope)
+    # astype: bincount sin elementos devuelve enteros aunque haya pesos
+    monetario = np.bincount(clientes, weights=montos, minlength=tope).astype(np.float64, copy=False)
+    ultima_compra = np.full(tope, SIN_FECHA, dtype=np.int64)
+    np.maximum.at(ultima_compra, clientes, fechas)
+
+    ids = np.flatnonzero(frecuencia)
+    return pd.DataFrame({
+        'id_cliente': ids,
+        'Recencia': (snapshot - ultima_compra[ids]) // SEGUNDOS_DIA,
+        'Frecuencia': frecuencia[ids],
+        'Monetario': monetario[ids],
+    })
+
+
+def _agregar_variantes(df_rfm, clientes, fechas, montos, snapshot,
+                       ventanas=VENTANAS_DIAS, vida_media=VIDA_MEDIA_DIAS):
+    """
+    Agrega a la tabla RFM la frecuencia y el monto de las últimas `ventanas` días
+    y sus versiones con decaimiento exponencial, todo en una pasada: cada venta
+    cae en la ventana más chica que la contiene y un cumsum la suma a las mayores.
+    Las ventas posteriores al snapshot no cuentan.
+    """
+    ventanas = sorted(ventanas)
+    ids = df_rfm['id_cliente'].to_numpy(dtype=np.int64)
+    tope = int(ids.max()) + 1 if len(ids) else 0
+
+    edad = snapshot - fechas
+    pasadas = edad >= 0
+    clientes, edad, montos = clientes[pasadas], edad[pasadas], montos[pasadas]
+
+    # Índice de la ventana más chica con edad < ventana (len(ventanas) = ninguna)
+    limites = np.asarray(ventanas, dtype=np.int64) * SEGUNDOS_DIA
+    ventana = np.searchsorted(limites, edad, side='right')
+    dentro = ventana < len(ventanas)
+    celda = clientes[dentro] * len(ventanas) + ventana[dentro]
+    forma = (tope, len(ventanas))
+    frecuencia = np.bincount(celda, minlength=tope * len(ventanas)).reshape(forma).cumsum(axis=1)
+    monetario = np.bincount(celda, weights=montos[dentro],
+                            minlength=tope * len(ventanas)).reshape(forma).cumsum(axis=1).astype(np.float64)
+    for j, dias in enumerate(ventanas):
+        df_rfm[f'Frecuencia_{dias}d'] = frecuencia[ids, j]
+        df_rfm[f'Monetario_{dias}d'] = monetario[ids, j]
+
+    peso = np.exp2(-edad / (vida_media * SEGUNDOS_DIA))
+    df_rfm['Frecuencia_decaida'] = np.bincount(clientes, weights=peso, minlength=tope)[ids].astype(np.float64)
+    df_rfm['Monetario_decaido'] = np.bincount(clientes, weights=peso * montos, minlength=tope)[ids].astype(np.float64)
+    return df_rfm
+
+
+def calcular_rfm(ventas, detalle, snapshot_date=None):
+    """
+    Calcula la tabla RFM (id_cliente, Recencia, Frecuencia, Monetario) en una sola pasada
+    detalle -> venta -> cliente con ids enteros, sin groupby ni lambdas.
+    Da lo mismo que la celda RFM de Limpieza_datos2: solo cuentan las ventas con detalle
+    y el snapshot por defecto es un día después de la última venta.
+    """
+    clientes, fechas, montos = _ventas_con_detalle(ventas, detalle)
+    return _tabla_rfm(clientes, fechas, montos, _snapshot(fechas, snapshot_date))
+
+
+def calcular_rfm_ventanas(ventas, detalle, snapshot_date=None,
+                          ventanas=VENTANAS_DIAS, vida_media=VIDA_MEDIA_DIAS):
+    """
+    RFM de vida completa más Frecuencia_<n>d / Monetario_<n>d de cada ventana
+    móvil y Frecuencia_decaida / Monetario_decaido (peso 0.5 cada `vida_media`
+    días), calculados juntos sin filtrar el DataFrame una vez por ventana.
+    """
+    clientes, fechas, montos = _ventas_con_detalle(ventas, detalle)
+    snapshot = _snapshot(fechas, snapshot_date)
+    return _agregar_variantes(_tabla_rfm(clientes, fechas, montos, snapshot),
+                              clientes, fechas, montos, snapshot, ventanas, vida_media)
+
+
+# ============================================================
+# MOTOR RFM INCREMENTAL
+# ============================================================
+
+class MotorRFM:
+    """
+    Mantiene el estado RFM por cliente (última compra, cantidad de ventas y monto)
+    y lo actualiza con lotes de ventas / detalle nuevos, sin recalcular la base completa.
+    Igual que en Limpieza_datos2, solo cuentan las ventas que tienen detalle.
+    La Recencia se calcula recién al pedir la tabla, contra cualquier snapshot_date.
+    """
+
+    def __init__(self):
+        # Estado por venta (índice = id_venta)
+        self.cliente_venta = np.full(0, -1, dtype=np.int64)
+        self.fecha_venta = np.full(0, SIN_FECHA, dtype=np.int64)
+        self.venta_contada = np.zeros(0, dtype=bool)
+        self.monto_venta = np.zeros(0, dtype=np.float64)
+        # Estado por cliente (índice = id_cliente)
+        self.ultima_compra = np.full(0, SIN_FECHA, dtype=np.int64)
+        self.frecuencia = np.zeros(0, dtype=np.int64)
+        self.monetario = np.zeros(0, dtype=np.float64)
+        # Detalle cuya venta todavía no llegó
+        self.pendientes_venta = np.zeros(0, dtype=np.int64)
+        self.pendientes_importe = np.zeros(0, dtype=np.float64)
+
+    def _registrar_ventas(self, ventas):
+        """Guarda cliente y fecha de cada venta nueva"""
+        ids = ventas['id_venta'].to_numpy(dtype=np.int64)
+        if len(ids) == 0:
+            return
+        tope = int(ids.max()) + 1
+        self.cliente_venta = _agrandar(self.cliente_venta, tope, -1)
+        self.fecha_venta = _agrandar(self.fecha_venta, tope, SIN_FECHA)
+        self.venta_contada = _agrandar(self.venta_contada, tope, False)
+        self.monto_venta = _agrandar(self.monto_venta, tope, 0.0)
+        self.cliente_venta[ids] = ventas['id_cliente'].to_numpy(dtype=np.int64)
+        self.fecha_venta[ids] = a_segundos(ventas['fecha'])
+
+    def _asegurar_clientes(self, ids_cliente):
+        """Agranda el estado por cliente para cubrir los ids recibidos"""
+        if len(ids_cliente) == 0:
+            return
+        tope = int(ids_cliente.max()) + 1
+        self.ultima_compra = _agrandar(self.ultima_compra, tope, SIN_FECHA)
+        self.frecuencia = _agrandar(self.frecuencia, tope, 0)
+        self.monetario = _agrandar(self.monetario, tope, 0.0)
+
+    def aplicar_lote(self, ventas=None, detalle=None):
+        """
+        Aplica un lote append-only de ventas y/o detalle.
+        El costo es proporcional al tamaño del lote, no al de la base.
+        """
+        if ventas is not None:
+            self._registrar_ventas(ventas)
+
+        ids_venta = self.pendientes_venta
+        importes = self.pendientes_importe
+        if detalle is not None:
+            ids_venta = np.concatenate([ids_venta, detalle['id_venta'].to_numpy(dtype=np.int64)])
+            importes = np.concatenate([importes, detalle['importe'].to_numpy(dtype=np.float64)])
+
+        # El detalle de ventas desconocidas queda pendiente para el próximo lote
+        conocidas = ids_venta < len(self.cliente_venta)
+        conocidas[conocidas] = self.cliente_venta[ids_venta[conocidas]] >= 0
+        self.pendientes_venta = ids_venta[~conocidas]
+        self.pendientes_importe = importes[~conocidas]
+        ids_venta = ids_venta[conocidas]
+        importes = importes[conocidas]
+
+        clientes = self.cliente_venta[ids_venta]
+        self._asegurar_clientes(clientes)
+        _sumar_por_indice(self.monetario, clientes, importes)
+        _sumar_por_indice(self.monto_venta, ids_venta, importes)
+
+        # Ventas que reciben su primer detalle: suman frecuencia y pueden mover la última compra
+        ventas_nuevas = np.unique(ids_venta)
+        ventas_nuevas = ventas_nuevas[~self.venta_contada[ventas_nuevas]]
+        self.venta_contada[ventas_nuevas] = True
+        clientes_nuevos = self.cliente_venta[ventas_nuevas]
+        _sumar_por_indice(self.frecuencia, clientes_nuevos)
+        np.maximum.at(self.ultima_compra, clientes_nuevos, self.fecha_venta[ventas_nuevas])
+        return self
+
+    def fecha_snapshot(self):
+        """Snapshot por defecto: un día después de la última compra registrada"""
+        con_ventas = self.frecuencia > 0
+        if not con_ventas.any():
+            raise ValueError("No hay ventas con detalle registradas: indicar snapshot_date")
+        ultima = self.ultima_compra[con_ventas].max()
+        return pd.Timestamp(int(ultima + SEGUNDOS_DIA), unit='s')
+
+    def _snapshot(self, snapshot_date):
+        """Snapshot en segundos (sin ventas con detalle la tabla queda vacía y no se usa)"""
+        if snapshot_date is None:
+            if not self.frecuencia.any():
+                return 0
+            snapshot_date = self.fecha_snapshot()
+        return a_segundos([snapshot_date])[0]
+
+    def calcular(self, snapshot_date=None):
+        """Devuelve la tabla RFM (id_cliente, Recencia, Frecuencia, Monetario)"""
+        ids = np.flatnonzero(self.frecuencia > 0)
+        snapshot = self._snapshot(snapshot_date)
+
+        return pd.DataFrame({
+            'id_cliente': ids,
+            'Recencia': (snapshot - self.ultima_compra[ids]) // SEGUNDOS_DIA,
+            'Frecuencia': self.frecuencia[ids],
+            'Monetario': self.monetario[ids],
+        })
+
+    def calcular_ventanas(self, snapshot_date=None, ventanas=VENTANAS_DIAS, vida_media=VIDA_MEDIA_DIAS):
+        """
+        Tabla RFM con las variantes de ventana móvil y decaimiento (ver
+        calcular_rfm_ventanas), en una pasada por las ventas registradas con detalle.
+        """
+        snapshot = self._snapshot(snapshot_date)
+        contadas = np.flatnonzero(self.venta_contada)
+        return _agregar_variantes(self.calcular(snapshot_date), self.cliente_venta[contadas],
+                                  self.fecha_venta[contadas], self.monto_venta[contadas],
+                                  snapshot, ventanas, vida_media)
+
+    def guardar(self, ruta):
+        """Persiste el estado en un archivo .npz"""
+        np.savez(
+            ruta,
+            cliente_venta=self.cliente_venta,
+            fecha_venta=self.fecha_venta,
+            venta_contada=self.venta_contada,
+            monto_venta=self.monto_venta,
+            ultima_compra=self.ultima_compra,
+            frecuencia=self.frecuencia,
+            monetario=self.monetario,
+            pendientes_venta=self.pendientes_venta,
+            pendientes_importe=self.pendientes_importe,
+        )
+
+    @classmethod
+    def cargar(cls, ruta):
+        """Reconstruye el motor desde un archivo guardado con guardar()"""
+        motor = cls()
+        with np.load(ruta) as datos:
+            for nombre in datos.files:
+                setattr(motor, nombre, datos[nombre])
+        if len(motor.monto_venta) < len(motor.cliente_venta):
+            # Estado guardado antes de registrar el monto por venta: montos de ventana desconocidos
+            motor.monto_venta = _agrandar(motor.monto_venta, len(motor.cliente_venta), np.nan)
+        return motor
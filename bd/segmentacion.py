@@ -0,0 +1,178 @@
+# ============================================================
+# SEGMENTACIÓN DE CLIENTES (K-MEANS SOBRE RFM)
+# ============================================================
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+
+
+COLUMNAS_RFM = ['Recencia', 'Frecuencia', 'Monetario']
+SEMILLA = 42
+
+# A partir de cuántos clientes se usa MiniBatchKMeans en modo 'auto'
+UMBRAL_MINIBATCH = 200_000
+TAMANO_LOTE = 4096
+
+# Muestra para la silueta (evita el costo cuadrático sobre todos los clientes)
+MUESTRA_SILUETA = 10_000
+RANGO_K = range(2, 11)
+
+
+# ============================================================
+# PREPARACIÓN DE CARACTERÍSTICAS
+# ============================================================
+
+def caracteristicas_rfm(df_rfm):
+    """Matriz RFM con escala logarítmica (log1p) para reducir la asimetría"""
+    X = df_rfm[COLUMNAS_RFM].to_numpy(dtype=np.float64)
+    return np.log1p(np.clip(X, 0, None))
+
+
+def ajustar_escala(X):
+    """Media y desvío por columna (desvío 0 se reemplaza por 1)"""
+    media = X.mean(axis=0)
+    desvio = X.std(axis=0)
+    desvio[desvio == 0] = 1.0
+    return media, desvio
+
+
+def estandarizar(X, media, desvio):
+    """Aplica la estandarización (X - media) / desvío"""
+    return (X - media) / desvio
+
+
+# ============================================================
+# ENTRENAMIENTO
+# ============================================================
+
+def crear_kmeans(k, n_clientes, metodo='auto', semilla=SEMILLA):
+    """Crea KMeans completo o MiniBatchKMeans según el método / volumen"""
+    if metodo == 'auto':
+        metodo = 'minibatch' if n_clientes >= UMBRAL_MINIBATCH else 'completo'
+    if metodo == 'minibatch':
+        return MiniBatchKMeans(n_clusters=k, batch_size=TAMANO_LOTE, n_init=3, random_state=semilla)
+    if metodo == 'completo':
+        return KMeans(n_clusters=k, n_init=10, random_state=semilla)
+    raise ValueError(f"Método desconocido: {metodo} (usar 'auto', 'completo' o 'minibatch')")
+
+
+def evaluar_k(X, k, metodo='auto', semilla=SEMILLA, muestra_silueta=MUESTRA_SILUETA):
+    """Entrena con k grupos y devuelve inercia (codo) y silueta muestreada"""
+    modelo = crear_kmeans(k, len(X), metodo, semilla).fit(X)
+    silueta = silhouette_score(
+        X, modelo.labels_,
+        sample_size=min(muestra_silueta, len(X)),
+        random_state=semilla,
+    )
+    return {'k': k, 'inercia': float(modelo.inertia_), 'silueta': float(silueta)}
+
+
+# Estado de cada proceso del barrido (la matriz se envía una sola vez por worker)
+_contexto_barrido = {}
+
+
+def _iniciar_worker(X, metodo, semilla, muestra_silueta):
+    """Inicializa un proceso del barrido"""
+    _contexto_barrido.update(X=X, metodo=metodo, semilla=semilla, muestra_silueta=muestra_silueta)
+
+
+def _evaluar_k_worker(k):
+    """Evalúa un k con la matriz del proceso"""
+    return evaluar_k(_contexto_barrido['X'], k, _contexto_barrido['metodo'],
+                     _contexto_barrido['semilla'], _contexto_barrido['muestra_silueta'])
+
+
+def barrer_k(X, rango_k=RANGO_K, metodo='auto', num_procesos=None,
+             semilla=SEMILLA, muestra_silueta=MUESTRA_SILUETA):
+    """
+    Barrido de k (codo + silueta) en paralelo, un k por tarea.
+    Devuelve un DataFrame con k, inercia y silueta.
+    """
+    rango_k = list(rango_k)
+    num_procesos = min(num_procesos or os.cpu_count() or 1, len(rango_k))
+
+    if num_procesos == 1:
+        resultados = [evaluar_k(X, k, metodo, semilla, muestra_silueta) for k in rango_k]
+    else:
+        with ProcessPoolExecutor(max_workers=num_procesos, initializer=_iniciar_worker,
+                                 initargs=(X, metodo, semilla, muestra_silueta)) as executor:
+            resultados = list(executor.map(_evaluar_k_worker, rango_k))
+
+    return pd.DataFrame(resultados)
+
+
+def elegir_k(barrido):
+    """Elige el k con mayor silueta"""
+    return int(barrido.loc[barrido['silueta'].idxmax(), 'k'])
+
+
+def ordenar_segmentos(centroides, etiquetas):
+    """
+    Renumera los grupos por valor (Monetario y Frecuencia altos, Recencia baja):
+    el segmento 0 es siempre el de mejores clientes, así las etiquetas son estables.
+    """
+    valor = centroides[:, 1] + centroides[:, 2] - centroides[:, 0]
+    orden = np.argsort(-valor, kind='stable')
+    nuevo = np.empty_like(orden)
+    nuevo[orden] = np.arange(len(orden))
+    return centroides[orden], nuevo[etiquetas]
+
+
+def segmentar_clientes(df_rfm, k=None, rango_k=RANGO_K, metodo='auto',
+                       num_procesos=None, semilla=SEMILLA):
+    """
+    Segmenta la tabla RFM. Si k es None, se elige con el barrido de silueta.
+    Devuelve (df con columna 'segmento', modelo, barrido o None).
+    """
+    X = caracteristicas_rfm(df_rfm)
+    media, desvio = ajustar_escala(X)
+    Z = estandarizar(X, media, desvio)
+
+    barrido = None
+    if k is None:
+        print(f"Barrido de k en {list(rango_k)} ({len(Z)} clientes)...")
+        barrido = barrer_k(Z, rango_k, metodo, num_procesos, semilla)
+        k = elegir_k(barrido)
+        print(f"✓ k elegido por silueta: {k}")
+
+    kmeans = crear_kmeans(k, len(Z), metodo, semilla).fit(Z)
+    centroides, etiquetas = ordenar_segmentos(kmeans.cluster_centers_, kmeans.labels_)
+
+    df_segmentos = df_rfm.copy()
+    df_segmentos['segmento'] = etiquetas
+    modelo = {
+        'k': int(k),
+        'columnas': COLUMNAS_RFM,
+        'media': media.tolist(),
+        'desvio': desvio.tolist(),
+        'centroides': centroides.tolist(),
+    }
+    return df_segmentos, modelo, barrido
+
+
+# ============================================================
+# PERSISTENCIA
+# ============================================================
+
+def guardar_modelo(modelo, ruta):
+    """Guarda escala y centroides en JSON"""
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(modelo, archivo, indent=2)
+
+
+def cargar_modelo(ruta):
+    """Carga un modelo guardado con guardar_modelo()"""
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def exportar_segmentos(df_segmentos, ruta):
+    """Exporta id_cliente -> segmento a CSV"""
+    df_segmentos[['id_cliente', 'segmento']].to_csv(ruta, index=False, encoding='utf-8-sig')
+    return ruta
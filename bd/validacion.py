@@ -0,0 +1,426 @@
+# ============================================================
+# VALIDACIÓN DE INTEGRIDAD Y CALIDAD DE LA BASE (POR CHUNKS)
+# ============================================================
+
+import argparse
+import csv
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cargador_datos import buscar_archivo, cargar_tabla
+from detalle_ventas_mejorado import TIPOS_COMPRA
+
+
+TAMANO_CHUNK = 1_000_000
+TOLERANCIA_IMPORTE = 0.01
+MARGEN_PRESUPUESTO = 1.1  # El generador admite hasta monto_max * 1.1 por venta
+MAX_EJEMPLOS = 5
+
+COLUMNAS_DETALLE = ['id_detalle', 'id_venta', 'id_producto', 'cantidad', 'precio_unitario', 'importe']
+
+# Checks que se informan pero no invalidan la base: el modo fila repite un
+# producto como último recurso cuando ya eligió todos los que caben en el
+# presupuesto (igual que validar_detalle_ventas, que lo marca como advertencia)
+ADVERTENCIAS = {'detalle_duplicado'}
+
+# Límites por tipo de compra, de la compra más chica a la más grande
+TIPOS = list(TIPOS_COMPRA.keys())
+LINEAS_MAX = np.array([TIPOS_COMPRA[t]['num_productos'][1] for t in TIPOS])
+MONTO_MAX = np.array([TIPOS_COMPRA[t]['monto_max'] * MARGEN_PRESUPUESTO for t in TIPOS])
+
+
+# ============================================================
+# REPORTE
+# ============================================================
+
+def reporte_vacio():
+    """Estructura del reporte (se combina sumando entre chunks y procesos)"""
+    return {
+        'filas': {},
+        'errores': {},
+        'ejemplos': {},
+        'tipos_compra': {tipo: 0 for tipo in TIPOS},
+    }
+
+
+def anotar(reporte, check, mascara, ids):
+    """Suma los errores de un check y guarda algunos ids de ejemplo"""
+    n = int(np.count_nonzero(mascara))
+    reporte['errores'][check] = reporte['errores'].get(check, 0) + n
+    ejemplos = reporte['ejemplos'].setdefault(check, [])
+    if n and len(ejemplos) < MAX_EJEMPLOS:
+        ejemplos.extend(int(i) for i in np.asarray(ids)[mascara][:MAX_EJEMPLOS - len(ejemplos)])
+
+
+def combinar_reportes(destino, origen):
+    """Acumula `origen` en `destino`"""
+    for seccion in ['filas', 'errores', 'tipos_compra']:
+        for clave, valor in origen[seccion].items():
+            destino[seccion][clave] = destino[seccion].get(clave, 0) + valor
+    for check, ejemplos in origen['ejemplos'].items():
+        actuales = destino['ejemplos'].setdefault(check, [])
+        actuales.extend(ejemplos[:MAX_EJEMPLOS - len(actuales)])
+    return destino
+
+
+def mapa_ids(ids):
+    """Arreglo booleano denso: mapa[id] = True si el id existe"""
+    ids = np.asarray(ids, dtype=np.int64)
+    mapa = np.zeros(int(ids.max()) + 1 if len(ids) else 0, dtype=bool)
+    mapa[ids[ids >= 0]] = True
+    return mapa
+
+
+def existe(mapa, ids):
+    """mapa[ids] tolerando ids fuera de rango (cuentan como inexistentes)"""
+    dentro = (ids >= 0) & (ids < len(mapa))
+    resultado = np.zeros(len(ids), dtype=bool)
+    resultado[dentro] = mapa[ids[dentro]]
+    return resultado
+
+
+def ids_duplicados(ids):
+    """Máscara de las repeticiones de ids ya vistos (la primera aparición no cuenta)"""
+    _, primeras = np.unique(ids, return_index=True)
+    mascara = np.ones(len(ids), dtype=bool)
+    mascara[primeras] = False
+    return mascara
+
+
+# ============================================================
+# DIMENSIONES Y VENTAS
+# ============================================================
+
+def validar_dimensiones(directorio, reporte):
+    """Valida Clientes y Productos (tablas chicas) y arma los mapas de ids"""
+    df_clientes = cargar_tabla('clientes', directorio)
+    df_productos = cargar_tabla('productos', directorio)
+
+    ids_cliente = df_clientes['id_cliente'].to_numpy(dtype=np.int64)
+    ids_producto = df_productos['id_producto'].to_numpy(dtype=np.int64)
+    reporte['filas']['clientes'] = len(df_clientes)
+    reporte['filas']['productos'] = len(df_productos)
+    anotar(reporte, 'clientes_pk_duplicada', ids_duplicados(ids_cliente), ids_cliente)
+    anotar(reporte, 'productos_pk_duplicada', ids_duplicados(ids_producto), ids_producto)
+
+    # Día de alta de cada cliente (para verificar que no compre antes de registrarse)
+    alta_cliente = np.full(int(ids_cliente.max()) + 1, np.iinfo(np.int64).max, dtype=np.int64)
+    alta_cliente[ids_cliente] = pd.to_datetime(df_clientes['fecha_alta']).to_numpy().astype('datetime64[D]').astype(np.int64)
+
+    return mapa_ids(ids_cliente), alta_cliente, mapa_ids(ids_producto)
+
+
+def leer_por_chunks(ruta, nombre_tabla, columnas, tamano_chunk):
+    """Lee una tabla por chunks (los CSV por partes; un Excel entero, ya cabe en memoria)"""
+    if ruta.lower().endswith('.csv'):
+        yield from pd.read_csv(ruta, encoding='utf-8-sig', usecols=columnas, chunksize=tamano_chunk)
+    else:
+        yield cargar_tabla(nombre_tabla, os.path.dirname(ruta))[columnas]
+
+
+def validar_ventas(directorio, mapa_clientes, alta_cliente, reporte, tamano_chunk=TAMANO_CHUNK):
+    """Valida Ventas por chunks y devuelve el mapa de id_venta existentes"""
+    ruta = buscar_archivo('ventas', directorio)
+    mapa_ventas = np.zeros(0, dtype=bool)
+    duplicadas = 0
+
+    for chunk in leer_por_chunks(ruta, 'ventas', ['id_venta', 'id_cliente', 'fecha'], tamano_chunk):
+        ids_venta = chunk['id_venta'].to_numpy(dtype=np.int64)
+        ids_cliente = chunk['id_cliente'].to_numpy(dtype=np.int64)
+        reporte['filas']['ventas'] = reporte['filas'].get('ventas', 0) + len(chunk)
+
+        # PK: repetidas dentro del chunk o ya vistas en chunks anteriores
+        repetidas = ids_duplicados(ids_venta) | existe(mapa_ventas, ids_venta)
+        anotar(reporte, 'ventas_pk_duplicada', repetidas, ids_venta)
+        duplicadas += int(np.count_nonzero(repetidas))
+        if len(ids_venta) and ids_venta.max() >= len(mapa_ventas):
+            mapa_ventas = np.concatenate([mapa_ventas, np.zeros(int(ids_venta.max()) + 1 - len(mapa_ventas), dtype=bool)])
+        mapa_ventas[ids_venta[ids_venta >= 0]] = True
+
+        # FK Ventas -> Clientes
+        con_cliente = existe(mapa_clientes, ids_cliente)
+        anotar(reporte, 'ventas_sin_cliente', ~con_cliente, ids_venta)
+
+        # La venta no puede ser anterior al alta del cliente
+        dia_venta = pd.to_datetime(chunk['fecha']).to_numpy().astype('datetime64[D]').astype(np.int64)
+        antes = np.zeros(len(chunk), dtype=bool)
+        antes[con_cliente] = dia_venta[con_cliente] < alta_cliente[ids_cliente[con_cliente]]
+        anotar(reporte, 'ventas_antes_del_alta', antes, ids_venta)
+
+    reporte['filas']['ventas_unicas'] = reporte['filas'].get('ventas', 0) - duplicadas
+    return mapa_ventas
+
+
+# ============================================================
+# DETALLE: RANGOS DEL ARCHIVO ALINEADOS A VENTAS
+# ============================================================
+
+def _id_venta_de_linea(linea, indice):
+    """id_venta de una línea CSV en bytes (las primeras columnas son numéricas)"""
+    return linea.split(b',', indice + 1)[indice]
+
+
+def rangos_por_venta(ruta, n_partes, indice_venta=1):
+    """
+    Divide el CSV (sin el encabezado) en hasta n_partes rangos de bytes.
+    Cada corte se mueve hasta la primera línea de una venta nueva, así ninguna
+    venta queda partida entre dos procesos.
+    """
+    tamano = os.path.getsize(ruta)
+    with open(ruta, 'rb') as archivo:
+        archivo.readline()
+        inicio_datos = archivo.tell()
+        cortes = [inicio_datos]
+        for i in range(1, n_partes):
+            posicion = max(inicio_datos + (tamano - inicio_datos) * i // n_partes, cortes[-1])
+            archivo.seek(posicion)
+            archivo.readline()  # Descartar la línea parcial
+            linea = archivo.readline()
+            corte = tamano
+            if linea:
+                venta = _id_venta_de_linea(linea, indice_venta)
+                while True:
+                    corte = archivo.tell()
+                    linea = archivo.readline()
+                    if not linea:
+                        corte = tamano
+                        break
+                    if _id_venta_de_linea(linea, indice_venta) != venta:
+                        break
+            cortes.append(corte)
+        cortes.append(tamano)
+    return [(a, b) for a, b in zip(cortes, cortes[1:]) if b > a]
+
+
+class _LectorRango(io.RawIOBase):
+    """Archivo de solo lectura limitado a los bytes [inicio, fin)"""
+
+    def __init__(self, ruta, inicio, fin):
+        self._archivo = open(ruta, 'rb')
+        self._archivo.seek(inicio)
+        self._restante = fin - inicio
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self._restante)
+        if n <= 0:
+            return 0
+        leidos = self._archivo.readinto(memoryview(buffer)[:n])
+        self._restante -= leidos
+        return leidos
+
+    def close(self):
+        self._archivo.close()
+        super().close()
+
+
+def encabezado_csv(ruta):
+    """Nombres de columnas del CSV"""
+    with open(ruta, encoding='utf-8-sig', newline='') as archivo:
+        return next(csv.reader(archivo))
+
+
+# ============================================================
+# DETALLE: CHECKS
+# ============================================================
+
+def revisar_filas(df, contexto, reporte):
+    """Checks fila por fila: FKs, importe y cantidad"""
+    id_detalle = df['id_detalle'].to_numpy(dtype=np.int64)
+    id_venta = df['id_venta'].to_numpy(dtype=np.int64)
+    id_producto = df['id_producto'].to_numpy(dtype=np.int64)
+    cantidad = df['cantidad'].to_numpy(dtype=np.float64)
+    precio = df['precio_unitario'].to_numpy(dtype=np.float64)
+    importe = df['importe'].to_numpy(dtype=np.float64)
+
+    reporte['filas']['detalle_ventas'] = reporte['filas'].get('detalle_ventas', 0) + len(df)
+    anotar(reporte, 'detalle_sin_venta', ~existe(contexto['mapa_ventas'], id_venta), id_detalle)
+    anotar(reporte, 'detalle_sin_producto', ~existe(contexto['mapa_productos'], id_producto), id_detalle)
+    anotar(reporte, 'importe_incorrecto', ~(np.abs(importe - cantidad * precio) <= TOLERANCIA_IMPORTE), id_detalle)
+    anotar(reporte, 'cantidad_no_positiva', ~(cantidad > 0), id_detalle)
+
+    # PK del detalle: los generadores escriben id_detalle creciente
+    previo = np.r_[contexto['ultimo_detalle'], id_detalle[:-1]]
+    anotar(reporte, 'detalle_pk_no_creciente', id_detalle <= previo, id_detalle)
+    if len(id_detalle):
+        contexto['ultimo_detalle'] = id_detalle[-1]
+
+
+def revisar_ventas(id_venta, id_producto, importe, contexto, reporte):
+    """
+    Checks por venta sobre filas agrupadas por id_venta (ventas completas):
+    productos duplicados, cantidad de líneas y monto dentro de algún TIPOS_COMPRA.
+    """
+    if len(id_venta) == 0:
+        return
+    inicios = np.r_[0, np.flatnonzero(id_venta[1:] != id_venta[:-1]) + 1]
+    ventas = id_venta[inicios]
+    lineas = np.diff(np.r_[inicios, len(id_venta)])
+    totales = np.add.reduceat(importe, inicios)
+
+    # Una venta partida en dos bloques del archivo invalida los checks por venta
+    previa = np.r_[contexto['ultima_venta'], ventas[:-1]]
+    anotar(reporte, 'detalle_desordenado', ventas <= previa, ventas)
+    contexto['ultima_venta'] = ventas[-1]
+
+    # Productos repetidos dentro de la misma venta
+    orden = np.lexsort((id_producto, id_venta))
+    v, p = id_venta[orden], id_producto[orden]
+    repetido = (v[1:] == v[:-1]) & (p[1:] == p[:-1])
+    anotar(reporte, 'detalle_duplicado', repetido, v[1:])
+
+    # Tipo de compra compatible más chico (por líneas y presupuesto)
+    existentes = existe(contexto['mapa_ventas'], ventas)
+    reporte['filas']['ventas_con_detalle'] = (
+        reporte['filas'].get('ventas_con_detalle', 0) + int(np.count_nonzero(existentes))
+    )
+    compatible = (lineas[:, None] <= LINEAS_MAX) & (totales[:, None] <= MONTO_MAX + TOLERANCIA_IMPORTE)
+    tiene_tipo = compatible.any(axis=1)
+    tipo = compatible.argmax(axis=1)
+    for i, nombre in enumerate(TIPOS):
+        reporte['tipos_compra'][nombre] += int(np.count_nonzero(tiene_tipo & (tipo == i)))
+    anotar(reporte, 'ventas_fuera_de_presupuesto', ~tiene_tipo, ventas)
+
+
+def validar_rango_detalle(ruta, inicio, fin, contexto, tamano_chunk=TAMANO_CHUNK):
+    """
+    Valida un rango del CSV de detalle por chunks. La última venta de cada chunk
+    se guarda y se revisa junto con el chunk siguiente.
+    """
+    reporte = reporte_vacio()
+    contexto = dict(contexto, ultimo_detalle=np.iinfo(np.int64).min, ultima_venta=np.iinfo(np.int64).min)
+    lector = io.BufferedReader(_LectorRango(ruta, inicio, fin), buffer_size=1 << 20)
+    pendiente = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0))
+
+    with lector:
+        chunks = pd.read_csv(lector, header=None, names=contexto['columnas'], usecols=COLUMNAS_DETALLE,
+                             encoding='utf-8', chunksize=tamano_chunk)
+        for chunk in chunks:
+            revisar_filas(chunk, contexto, reporte)
+            id_venta = np.concatenate([pendiente[0], chunk['id_venta'].to_numpy(dtype=np.int64)])
+            id_producto = np.concatenate([pendiente[1], chunk['id_producto'].to_numpy(dtype=np.int64)])
+            importe = np.concatenate([pendiente[2], chunk['importe'].to_numpy(dtype=np.float64)])
+
+            corte = len(id_venta) - np.argmax(id_venta[::-1] != id_venta[-1]) if (id_venta != id_venta[-1]).any() else 0
+            revisar_ventas(id_venta[:corte], id_producto[:corte], importe[:corte], contexto, reporte)
+            pendiente = (id_venta[corte:], id_producto[corte:], importe[corte:])
+
+    revisar_ventas(*pendiente, contexto, reporte)
+    return reporte
+
+
+# Estado de cada proceso (los mapas de ids se envían una sola vez por worker)
+_contexto_validacion = {}
+
+
+def _iniciar_worker(contexto):
+    """Inicializa un proceso de validación"""
+    _contexto_validacion.update(contexto)
+
+
+def _validar_rango_worker(ruta, inicio, fin, tamano_chunk):
+    """Valida un rango con el contexto del proceso"""
+    return validar_rango_detalle(ruta, inicio, fin, _contexto_validacion, tamano_chunk)
+
+
+def validar_detalle(directorio, mapa_ventas, mapa_productos, reporte,
+                    num_procesos=1, tamano_chunk=TAMANO_CHUNK):
+    """Valida Detalle_Ventas en una sola pasada, repartiendo rangos del archivo entre procesos"""
+    ruta = buscar_archivo('detalle_ventas', directorio)
+    contexto = {'mapa_ventas': mapa_ventas, 'mapa_productos': mapa_productos}
+
+    if not ruta.lower().endswith('.csv'):
+        # Excel: ya entra en memoria, se revisa como un único chunk
+        df = cargar_tabla('detalle_ventas', directorio)
+        contexto.update(ultimo_detalle=np.iinfo(np.int64).min, ultima_venta=np.iinfo(np.int64).min)
+        revisar_filas(df, contexto, reporte)
+        revisar_ventas(df['id_venta'].to_numpy(dtype=np.int64), df['id_producto'].to_numpy(dtype=np.int64),
+                       df['importe'].to_numpy(dtype=np.float64), contexto, reporte)
+        return reporte
+
+    contexto['columnas'] = encabezado_csv(ruta)
+    rangos = rangos_por_venta(ruta, num_procesos, contexto['columnas'].index('id_venta'))
+
+    if num_procesos == 1 or len(rangos) == 1:
+        parciales = [validar_rango_detalle(ruta, inicio, fin, contexto, tamano_chunk) for inicio, fin in rangos]
+    else:
+        with ProcessPoolExecutor(max_workers=num_procesos, initializer=_iniciar_worker,
+                                 initargs=(contexto,)) as executor:
+            futuros = [executor.submit(_validar_rango_worker, ruta, inicio, fin, tamano_chunk)
+                       for inicio, fin in rangos]
+            parciales = [futuro.result() for futuro in futuros]
+
+    for parcial in parciales:
+        combinar_reportes(reporte, parcial)
+    return reporte
+
+
+# ============================================================
+# VALIDACIÓN COMPLETA
+# ============================================================
+
+def validar_base(directorio=None, num_procesos=None, tamano_chunk=TAMANO_CHUNK, ruta_reporte=None):
+    """
+    Valida las cuatro tablas: PKs, FKs (Ventas->Clientes, Detalle->Ventas, Detalle->Productos),
+    importe = cantidad * precio_unitario, productos duplicados por venta y rangos de
+    TIPOS_COMPRA. El detalle se lee por chunks, sin cargarlo entero.
+    Devuelve el reporte (dict) y, si se indica ruta_reporte, lo guarda en JSON.
+    """
+    inicio = time.time()
+    num_procesos = num_procesos or os.cpu_count() or 1
+    reporte = reporte_vacio()
+
+    mapa_clientes, alta_cliente, mapa_productos = validar_dimensiones(directorio, reporte)
+    mapa_ventas = validar_ventas(directorio, mapa_clientes, alta_cliente, reporte, tamano_chunk)
+    validar_detalle(directorio, mapa_ventas, mapa_productos, reporte, num_procesos, tamano_chunk)
+
+    # Ventas sin ninguna línea de detalle
+    reporte['errores']['ventas_sin_detalle'] = max(
+        reporte['filas']['ventas_unicas'] - reporte['filas'].get('ventas_con_detalle', 0), 0
+    )
+    reporte['ok'] = not any(n for check, n in reporte['errores'].items() if check not in ADVERTENCIAS)
+    reporte['segundos'] = round(time.time() - inicio, 2)
+
+    if ruta_reporte:
+        with open(ruta_reporte, 'w', encoding='utf-8') as archivo:
+            json.dump(reporte, archivo, indent=2, ensure_ascii=False)
+    return reporte
+
+
+def imprimir_reporte(reporte):
+    """Resumen legible del reporte"""
+    print("\n" + "="*60)
+    print("📊 VALIDACIÓN DE INTEGRIDAD Y CALIDAD:")
+    print("="*60)
+    for tabla, filas in reporte['filas'].items():
+        print(f"   {tabla:<20} {filas:>12,}")
+    print()
+    for check, errores in reporte['errores'].items():
+        marca = "✅" if errores == 0 else ("⚠️ " if check in ADVERTENCIAS else "❌")
+        ejemplos = reporte['ejemplos'].get(check) or ''
+        print(f"{marca} {check:<28} {errores:>10,}  {ejemplos}")
+    print("\n📈 Ventas por tipo de compra compatible:")
+    for tipo, n in reporte['tipos_compra'].items():
+        print(f"   {tipo:<16} {n:>10,}")
+    print(f"\n{'✓ Base válida' if reporte['ok'] else '✗ Se encontraron errores'} ({reporte['segundos']} s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Valida la integridad y calidad de las cuatro tablas")
+    parser.add_argument('directorio', nargs='?', default=None, help="Carpeta con las tablas")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos para el detalle")
+    parser.add_argument('--chunk', type=int, default=TAMANO_CHUNK, help="Filas por chunk")
+    parser.add_argument('--reporte', default=None, help="Ruta del reporte JSON")
+    args = parser.parse_args()
+
+    reporte = validar_base(args.directorio, args.procesos, args.chunk, args.reporte)
+    imprimir_reporte(reporte)
+    raise SystemExit(0 if reporte['ok'] else 1)
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Los módulos de bd/ se importan entre sí sin paquete (como en los notebooks)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bd'))
+
+
+def catalogo_productos(precios, niveles):
+    """df_productos mínimo con popularidad ya asignada"""
+    n = len(precios)
+    return pd.DataFrame({
+        'id_producto': np.arange(1, n + 1),
+        'nombre_producto': [f'Producto {i}' for i in range(1, n + 1)],
+        'categoria': 'Alimentos',
+        'precio_unitario': precios,
+        'popularidad': niveles,
+    })
+
+
+@pytest.fixture
+def df_productos():
+    """Catálogo de 100 productos con los cupos de asignar_popularidad"""
+    rng = np.random.default_rng(0)
+    niveles = ['estrella'] * 10 + ['alta'] * 20 + ['media'] * 30 + ['baja'] * 25 + ['muy_baja'] * 15
+    precios = np.round(rng.uniform(500, 6000, len(niveles)), -1)
+    return catalogo_productos(precios, niveles)
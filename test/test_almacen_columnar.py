@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from almacen_columnar import AlmacenDetalle, construir_almacen
+
+
+@pytest.fixture
+def detalle_y_almacen(tmp_path):
+    # Ventas con huecos de id_venta, de 1 a 39 líneas y máximos repetidos
+    rng = np.random.default_rng(0)
+    ids = np.sort(rng.choice(np.arange(1, 5000), 3000, replace=False))
+    largos = rng.integers(1, 40, len(ids))
+    n = int(largos.sum())
+    detalle = pd.DataFrame({
+        'id_detalle': np.arange(1, n + 1),
+        'id_venta': np.repeat(ids, largos),
+        'id_producto': rng.integers(1, 100, n),
+        'cantidad': rng.integers(1, 4, n),
+        'precio_unitario': rng.integers(1, 3, n).astype(float),
+        'importe': rng.integers(1, 3, n).astype(float),
+    })
+    construir_almacen([detalle], str(tmp_path / 'almacen'))
+    return detalle, AlmacenDetalle(str(tmp_path / 'almacen'))
+
+
+@pytest.mark.parametrize('tamano_bloque', [1, 50, 1_000_000])
+def test_idxmax_por_bloques_igual_a_groupby(detalle_y_almacen, tamano_bloque):
+    detalle, almacen = detalle_y_almacen
+    for columna in ['cantidad', 'importe']:
+        esperado = detalle.groupby('id_venta')[columna].idxmax()
+        obtenido = almacen.idxmax_por_venta(columna, tamano_bloque=tamano_bloque)
+        np.testing.assert_array_equal(obtenido.index, esperado.index)
+        np.testing.assert_array_equal(obtenido.to_numpy(), esperado.to_numpy())
@@ -0,0 +1,39 @@
+from collections import Counter
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from almacen_columnar import AlmacenDetalle, construir_almacen
+from canasta import fp_growth, recorrer_canastas
+
+
+def test_fp_growth_en_dos_pasadas_igual_a_fuerza_bruta(tmp_path):
+    rng = np.random.default_rng(1)
+    largos = rng.integers(1, 8, 3000)
+    n = int(largos.sum())
+    # Productos con popularidad desigual para tener itemsets de varios tamaños
+    detalle = pd.DataFrame({
+        'id_detalle': np.arange(1, n + 1),
+        'id_venta': np.repeat(np.arange(1, len(largos) + 1), largos),
+        'id_producto': rng.zipf(1.6, n) % 30 + 1,
+        'cantidad': 1,
+        'precio_unitario': 100.0,
+        'importe': 100.0,
+    })
+    construir_almacen([detalle], str(tmp_path / 'almacen'))
+    almacen = AlmacenDetalle(str(tmp_path / 'almacen'))
+
+    coocurrencia, num_ventas = recorrer_canastas(almacen, ventas_por_bloque=500)
+    itemsets = fp_growth(almacen, coocurrencia, num_ventas, soporte_minimo=0.01, max_items=3,
+                         ventas_por_bloque=500)
+
+    esperado = Counter()
+    for productos in detalle.groupby('id_venta')['id_producto'].agg(lambda s: sorted(set(s))):
+        for tamano in range(1, 4):
+            esperado.update(combinations(productos, tamano))
+    minimo = int(np.ceil(0.01 * num_ventas))
+    esperado = {itemset: ventas for itemset, ventas in esperado.items() if ventas >= minimo}
+
+    assert num_ventas == len(largos)
+    assert dict(zip(itemsets['itemset'], itemsets['ventas'])) == esperado
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from conftest import catalogo_productos
+from detalle_ventas_mejorado import generar_tabla_detalle_ventas_por_lotes
+
+
+def ventas_de_prueba(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        'id_venta': np.arange(1, n + 1),
+        'medio_pago': rng.choice(['efectivo', 'transferencia', 'tarjeta', 'qr'], n),
+    })
+
+
+def test_lotes_sin_duplicados_con_presupuesto_bajo():
+    # Pocos productos baratos: las compras grandes agotan el catálogo que cabe
+    df_productos = catalogo_productos([300, 450, 800, 1500, 9000],
+                                      ['estrella', 'alta', 'media', 'baja', 'muy_baja'])
+    df_ventas = ventas_de_prueba(5000)
+
+    detalle = generar_tabla_detalle_ventas_por_lotes(df_ventas, df_productos, tamano_bloque=1000, seed=1)
+
+    assert detalle.duplicated(['id_venta', 'id_producto']).sum() == 0
+    assert set(detalle['id_venta']) == set(df_ventas['id_venta'])
+
+
+def test_lotes_sin_duplicados_catalogo_completo(df_productos):
+    detalle = generar_tabla_detalle_ventas_por_lotes(ventas_de_prueba(20000), df_productos, seed=2)
+
+    assert detalle.duplicated(['id_venta', 'id_producto']).sum() == 0
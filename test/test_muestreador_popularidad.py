@@ -0,0 +1,64 @@
+import random
+
+import numpy as np
+
+from conftest import catalogo_productos
+from detalle_ventas_mejorado import PROB_SELECCION
+from muestreador_popularidad import MuestreadorPopularidad
+
+SORTEOS = 200_000
+TOLERANCIA = 0.01
+
+
+def frecuencias_por_nivel(muestreador, df_productos, presupuesto, excluir=()):
+    rng = random.Random(0)
+    niveles = df_productos['popularidad'].to_numpy()
+    elegidos = [niveles[muestreador.elegir_con_presupuesto(presupuesto, excluir, rng)] for _ in range(SORTEOS)]
+    valores, conteos = np.unique(elegidos, return_counts=True)
+    return dict(zip(valores, conteos / SORTEOS))
+
+
+def test_niveles_respetan_prob_seleccion(df_productos):
+    muestreador = MuestreadorPopularidad(df_productos, PROB_SELECCION)
+
+    frecuencias = frecuencias_por_nivel(muestreador, df_productos, presupuesto=1e9)
+
+    for nivel, prob in PROB_SELECCION.items():
+        assert abs(frecuencias.get(nivel, 0.0) - prob) < TOLERANCIA, nivel
+
+
+def test_nivel_sin_viables_reparte_uniforme_entre_todos_los_viables():
+    # Con presupuesto 1000 'estrella' no tiene viables: su 45% se reparte
+    # uniforme entre los 4 productos que caben (regla del filtrado original)
+    df_productos = catalogo_productos([5000, 400, 600, 800, 900],
+                                      ['estrella', 'alta', 'media', 'baja', 'muy_baja'])
+    muestreador = MuestreadorPopularidad(df_productos, PROB_SELECCION)
+
+    frecuencias = frecuencias_por_nivel(muestreador, df_productos, presupuesto=1000)
+
+    assert 'estrella' not in frecuencias
+    for nivel in ['alta', 'media', 'baja', 'muy_baja']:
+        esperado = PROB_SELECCION[nivel] + PROB_SELECCION['estrella'] / 4
+        assert abs(frecuencias[nivel] - esperado) < TOLERANCIA, nivel
+
+
+def test_excluidos_solo_se_repiten_como_ultimo_recurso():
+    df_productos = catalogo_productos([300, 400, 500], ['estrella', 'alta', 'media'])
+    muestreador = MuestreadorPopularidad(df_productos, PROB_SELECCION)
+    rng = random.Random(0)
+
+    assert all(muestreador.elegir_con_presupuesto(1000, {0, 1}, rng) == 2 for _ in range(1000))
+    assert muestreador.elegir_con_presupuesto(1000, {0, 1, 2}, rng) in {0, 1, 2}
+    assert muestreador.elegir_con_presupuesto(100, (), rng) is None
+
+
+def test_excluidos_no_cambian_la_probabilidad_del_nivel(df_productos):
+    # Ya elegidos 9 de los 10 'estrella': el nivel conserva su 45% (todo en el que queda)
+    muestreador = MuestreadorPopularidad(df_productos, PROB_SELECCION)
+    estrellas = np.flatnonzero(df_productos['popularidad'] == 'estrella')
+    excluir = set(estrellas[:-1].tolist())
+
+    frecuencias = frecuencias_por_nivel(muestreador, df_productos, presupuesto=1e9, excluir=excluir)
+
+    for nivel, prob in PROB_SELECCION.items():
+        assert abs(frecuencias.get(nivel, 0.0) - prob) < TOLERANCIA, nivel